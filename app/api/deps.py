@@ -1,6 +1,10 @@
 #Dependencias (get_current_user, get_db, etc)
-from fastapi import Depends, HTTPException, status
+import secrets
+from typing import Optional
+from fastapi import Depends, Header, HTTPException, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
+from app.core.config import settings
+from app.core.identity_cache import identity_cache
 from app.core.security import decode_access_token
 from app.core.database import get_db
 
@@ -52,22 +56,31 @@ def get_current_user(
             detail="Token inválido"
         )
     
-    # Buscar usuário no banco
-    if tipo_usuario == "user":
-        cursor.execute(
-            "SELECT id, nome, email, email_verificado, ativo FROM users WHERE id = %s",
-            (user_id,)
-        )
-    else:  # empresa
-        # 🔥 CORREÇÃO: Usar 'nome' e 'email' (não nome_empresa/email_corporativo)
-        cursor.execute(
-            "SELECT id, nome, email, email_verificado, ativo FROM empresas WHERE id = %s",
-            (user_id,)
-        )
-    
-    user = cursor.fetchone()
-    
-    print(f"🔍 DEBUG - Usuário encontrado no banco: {user}")
+    # Cache de identidade: no caso comum não há ida ao banco
+    # (o cursor é lazy, então nem uma conexão é retirada do pool)
+    user, versao = identity_cache.get((tipo_usuario, user_id))
+    
+    if user is None:
+        try:
+            # Buscar usuário no banco
+            if tipo_usuario == "user":
+                cursor.execute(
+                    "SELECT id, nome, email, email_verificado, ativo FROM users WHERE id = %s",
+                    (user_id,)
+                )
+            else:  # empresa
+                # 🔥 CORREÇÃO: Usar 'nome' e 'email' (não nome_empresa/email_corporativo)
+                cursor.execute(
+                    "SELECT id, nome, email, email_verificado, ativo FROM empresas WHERE id = %s",
+                    (user_id,)
+                )
+            
+            user = cursor.fetchone()
+            
+            print(f"🔍 DEBUG - Usuário encontrado no banco: {user}")
+        finally:
+            # Encerra a leitura aberta pelo get (guarda a identidade, se encontrada)
+            identity_cache.put((tipo_usuario, user_id), user, versao)
     
     if not user:
         print("❌ DEBUG - Usuário não encontrado no banco!")
@@ -110,4 +123,21 @@ def get_current_empresa(current_user: dict = Depends(get_current_user)):
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Acesso restrito a empresas"
         )
-    return current_user
\ No newline at end of file
+    return current_user
+
+def require_admin(x_admin_token: Optional[str] = Header(None)):
+    """
+    Dependency para endpoints de administração/monitoramento
+    Exige o header X-Admin-Token igual a ADMIN_TOKEN (desativado se não configurado)
+    """
+    if not settings.ADMIN_TOKEN:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Not Found"
+        )
+    
+    if not x_admin_token or not secrets.compare_digest(x_admin_token, settings.ADMIN_TOKEN):
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Acesso restrito à administração"
+        )
@@ -0,0 +1,189 @@
+"""
+Endpoints de administração e monitoramento
+Protegidos pelo header X-Admin-Token (ADMIN_TOKEN)
+"""
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from pydantic import BaseModel, Field
+from typing import Dict, Optional
+from app.api.deps import require_admin
+from app.core.async_database import get_async_pool_stats
+from app.core.background import background_tasks
+from app.core.config import settings
+from app.core.database import get_pool_stats
+from app.core.identity_cache import identity_cache
+from app.core.instrumentation import query_stats
+from app.core.security import password_hasher
+from app.services.account_service import negative_email_cache
+from app.services.grading_queue import contar_jobs_por_status, grading_queue
+from app.services.leaderboard_service import leaderboard
+from app.services import ranking_area_service
+from app.services import ranking_mensal_service
+from app.services.ranking_periodo_service import ranking_periodo
+from app.services import regrade_service
+from app.services.similarity_index import similarity_index
+
+router = APIRouter(dependencies=[Depends(require_admin)])
+
+# ==================== PROCESSO ====================
+
+@router.get("/processo", response_model=Dict)
+def get_process_stats():
+    """Pools de conexão, hasher de senhas, fila de avaliação e tarefas em segundo plano deste processo"""
+    return {
+        "environment": settings.ENVIRONMENT,
+        "database_pool": get_pool_stats(),
+        "database_pool_async": get_async_pool_stats(),
+        "password_hasher": password_hasher.stats(),
+        "grading_queue": grading_queue.stats(),
+        "background_tasks": background_tasks.stats()
+    }
+
+# ==================== QUERIES ====================
+
+@router.get("/queries", response_model=Dict)
+def get_query_stats(
+    limit: int = Query(50, ge=1, le=500),
+    ordenar_por: str = Query("total_ms", pattern="^(total_ms|p50_ms|p95_ms|p99_ms|max_ms|count|slow)$")
+):
+    """
+    Agregados das queries executadas por este processo, por fingerprint
+    (contagem, tempo total, p50/p95/p99, linhas e endpoints que as executam)
+    """
+    return query_stats.snapshot(limit=limit, order_by=ordenar_por)
+
+@router.delete("/queries", response_model=Dict)
+def reset_query_stats():
+    """Zera os agregados de queries (ex.: antes de medir uma mudança)"""
+    query_stats.reset()
+    return {"message": "Estatísticas de queries zeradas"}
+
+# ==================== CACHES ====================
+
+@router.get("/cache/identidades", response_model=Dict)
+def get_identity_cache_stats():
+    """Hit rate do cache de identidade usado pelo get_current_user"""
+    return identity_cache.stats()
+
+@router.delete("/cache/identidades", response_model=Dict)
+def clear_identity_cache():
+    """Esvazia o cache de identidade deste processo"""
+    identity_cache.clear()
+    return {"message": "Cache de identidades limpo"}
+
+@router.get("/cache/emails-inexistentes", response_model=Dict)
+def get_negative_email_cache_stats():
+    """Cache negativo do login (emails sem conta)"""
+    return negative_email_cache.stats()
+
+# ==================== FILA DE AVALIAÇÃO ====================
+
+@router.get("/fila-avaliacao", response_model=Dict)
+async def get_grading_queue_stats():
+    """Jobs de avaliação por status (todos os processos) e contadores deste processo"""
+    return {
+        "jobs": await contar_jobs_por_status(),
+        "processo": grading_queue.stats()
+    }
+
+# ==================== RANKING EM MEMÓRIA ====================
+
+@router.get("/leaderboard", response_model=Dict)
+def get_leaderboard_stats():
+    """Estado do ranking global em memória deste processo (cargas, deltas, marca d'água)"""
+    return leaderboard.stats()
+
+@router.post("/leaderboard/recarregar", response_model=Dict)
+async def reload_leaderboard():
+    """Recarrega o ranking inteiro do banco agora"""
+    await leaderboard.recarregar()
+    return leaderboard.stats()
+
+@router.post("/ranking-mensal/reconstruir", response_model=Dict)
+async def rebuild_ranking_mensal(
+    ano: int = Query(..., ge=2000, le=2100),
+    mes: int = Query(..., ge=1, le=12)
+):
+    """
+    Recalcula os contadores de ranking_mensal de um mês a partir das soluções
+    aprovadas (carga inicial ou correção) e as posições
+    """
+    posicoes = await ranking_mensal_service.reconstruir_mes(ano, mes)
+    return {"message": f"ranking_mensal de {mes:02d}/{ano} reconstruído", "posicoes_alteradas": posicoes}
+
+@router.get("/ranking-periodo", response_model=Dict)
+def get_ranking_periodo_stats():
+    """Estado dos baldes diários do ranking dos últimos dias"""
+    return ranking_periodo.stats()
+
+@router.post("/ranking-periodo/recarregar", response_model=Dict)
+async def reload_ranking_periodo():
+    """Reconcilia agora os baldes diários com as soluções aprovadas"""
+    await ranking_periodo.recarregar()
+    return ranking_periodo.stats()
+
+@router.get("/ranking-area", response_model=Dict)
+def get_ranking_area_stats():
+    """Estado dos rankings por área em memória"""
+    return ranking_area_service.ranking_por_area.stats()
+
+@router.post("/ranking-area/reconstruir", response_model=Dict)
+async def rebuild_ranking_area():
+    """
+    Recalcula user_area_pontos a partir das soluções aprovadas (carga inicial
+    ou correção) e recarrega os rankings em memória
+    """
+    await ranking_area_service.reconstruir()
+    return ranking_area_service.ranking_por_area.stats()
+
+# ==================== SIMILARIDADE ====================
+
+@router.get("/similaridade", response_model=Dict)
+def get_similarity_stats():
+    """Índice de similaridade deste processo: análises reaproveitadas e alertas de plágio"""
+    return similarity_index.stats()
+
+@router.delete("/similaridade", response_model=Dict)
+def rebuild_similarity_index(problema_id: Optional[int] = Query(None)):
+    """Descarta o índice (de um problema ou todos); a próxima consulta o reconstrói do banco"""
+    similarity_index.descartar(problema_id)
+    return {"message": "Índice de similaridade descartado; será reconstruído sob demanda"}
+
+# ==================== REAVALIAÇÃO EM LOTE ====================
+
+class RegradeRequest(BaseModel):
+    problema_id: int
+    concorrencia: Optional[int] = Field(None, ge=1, le=32)
+
+
+def _regrade_http_error(e: regrade_service.RegradeError) -> HTTPException:
+    if isinstance(e, regrade_service.RegradeNaoEncontrado):
+        return HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=str(e))
+    return HTTPException(status_code=status.HTTP_409_CONFLICT, detail=str(e))
+
+@router.post("/regrade", response_model=Dict, status_code=status.HTTP_202_ACCEPTED)
+async def iniciar_regrade(dados: RegradeRequest):
+    """
+    Reavalia com a IA todas as soluções já avaliadas do problema, em segundo plano
+    Acompanhe o progresso em GET /admin/regrade/{run_id}
+    """
+    try:
+        execucao = await regrade_service.criar_execucao(dados.problema_id)
+        return await regrade_service.iniciar_em_segundo_plano(execucao['id'], dados.concorrencia)
+    except regrade_service.RegradeError as e:
+        raise _regrade_http_error(e)
+
+@router.get("/regrade/{run_id}", response_model=Dict)
+async def get_regrade(run_id: int):
+    """Progresso e checkpoint de uma reavaliação"""
+    try:
+        return await regrade_service.obter_execucao(run_id)
+    except regrade_service.RegradeError as e:
+        raise _regrade_http_error(e)
+
+@router.post("/regrade/{run_id}/retomar", response_model=Dict, status_code=status.HTTP_202_ACCEPTED)
+async def retomar_regrade(run_id: int, concorrencia: Optional[int] = Query(None, ge=1, le=32)):
+    """Retoma uma reavaliação pausada ou que falhou, a partir do último checkpoint"""
+    try:
+        return await regrade_service.iniciar_em_segundo_plano(run_id, concorrencia)
+    except regrade_service.RegradeError as e:
+        raise _regrade_http_error(e)
@@ -4,7 +4,7 @@ Endpoint de teste para IA (REMOVER EM PRODUÇÃO)
 from fastapi import APIRouter, Depends
 from typing import Dict
 from pydantic import BaseModel
-from app.services.ai_service import analisar_solucao, get_ai_service, get_cache_stats, clear_cache
+from app.services.ai_service import analisar_solucao, get_ai_service, get_cache_stats, get_hedging_stats, clear_cache
 
 router = APIRouter()
 
@@ -61,6 +61,8 @@ def get_providers_status():
         "providers": providers,
         "primary": service.primary_provider,
         "fallback": service.fallback_provider,
+        "routing_order": service.ordem_de_roteamento(),
+        "hedging": get_hedging_stats(),
         "total_available": sum(1 for p in providers.values() if p['available'])
     }
 
@@ -4,7 +4,15 @@ from pydantic import BaseModel, EmailStr, Field
 from typing import Optional
 from datetime import date, datetime, timedelta
 from app.core.database import get_db
-from app.core.security import hash_password, verify_password, create_access_token
+from app.core.async_database import get_async_db
+from app.core.security import hash_password_async, verify_password_async, create_access_token
+from app.core.identity_cache import invalidate_identity
+from app.services.account_service import (
+    TABELAS,
+    buscar_conta_por_email,
+    buscar_conta_por_token,
+    esquecer_email_inexistente
+)
 from app.schemas.auth import (
     UserRegister, 
     EmpresaRegister, 
@@ -25,28 +33,28 @@ router = APIRouter()
 async def register_user(
     user_data: UserRegister,
     background_tasks: BackgroundTasks,
-    cursor = Depends(get_db)
+    cursor = Depends(get_async_db)
 ):
     """Registrar novo usuário"""
     
     try:
         # Verificar se email já existe
-        cursor.execute(
+        await cursor.execute(
             "SELECT id FROM users WHERE email = %s",
             (user_data.email,)
         )
-        if cursor.fetchone():
+        if await cursor.fetchone():
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail="Email já cadastrado"
             )
         
         # Verificar se username já existe
-        cursor.execute(
+        await cursor.execute(
             "SELECT id FROM users WHERE username = %s",
             (user_data.username,)
         )
-        if cursor.fetchone():
+        if await cursor.fetchone():
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail="Username já está em uso"
@@ -55,8 +63,9 @@ async def register_user(
         # Gerar token de verificação
         verification_token = secrets.token_urlsafe(32)
         
-        # Hash da senha
-        senha_hash = hash_password(user_data.senha)
+        # Hash da senha (pool de hashing; a conexão volta ao pool enquanto isso)
+        await cursor.release()
+        senha_hash = await hash_password_async(user_data.senha)
         
         # Inserir usuário
         query = """
@@ -66,7 +75,7 @@ async def register_user(
         ) VALUES (%s, %s, %s, %s, %s, %s, %s, FALSE)
         """
         
-        cursor.execute(query, (
+        await cursor.execute(query, (
             user_data.nome,
             user_data.username,
             user_data.email,
@@ -77,6 +86,7 @@ async def register_user(
         ))
         
         user_id = cursor.lastrowid
+        esquecer_email_inexistente(user_data.email)
         
         # Enviar email de verificação (background)
         background_tasks.add_task(
@@ -108,7 +118,7 @@ async def register_user(
 async def register_empresa(
     empresa_data: EmpresaRegister,
     background_tasks: BackgroundTasks,
-    cursor = Depends(get_db)
+    cursor = Depends(get_async_db)
 ):
     """Registrar nova empresa"""
     
@@ -116,11 +126,11 @@ async def register_empresa(
         print(f"🔍 DEBUG - Dados da empresa recebidos: {empresa_data}")
         
         # Verificar se email já existe
-        cursor.execute(
+        await cursor.execute(
             "SELECT id FROM empresas WHERE email = %s",
             (empresa_data.email_corporativo,)
         )
-        if cursor.fetchone():
+        if await cursor.fetchone():
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail="Email já cadastrado"
@@ -128,11 +138,11 @@ async def register_empresa(
         
         # Verificar se NIF já existe (se fornecido)
         if empresa_data.nif:
-            cursor.execute(
+            await cursor.execute(
                 "SELECT id FROM empresas WHERE nif = %s",
                 (empresa_data.nif,)
             )
-            if cursor.fetchone():
+            if await cursor.fetchone():
                 raise HTTPException(
                     status_code=status.HTTP_400_BAD_REQUEST,
                     detail="NIF já cadastrado"
@@ -141,8 +151,9 @@ async def register_empresa(
         # Gerar token de verificação
         verification_token = secrets.token_urlsafe(32)
         
-        # Hash da senha
-        senha_hash = hash_password(empresa_data.senha)
+        # Hash da senha (pool de hashing; a conexão volta ao pool enquanto isso)
+        await cursor.release()
+        senha_hash = await hash_password_async(empresa_data.senha)
         
         print(f"🔍 DEBUG - Inserindo empresa no banco...")
         
@@ -154,7 +165,7 @@ async def register_empresa(
         ) VALUES (%s, %s, %s, %s, %s, %s, FALSE)
         """
         
-        cursor.execute(query, (
+        await cursor.execute(query, (
             empresa_data.nome_empresa,
             empresa_data.email_corporativo,
             senha_hash,
@@ -164,6 +175,7 @@ async def register_empresa(
         ))
         
         empresa_id = cursor.lastrowid
+        esquecer_email_inexistente(empresa_data.email_corporativo)
         
         print(f"✅ DEBUG - Empresa criada com ID: {empresa_id}")
         
@@ -196,83 +208,41 @@ async def register_empresa(
 # ==================== VERIFICAR EMAIL ====================
 
 @router.post("/verify-email", response_model=EmailVerificationResponse)
-def verify_email(
+async def verify_email(
     verification_data: EmailVerification,
-    cursor = Depends(get_db)
+    cursor = Depends(get_async_db)
 ):
     """Verificar email com token"""
     
-    token = verification_data.token
-    
-    # Buscar em usuários
-    cursor.execute(
-        "SELECT id, email, nome FROM users WHERE token_verificacao = %s",
-        (token,)
-    )
-    user = cursor.fetchone()
+    # Buscar em usuários e empresas numa única query
+    conta = await buscar_conta_por_token(cursor, verification_data.token)
     
-    if user:
-        # Verificar se já está verificado
-        cursor.execute(
-            "SELECT email_verificado FROM users WHERE id = %s",
-            (user['id'],)
-        )
-        user_status = cursor.fetchone()
-        
-        if user_status['email_verificado']:
-            return {
-                "message": "Email já verificado anteriormente",
-                "email_verificado": True
-            }
-        
-        # Atualizar usuário
-        cursor.execute(
-            "UPDATE users SET email_verificado = TRUE, token_verificacao = NULL WHERE id = %s",
-            (user['id'],)
+    if not conta:
+        # Token inválido
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Token de verificação inválido ou expirado"
         )
-        
-        return {
-            "message": f"Email verificado com sucesso! Bem-vindo, {user['nome']}!",
-            "email_verificado": True
-        }
-    
-    # Buscar em empresas
-    cursor.execute(
-        "SELECT id, email, nome FROM empresas WHERE token_verificacao = %s",
-        (token,)
-    )
-    empresa = cursor.fetchone()
     
-    if empresa:
-        # Verificar se já está verificado
-        cursor.execute(
-            "SELECT email_verificado FROM empresas WHERE id = %s",
-            (empresa['id'],)
-        )
-        empresa_status = cursor.fetchone()
-        
-        if empresa_status['email_verificado']:
-            return {
-                "message": "Email já verificado anteriormente",
-                "email_verificado": True
-            }
-        
-        # Atualizar empresa
-        cursor.execute(
-            "UPDATE empresas SET email_verificado = TRUE, token_verificacao = NULL WHERE id = %s",
-            (empresa['id'],)
-        )
-        
+    # Verificar se já está verificado
+    if conta['email_verificado']:
         return {
-            "message": f"Email verificado com sucesso! Bem-vindo, {empresa['nome']}!",
+            "message": "Email já verificado anteriormente",
             "email_verificado": True
         }
     
-    # Token inválido
-    raise HTTPException(
-        status_code=status.HTTP_400_BAD_REQUEST,
-        detail="Token de verificação inválido ou expirado"
+    # Atualizar usuário/empresa
+    await cursor.execute(
+        f"UPDATE {TABELAS[conta['tipo']]} SET email_verificado = TRUE, token_verificacao = NULL WHERE id = %s",
+        (conta['id'],)
     )
+    await cursor.release()
+    invalidate_identity(conta['tipo'], conta['id'])
+    
+    return {
+        "message": f"Email verificado com sucesso! Bem-vindo, {conta['nome']}!",
+        "email_verificado": True
+    }
 
 # ==================== REENVIAR EMAIL DE VERIFICAÇÃO ====================
 
@@ -341,102 +311,57 @@ async def resend_verification(
 # ==================== LOGIN ====================
 
 @router.post("/login", response_model=LoginResponse)
-def login(
+async def login(
     login_data: LoginRequest,  # Só recebe email e senha
-    cursor = Depends(get_db)
+    cursor = Depends(get_async_db)
 ):
     """
     Login para usuário ou empresa
+    Uma única query resolve o email nas duas tabelas; o argon2 roda no pool
+    de hashing (fora do event loop), sem conexão presa
     """
     
-    # 1️⃣ TENTAR BUSCAR NOS USUÁRIOS
-    cursor.execute(
-        "SELECT * FROM users WHERE email = %s",
-        (login_data.email,)
-    )
-    user = cursor.fetchone()
+    conta = await buscar_conta_por_email(cursor, login_data.email)
+    await cursor.release()
     
-    if user:
-        # ✅ ENCONTROU NOS USUÁRIOS
-        if not verify_password(login_data.senha, user['senha_hash']):
-            raise HTTPException(
-                status_code=status.HTTP_401_UNAUTHORIZED,
-                detail="Email ou senha incorretos"
-            )
-        
-        if not user['ativo']:
-            raise HTTPException(
-                status_code=status.HTTP_403_FORBIDDEN,
-                detail="Conta desativada"
-            )
-        
-        # Gerar token JWT
-        access_token = create_access_token(
-            data={
-                "sub": user['id'],
-                "email": user['email'],
-                "tipo": "user"  # ✅ Backend define
-            }
+    # NÃO ENCONTROU EM NENHUMA TABELA
+    if not conta:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Email ou senha incorretos"
         )
-        
-        return LoginResponse(
-            access_token=access_token,
-            token_type="bearer",
-            user=UserInfo(
-                user_id=user['id'],
-                nome=user['nome'],
-                email=user['email'],
-                tipo_usuario="user",  # ✅ Backend informa
-                email_verificado=user['email_verificado']
-            )
+    
+    if not await verify_password_async(login_data.senha, conta['senha_hash']):
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Email ou senha incorretos"
         )
     
-    # 2️⃣ SE NÃO ENCONTROU, TENTAR NAS EMPRESAS
-    cursor.execute(
-        "SELECT * FROM empresas WHERE email = %s",
-        (login_data.email,)
+    if not conta['ativo']:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Conta desativada"
+        )
+    
+    # Gerar token JWT
+    access_token = create_access_token(
+        data={
+            "sub": conta['id'],
+            "email": conta['email'],
+            "tipo": conta['tipo']  # ✅ Backend define
+        }
     )
-    empresa = cursor.fetchone()
     
-    if empresa:
-        # ✅ ENCONTROU NAS EMPRESAS
-        if not verify_password(login_data.senha, empresa['senha_hash']):
-            raise HTTPException(
-                status_code=status.HTTP_401_UNAUTHORIZED,
-                detail="Email ou senha incorretos"
-            )
-        
-        if not empresa['ativo']:
-            raise HTTPException(
-                status_code=status.HTTP_403_FORBIDDEN,
-                detail="Conta desativada"
-            )
-        
-        # Gerar token JWT
-        access_token = create_access_token(
-            data={
-                "sub": empresa['id'],
-                "email": empresa['email'],
-                "tipo": "empresa"  # ✅ Backend define
-            }
+    return LoginResponse(
+        access_token=access_token,
+        token_type="bearer",
+        user=UserInfo(
+            user_id=conta['id'],
+            nome=conta['nome'],
+            email=conta['email'],
+            tipo_usuario=conta['tipo'],  # ✅ Backend informa
+            email_verificado=conta['email_verificado']
         )
-        
-        return LoginResponse(
-            access_token=access_token,
-            token_type="bearer",
-            user=UserInfo(
-                user_id=empresa['id'],
-                nome=empresa['nome'],
-                email=empresa['email'],
-                tipo_usuario="empresa",  # ✅ Backend informa
-                email_verificado=empresa['email_verificado']
-            )
-        )
-    
-    # 3️⃣ NÃO ENCONTROU EM NENHUMA TABELA
-    raise HTTPException(
-        status_code=status.HTTP_401_UNAUTHORIZED,
-        detail="Email ou senha incorretos"
     )
 
 # ==================== LOGOUT ====================
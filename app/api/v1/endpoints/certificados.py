@@ -5,6 +5,7 @@ from pydantic import BaseModel
 from datetime import datetime
 from app.core.database import get_db
 from app.api.deps import get_current_user, get_current_empresa
+from app.utils.streaming import stream_json_rows
 
 router = APIRouter()
 
@@ -267,10 +268,9 @@ def verificar_certificado(
 
 @router.get("/empresa/emitidos", response_model=List[dict])
 def certificados_emitidos(
-    current_empresa = Depends(get_current_empresa),
-    cursor = Depends(get_db)
+    current_empresa = Depends(get_current_empresa)
 ):
-    """Listar certificados emitidos pela empresa logada"""
+    """Listar certificados emitidos pela empresa logada (streaming: sem limite de quantidade)"""
     
     query = """
     SELECT 
@@ -285,8 +285,7 @@ def certificados_emitidos(
     ORDER BY c.data_emissao DESC
     """
     
-    cursor.execute(query, (current_empresa['id'],))
-    return cursor.fetchall()
+    return stream_json_rows(query, (current_empresa['id'],))
 
 # ==================== ESTATÍSTICAS DE CERTIFICADOS ====================
 
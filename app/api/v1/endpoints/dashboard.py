@@ -1,14 +1,15 @@
 from fastapi import APIRouter, Depends
 from typing import Dict, List
-from app.core.database import get_db
+from app.core.database import get_read_db
 from app.api.deps import get_current_user, get_current_empresa
+from app.services import rank_service
 
 router = APIRouter()
 
 # ==================== DASHBOARD GERAL DA PLATAFORMA ====================
 
 @router.get("/stats", response_model=Dict)
-def get_platform_stats(cursor = Depends(get_db)):
+def get_platform_stats(cursor = Depends(get_read_db)):
     """
     Estatísticas gerais da plataforma (público)
     """
@@ -69,7 +70,7 @@ def get_platform_stats(cursor = Depends(get_db)):
 @router.get("/user/overview", response_model=Dict)
 def get_user_dashboard(
     current_user = Depends(get_current_user),
-    cursor = Depends(get_db)
+    cursor = Depends(get_read_db)
 ):
     """
     Dashboard completo do usuário logado
@@ -102,12 +103,7 @@ def get_user_dashboard(
     stats_solucoes = cursor.fetchone()
     
     # Posição no ranking global
-    cursor.execute("""
-        SELECT COUNT(*) + 1 as posicao_global
-        FROM users
-        WHERE pontos_totais > %s AND ativo = TRUE
-    """, (user_data['pontos_totais'],))
-    ranking = cursor.fetchone()
+    posicao_global = rank_service.posicao_global(cursor, current_user['id'])
     
     # Certificados obtidos
     cursor.execute("""
@@ -171,7 +167,7 @@ def get_user_dashboard(
             "pontos_totais": user_data['pontos_totais'],
             "nivel_atual": user_data['nivel_atual'],
             "patente": user_data['patente'],
-            "posicao_ranking": ranking['posicao_global'],
+            "posicao_ranking": posicao_global,
             "membro_desde": user_data['created_at']
         },
         "solucoes": {
@@ -193,7 +189,7 @@ def get_user_dashboard(
 @router.get("/empresa/overview", response_model=Dict)
 def get_empresa_dashboard(
     current_empresa = Depends(get_current_empresa),
-    cursor = Depends(get_db)
+    cursor = Depends(get_read_db)
 ):
     """
     Dashboard completo da empresa logada
@@ -341,7 +337,7 @@ def get_empresa_dashboard(
 @router.get("/stats/periodo", response_model=Dict)
 def get_stats_periodo(
     dias: int = 30,
-    cursor = Depends(get_db)
+    cursor = Depends(get_read_db)
 ):
     """
     Estatísticas da plataforma em um período específico
@@ -396,7 +392,7 @@ def get_stats_periodo(
 # ==================== ÁREAS MAIS POPULARES ====================
 
 @router.get("/stats/areas-populares", response_model=List[Dict])
-def get_areas_populares(cursor = Depends(get_db)):
+def get_areas_populares(cursor = Depends(get_read_db)):
     """
     Áreas mais populares da plataforma
     """
@@ -1,9 +1,11 @@
 from fastapi import APIRouter, Depends, HTTPException, status, Query, Body
 from typing import List, Optional
 from pydantic import BaseModel, EmailStr, Field, HttpUrl
-from app.core.database import get_db
+from app.core.database import get_db, get_read_db
+from app.core.async_database import get_async_db
 from app.api.deps import get_current_empresa, get_current_user
-from app.core.security import hash_password, verify_password
+from app.core.identity_cache import invalidate_identity
+from app.core.security import hash_password_async, verify_password_async
 
 router = APIRouter()
 
@@ -116,6 +118,10 @@ def update_my_profile(
     query = f"UPDATE empresas SET {', '.join(update_fields)} WHERE id = %s"
     cursor.execute(query, values)
     
+    # Commit antes de invalidar: outra requisição não recoloca o dado antigo no cache
+    cursor.release()
+    invalidate_identity('empresa', current_empresa['id'])
+    
     return {"message": "Perfil da empresa atualizado com sucesso!"}
 
 @router.get("/me/stats", response_model=EmpresaStats)
@@ -172,32 +178,33 @@ def get_my_stats(
     }
 
 @router.post("/me/change-password", response_model=dict)
-def change_password(
+async def change_password(
     password_data: PasswordChange,
     current_empresa = Depends(get_current_empresa),
-    cursor = Depends(get_db)
+    cursor = Depends(get_async_db)
 ):
     """Alterar senha da empresa"""
     
     # Buscar senha atual
-    cursor.execute(
+    await cursor.execute(
         "SELECT senha_hash FROM empresas WHERE id = %s",
         (current_empresa['id'],)
     )
     
-    empresa = cursor.fetchone()
+    empresa = await cursor.fetchone()
+    await cursor.release()
     
     # Verificar senha atual
-    if not verify_password(password_data.senha_atual, empresa['senha_hash']):
+    if not await verify_password_async(password_data.senha_atual, empresa['senha_hash']):
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Senha atual incorreta"
         )
     
     # Atualizar senha
-    nova_senha_hash = hash_password(password_data.senha_nova)
+    nova_senha_hash = await hash_password_async(password_data.senha_nova)
     
-    cursor.execute(
+    await cursor.execute(
         "UPDATE empresas SET senha_hash = %s WHERE id = %s",
         (nova_senha_hash, current_empresa['id'])
     )
@@ -216,12 +223,15 @@ def deactivate_account(
         (current_empresa['id'],)
     )
     
+    cursor.release()
+    invalidate_identity('empresa', current_empresa['id'])
+    
     return {"message": "Conta desativada. Entre em contato com o suporte para reativar."}
 
 @router.get("/top/ativas", response_model=List[dict])
 def get_top_empresas(
     limit: int = Query(10, le=50),
-    cursor = Depends(get_db)
+    cursor = Depends(get_read_db)
 ):
     """Top empresas mais ativas (mais problemas publicados)"""
     
@@ -247,7 +257,7 @@ def get_top_empresas(
     return cursor.fetchall()
 
 @router.get("/setores", response_model=List[str])
-def get_setores_disponiveis(cursor = Depends(get_db)):
+def get_setores_disponiveis(cursor = Depends(get_read_db)):
     """Listar setores de atuação disponíveis"""
     
     cursor.execute("""
@@ -267,7 +277,7 @@ def listar_empresas(
     setor: Optional[str] = None,
     limit: int = Query(50, le=100),
     offset: int = 0,
-    cursor = Depends(get_db)
+    cursor = Depends(get_read_db)
 ):
     """Listar empresas ativas na plataforma"""
     
@@ -303,7 +313,7 @@ def listar_empresas(
 @router.get("/{empresa_id}", response_model=EmpresaPublic)
 def get_empresa_profile(
     empresa_id: int,
-    cursor = Depends(get_db)
+    cursor = Depends(get_read_db)
 ):
     """Obter perfil público de uma empresa"""
     
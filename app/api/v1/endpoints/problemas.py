@@ -3,7 +3,7 @@ from fastapi import APIRouter, Depends, HTTPException, status, Query
 from typing import List, Optional
 from pydantic import BaseModel, Field
 from datetime import date
-from app.core.database import get_db
+from app.core.database import get_db, get_read_db
 from app.api.deps import get_current_user, get_current_empresa
 
 router = APIRouter()
@@ -110,7 +110,7 @@ def listar_problemas(
     status_problema: str = "ativo",
     limit: int = Query(50, le=100),
     offset: int = 0,
-    cursor = Depends(get_db)
+    cursor = Depends(get_read_db)
 ):
     """Listar problemas ativos com filtros"""
     
@@ -1,11 +1,65 @@
 #GET rankings
-from fastapi import APIRouter, Depends, Query
-from typing import List, Optional
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from typing import Callable, List, Optional
 from pydantic import BaseModel
-from app.core.database import get_db
+from app.core.config import settings
+from app.core.database import get_read_db
+from app.api.deps import get_current_user
+from app.services import rank_service
+from app.services.leaderboard_service import leaderboard
+from app.services.ranking_area_service import ranking_por_area
+from app.services.ranking_periodo_service import ranking_periodo
 
 router = APIRouter()
 
+def _com_dados_dos_usuarios(
+    cursor,
+    buscar_totais: Callable[[int], List[dict]],
+    limit: int,
+    colunas: str,
+    campos: dict
+) -> List[dict]:
+    """
+    Junta aos `buscar_totais(n)` primeiros totais (em ordem, com 'user_id') os
+    dados dos usuários ativos e numera as posições; `campos` renomeia os campos
+    do total na resposta
+
+    Rankings em memória guardam só os totais: um usuário desativado em outro
+    processo continua neles até a próxima sincronização. Faltando gente para
+    completar `limit`, busca mais totais (o dobro) e continua de onde parou
+    """
+    ranking: List[dict] = []
+    vistos, pedidos = 0, limit
+    while True:
+        totais = buscar_totais(pedidos)
+        novos = totais[vistos:]
+        if not novos:
+            return ranking
+
+        ids = [t['user_id'] for t in novos]
+        cursor.execute(f"""
+            SELECT {colunas}
+            FROM users
+            WHERE id IN ({', '.join(['%s'] * len(ids))}) AND ativo = TRUE
+        """, ids)
+        usuarios = {u['id']: u for u in cursor.fetchall()}
+
+        for total in novos:
+            usuario = usuarios.get(total['user_id'])
+            if usuario is None:
+                continue
+            ranking.append({
+                'posicao': len(ranking) + 1,
+                **usuario,
+                **{nome: total[campo] for campo, nome in campos.items()}
+            })
+            if len(ranking) >= limit:
+                return ranking
+
+        if len(totais) < pedidos:
+            return ranking
+        vistos, pedidos = len(totais), pedidos * 2
+
 # ==================== SCHEMAS ====================
 
 class RankingUser(BaseModel):
@@ -37,16 +91,19 @@ class RankingMensal(BaseModel):
 def get_ranking_global(
     limit: int = Query(100, le=500),
     offset: int = 0,
-    cursor = Depends(get_db)
+    cursor = Depends(get_read_db)
 ):
     """
     Ranking global de todos os usuários
     Ordenado por pontos totais
+    Servido pelo ranking em memória; a query só roda antes da primeira carga
     """
+    if leaderboard.carregado:
+        return leaderboard.pagina(offset, limit)
     
     query = """
     SELECT 
-        ROW_NUMBER() OVER (ORDER BY u.pontos_totais DESC) as posicao,
+        ROW_NUMBER() OVER (ORDER BY u.pontos_totais DESC, u.id) as posicao,
         u.id,
         u.nome,
         u.foto_perfil,
@@ -59,7 +116,7 @@ def get_ranking_global(
     LEFT JOIN solucoes s ON u.id = s.user_id AND s.status = 'aprovada'
     WHERE u.ativo = TRUE
     GROUP BY u.id
-    ORDER BY u.pontos_totais DESC
+    ORDER BY u.pontos_totais DESC, u.id
     LIMIT %s OFFSET %s
     """
     
@@ -72,38 +129,60 @@ def get_ranking_global(
 def get_ranking_por_area(
     area: str,
     limit: int = Query(50, le=200),
-    cursor = Depends(get_db)
+    cursor = Depends(get_read_db)
 ):
     """
     Ranking de usuários por área específica
     Baseado em soluções aprovadas em problemas dessa área
+    (totais de user_area_pontos, mantidos a cada aprovação)
     """
-    
-    query = """
-    SELECT 
-        ROW_NUMBER() OVER (ORDER BY SUM(s.pontos_ganhos) DESC) as posicao,
-        u.id,
-        u.nome,
-        u.foto_perfil,
-        u.pontos_totais,
-        u.nivel_atual,
-        u.patente,
-        SUM(s.pontos_ganhos) as pontos_area,
-        COUNT(DISTINCT s.id) as solucoes_area,
-        AVG(s.pontuacao_final) as media_pontuacao_area
-    FROM users u
-    INNER JOIN solucoes s ON u.id = s.user_id
-    INNER JOIN problemas p ON s.problema_id = p.id
-    WHERE u.ativo = TRUE 
-        AND s.status = 'aprovada'
-        AND p.area = %s
-    GROUP BY u.id
-    ORDER BY pontos_area DESC
-    LIMIT %s
+    colunas = "id, nome, foto_perfil, pontos_totais, nivel_atual, patente"
+    campos = {'pontos': 'pontos_area', 'solucoes': 'solucoes_area', 'media_pontuacao': 'media_pontuacao_area'}
+
+    if ranking_por_area.carregado:
+        return _com_dados_dos_usuarios(
+            cursor, lambda n: ranking_por_area.pagina(area, 0, n), limit, colunas, campos
+        )
+
+    # Leitura em ordem de idx_area_pontos
+    cursor.execute("""
+        SELECT uap.user_id, uap.pontos, uap.solucoes,
+               IF(uap.com_pontuacao > 0, uap.soma_pontuacao / uap.com_pontuacao, NULL) AS media_pontuacao
+        FROM user_area_pontos uap
+        INNER JOIN users u ON u.id = uap.user_id AND u.ativo = TRUE
+        WHERE uap.area = %s AND uap.solucoes > 0
+        ORDER BY uap.pontos DESC, uap.user_id
+        LIMIT %s
+    """, (area, limit))
+    totais = cursor.fetchall()
+    return _com_dados_dos_usuarios(cursor, lambda n: totais, limit, colunas, campos)
+
+@router.get("/por-area/{area}/minha-posicao", response_model=dict)
+def get_minha_posicao_na_area(
+    area: str,
+    current_user = Depends(get_current_user),
+    cursor = Depends(get_read_db)
+):
     """
-    
-    cursor.execute(query, (area, limit))
-    return cursor.fetchall()
+    Posição do usuário autenticado no ranking de uma área
+    """
+    posicao = rank_service.posicao_na_area(cursor, area, current_user['id'])
+    if posicao is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Você ainda não tem soluções aprovadas nesta área"
+        )
+    return posicao
+
+@router.get("/minhas-areas", response_model=List[dict])
+def get_minhas_areas(
+    current_user = Depends(get_current_user),
+    cursor = Depends(get_read_db)
+):
+    """
+    Posição do usuário autenticado em cada área em que pontuou
+    """
+    return rank_service.posicoes_por_area(cursor, current_user['id'])
 
 # ==================== RANKING MENSAL ====================
 
@@ -112,7 +191,7 @@ def get_ranking_mensal(
     mes: Optional[int] = None,
     ano: Optional[int] = None,
     limit: int = Query(100, le=500),
-    cursor = Depends(get_db)
+    cursor = Depends(get_read_db)
 ):
     """
     Ranking mensal baseado em pontos ganhos no mês
@@ -126,9 +205,10 @@ def get_ranking_mensal(
         mes = now.month
         ano = now.year
     
+    # Leitura em ordem do idx_ranking (ano, mes, pontos_mes DESC, id): para no LIMIT.
+    # A posição é a ordem da leitura (mesmo critério do posicao_ranking gravado)
     query = """
     SELECT 
-        ROW_NUMBER() OVER (ORDER BY rm.pontos_mes DESC) as posicao,
         u.id,
         u.nome,
         u.foto_perfil,
@@ -138,49 +218,81 @@ def get_ranking_mensal(
         rm.ano
     FROM ranking_mensal rm
     INNER JOIN users u ON rm.user_id = u.id
-    WHERE rm.mes = %s AND rm.ano = %s AND u.ativo = TRUE
-    ORDER BY rm.pontos_mes DESC
+    WHERE rm.ano = %s AND rm.mes = %s AND u.ativo = TRUE
+    ORDER BY rm.pontos_mes DESC, rm.id
     LIMIT %s
     """
     
-    cursor.execute(query, (mes, ano, limit))
-    return cursor.fetchall()
+    cursor.execute(query, (ano, mes, limit))
+    return [
+        {'posicao': posicao, **linha}
+        for posicao, linha in enumerate(cursor.fetchall(), start=1)
+    ]
 
 # ==================== RANKING SEMANAL ====================
 
+def _ranking_periodo(cursor, dias: int, limit: int) -> List[dict]:
+    """
+    Usuários com mais pontos em soluções aprovadas desde
+    DATE_SUB(CURDATE(), INTERVAL dias DAY); empate pelo menor id
+    Soma os baldes diários em memória e busca só os dados dos usuários listados
+    """
+    if not ranking_periodo.carregado:
+        cursor.execute("""
+        SELECT 
+            ROW_NUMBER() OVER (ORDER BY SUM(s.pontos_ganhos) DESC, u.id) as posicao,
+            u.id,
+            u.nome,
+            u.foto_perfil,
+            u.pontos_totais,
+            u.patente,
+            SUM(s.pontos_ganhos) as pontos_periodo,
+            COUNT(DISTINCT s.id) as solucoes_periodo,
+            AVG(s.pontuacao_final) as media_pontuacao
+        FROM users u
+        INNER JOIN solucoes s ON u.id = s.user_id
+        WHERE u.ativo = TRUE 
+            AND s.status = 'aprovada'
+            AND s.data_avaliacao >= DATE_SUB(CURDATE(), INTERVAL %s DAY)
+        GROUP BY u.id
+        ORDER BY pontos_periodo DESC, u.id
+        LIMIT %s
+        """, (dias, limit))
+        return cursor.fetchall()
+
+    return _com_dados_dos_usuarios(cursor, lambda n: ranking_periodo.totais(dias, n), limit, "id, nome, foto_perfil, pontos_totais, patente", {
+        'pontos': 'pontos_periodo', 'solucoes': 'solucoes_periodo', 'media_pontuacao': 'media_pontuacao'
+    })
+
+
 @router.get("/semanal", response_model=List[dict])
 def get_ranking_semanal(
     limit: int = Query(50, le=200),
-    cursor = Depends(get_db)
+    cursor = Depends(get_read_db)
 ):
     """
     Ranking dos últimos 7 dias
     Baseado em soluções aprovadas na última semana
     """
-    
-    query = """
-    SELECT 
-        ROW_NUMBER() OVER (ORDER BY SUM(s.pontos_ganhos) DESC) as posicao,
-        u.id,
-        u.nome,
-        u.foto_perfil,
-        u.pontos_totais,
-        u.patente,
-        SUM(s.pontos_ganhos) as pontos_semana,
-        COUNT(DISTINCT s.id) as solucoes_semana,
-        AVG(s.pontuacao_final) as media_pontuacao
-    FROM users u
-    INNER JOIN solucoes s ON u.id = s.user_id
-    WHERE u.ativo = TRUE 
-        AND s.status = 'aprovada'
-        AND s.data_avaliacao >= DATE_SUB(CURDATE(), INTERVAL 7 DAY)
-    GROUP BY u.id
-    ORDER BY pontos_semana DESC
-    LIMIT %s
+    return [
+        {
+            **{k: v for k, v in linha.items() if k not in ('pontos_periodo', 'solucoes_periodo')},
+            'pontos_semana': linha['pontos_periodo'],
+            'solucoes_semana': linha['solucoes_periodo']
+        }
+        for linha in _ranking_periodo(cursor, 7, limit)
+    ]
+
+@router.get("/ultimos-dias", response_model=List[dict])
+def get_ranking_ultimos_dias(
+    dias: int = Query(7, ge=1, le=settings.RANKING_JANELA_DIAS),
+    limit: int = Query(50, le=200),
+    cursor = Depends(get_read_db)
+):
     """
-    
-    cursor.execute(query, (limit,))
-    return cursor.fetchall()
+    Ranking de um período curto (soluções aprovadas nos últimos `dias` dias)
+    """
+    return _ranking_periodo(cursor, dias, limit)
 
 # ==================== RANKING POR PATENTE ====================
 
@@ -188,7 +300,7 @@ def get_ranking_semanal(
 def get_ranking_por_patente(
     patente: str,
     limit: int = Query(50, le=200),
-    cursor = Depends(get_db)
+    cursor = Depends(get_read_db)
 ):
     """
     Ranking de usuários dentro de uma patente específica
@@ -228,25 +340,16 @@ def get_ranking_por_patente(
 # ==================== MINHA POSIÇÃO NO RANKING ====================
 
 @router.get("/minha-posicao", response_model=dict)
-def get_minha_posicao(cursor = Depends(get_db)):
+def get_minha_posicao(
+    current_user = Depends(get_current_user),
+    cursor = Depends(get_read_db)
+):
     """
     Obter posição do usuário logado em diversos rankings
     """
-    from app.api.deps import get_current_user
-    from fastapi import Depends as FastAPIDepends
-    
-    current_user = FastAPIDepends(get_current_user)
     
     # Posição global
-    cursor.execute("""
-        SELECT COUNT(*) + 1 as posicao_global
-        FROM users
-        WHERE pontos_totais > (
-            SELECT pontos_totais FROM users WHERE id = %s
-        ) AND ativo = TRUE
-    """, (current_user['id'],))
-    
-    global_rank = cursor.fetchone()
+    posicao_global = rank_service.posicao_global(cursor, current_user['id'])
     
     # Posição mensal
     from datetime import datetime
@@ -270,7 +373,7 @@ def get_minha_posicao(cursor = Depends(get_db)):
     user_data = cursor.fetchone()
     
     return {
-        "posicao_global": global_rank['posicao_global'],
+        "posicao_global": posicao_global,
         "posicao_mensal": mensal_rank['posicao_ranking'] if mensal_rank else None,
         "pontos_totais": user_data['pontos_totais'],
         "pontos_mes": mensal_rank['pontos_mes'] if mensal_rank else 0,
@@ -278,10 +381,28 @@ def get_minha_posicao(cursor = Depends(get_db)):
         "patente": user_data['patente']
     }
 
+@router.get("/ao-redor", response_model=dict)
+def get_ranking_ao_redor(
+    k: int = Query(5, ge=1, le=50),
+    current_user = Depends(get_current_user),
+    cursor = Depends(get_read_db)
+):
+    """
+    Posição do usuário logado no ranking global e os `k` usuários
+    imediatamente acima e abaixo dele
+    """
+    resultado = rank_service.ao_redor(cursor, current_user['id'], k)
+    if resultado is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Usuário fora do ranking (conta inativa)"
+        )
+    return resultado
+
 # ==================== TOP PERFORMERS ====================
 
 @router.get("/top-performers", response_model=dict)
-def get_top_performers(cursor = Depends(get_db)):
+def get_top_performers(cursor = Depends(get_read_db)):
     """
     Estatísticas dos top performers da plataforma
     """
@@ -339,7 +460,7 @@ def get_top_performers(cursor = Depends(get_db)):
 # ==================== ESTATÍSTICAS GERAIS ====================
 
 @router.get("/estatisticas", response_model=dict)
-def get_estatisticas_ranking(cursor = Depends(get_db)):
+def get_estatisticas_ranking(cursor = Depends(get_read_db)):
     """
     Estatísticas gerais dos rankings
     """
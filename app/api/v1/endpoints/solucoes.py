@@ -1,10 +1,14 @@
 # CRUD e soluções + avaliações AI
 from fastapi import APIRouter, Depends, HTTPException, status, Body
-from typing import List, Optional
+from typing import List, Literal, Optional
 from pydantic import BaseModel, Field
 from app.core.database import get_db
+from app.core.async_database import get_async_db
 from app.api.deps import get_current_user, get_current_empresa
-import json
+from app.services.grading_queue import enfileirar_avaliacao, grading_queue
+from app.services import ranking_area_service
+from app.services.pontuacao_service import creditar_pontos
+from app.utils.streaming import stream_json_rows
 
 router = APIRouter()
 
@@ -29,9 +33,13 @@ class SolucaoResponse(BaseModel):
     feedback_ai: Optional[str] = None
 
 class AvaliacaoManual(BaseModel):
-    """Schema para avaliação manual pela empresa"""
+    """
+    Schema para avaliação manual pela empresa
+    `decisao` encerra uma solução em 'revisao' (alerta de plágio ou falha da IA)
+    """
     avaliacao: str = Field(..., min_length=10)
     pontuacao: float = Field(..., ge=0, le=100)
+    decisao: Optional[Literal['aprovada', 'reprovada']] = None
 
 # ==================== SUBMETER SOLUÇÃO ====================
 
@@ -39,16 +47,16 @@ class AvaliacaoManual(BaseModel):
 async def submeter_solucao(
     solucao: SolucaoCreate,
     current_user = Depends(get_current_user),
-    cursor = Depends(get_db)
+    cursor = Depends(get_async_db)
 ):
     """Submeter solução para um problema"""
     
     # Verificar se problema existe e está ativo
-    cursor.execute(
+    await cursor.execute(
         "SELECT * FROM problemas WHERE id = %s AND status = 'ativo'",
         (solucao.problema_id,)
     )
-    problema = cursor.fetchone()
+    problema = await cursor.fetchone()
     
     if not problema:
         raise HTTPException(
@@ -57,12 +65,12 @@ async def submeter_solucao(
         )
     
     # Verificar se usuário já submeteu solução para este problema
-    cursor.execute(
+    await cursor.execute(
         "SELECT id FROM solucoes WHERE user_id = %s AND problema_id = %s",
         (current_user['id'], solucao.problema_id)
     )
     
-    if cursor.fetchone():
+    if await cursor.fetchone():
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Você já submeteu uma solução para este problema"
@@ -76,7 +84,7 @@ async def submeter_solucao(
     ) VALUES (%s, %s, %s, %s, %s, 'em_analise')
     """
     
-    cursor.execute(query, (
+    await cursor.execute(query, (
         solucao.problema_id,
         current_user['id'],
         solucao.descricao_solucao,
@@ -85,77 +93,26 @@ async def submeter_solucao(
     ))
     
     solucao_id = cursor.lastrowid
-    
-    # ========== ANÁLISE POR AI (Assíncrono) ==========
-    try:
-        from app.services.ai_service import analisar_solucao
-        
-        # Analisar com AI
-        analise = await analisar_solucao(
-            problema=problema,
-            solucao_texto=solucao.descricao_solucao
-        )
-        
-        # Atualizar solução com análise da AI
-        update_query = """
-        UPDATE solucoes SET
-            analise_ai = %s,
-            pontuacao_ai = %s,
-            feedback_ai = %s,
-            pontos_ganhos = %s,
-            pontuacao_final = %s,
-            status = %s,
-            data_avaliacao = NOW()
-        WHERE id = %s
-        """
-        
-        status_final = 'aprovada' if analise['pontuacao'] >= 60 else 'reprovada'
-        pontos = problema['pontos_recompensa'] if status_final == 'aprovada' else 0
-        
-        cursor.execute(update_query, (
-            json.dumps(analise),
-            analise['pontuacao'],
-            analise['feedback'],
-            pontos,
-            analise['pontuacao'],
-            status_final,
-            solucao_id
-        ))
-        
-        # Atualizar pontos do usuário se aprovado
-        if status_final == 'aprovada':
-            cursor.execute("""
-                UPDATE users 
-                SET pontos_totais = pontos_totais + %s
-                WHERE id = %s
-            """, (pontos, current_user['id']))
-        
-        return {
-            "message": "Solução submetida e avaliada com sucesso!",
-            "solucao_id": solucao_id,
-            "status": status_final,
-            "pontuacao": analise['pontuacao'],
-            "pontos_ganhos": pontos,
-            "feedback": analise['feedback']
-        }
-        
-    except Exception as e:
-        # Se AI falhar, apenas marca como pendente de análise
-        print(f"Erro na análise AI: {e}")
-        return {
-            "message": "Solução submetida! Aguardando análise.",
-            "solucao_id": solucao_id,
-            "status": "em_analise"
-        }
+
+    # A avaliação por IA roda na fila (workers em segundo plano): a resposta
+    # não espera o LLM nem segura conexão/transação durante a análise
+    await enfileirar_avaliacao(cursor, solucao_id)
+    await cursor.release()
+    grading_queue.notify()
+
+    return {
+        "message": "Solução submetida! A avaliação por IA está em andamento.",
+        "solucao_id": solucao_id,
+        "status": "em_analise"
+    }
 
 # ==================== MINHAS SOLUÇÕES ====================
 
 @router.get("/minhas-solucoes", response_model=List[dict])
 def minhas_solucoes(
-    current_user = Depends(get_current_user),
-    cursor = Depends(get_db)
+    current_user = Depends(get_current_user)
 ):
-    """Listar soluções do usuário logado"""
+    """Listar soluções do usuário logado (streaming: sem limite de quantidade)"""
     
     # 🔥 CORREÇÃO: Usar e.nome ao invés de e.nome_empresa
     query = """
@@ -172,8 +129,7 @@ def minhas_solucoes(
     ORDER BY s.data_submissao DESC
     """
     
-    cursor.execute(query, (current_user['id'],))
-    return cursor.fetchall()
+    return stream_json_rows(query, (current_user['id'],))
 
 # ==================== DETALHES DA SOLUÇÃO ====================
 
@@ -231,6 +187,63 @@ def get_solucao(
     
     return solucao
 
+# ==================== STATUS DA AVALIAÇÃO ====================
+
+@router.get("/{solucao_id}/status", response_model=dict)
+def get_status_avaliacao(
+    solucao_id: int,
+    current_user = Depends(get_current_user),
+    cursor = Depends(get_db)
+):
+    """
+    Status da avaliação por IA (para o cliente consultar após submeter)
+    `avaliacao` mostra o job na fila: pendente, processando, concluido ou falhou
+    """
+    cursor.execute("""
+        SELECT
+            s.id, s.user_id, s.status, s.pontuacao_final, s.pontos_ganhos,
+            s.feedback_ai, s.data_submissao, s.data_avaliacao,
+            p.empresa_id,
+            j.status AS job_status, j.tentativas, j.proxima_tentativa_em
+        FROM solucoes s
+        INNER JOIN problemas p ON s.problema_id = p.id
+        LEFT JOIN solucoes_jobs j ON j.solucao_id = s.id
+        WHERE s.id = %s
+    """, (solucao_id,))
+    solucao = cursor.fetchone()
+
+    if not solucao:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Solução não encontrada"
+        )
+
+    dono = (
+        (current_user['tipo_usuario'] == 'user' and solucao['user_id'] == current_user['id']) or
+        (current_user['tipo_usuario'] == 'empresa' and solucao['empresa_id'] == current_user['id'])
+    )
+    if not dono:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Você não tem permissão para ver esta solução"
+        )
+
+    return {
+        "solucao_id": solucao['id'],
+        "status": solucao['status'],
+        "avaliada": solucao['status'] != 'em_analise',
+        "pontuacao": solucao['pontuacao_final'],
+        "pontos_ganhos": solucao['pontos_ganhos'],
+        "feedback": solucao['feedback_ai'],
+        "data_submissao": solucao['data_submissao'],
+        "data_avaliacao": solucao['data_avaliacao'],
+        "avaliacao": {
+            "status": solucao['job_status'],
+            "tentativas": solucao['tentativas'],
+            "proxima_tentativa_em": solucao['proxima_tentativa_em']
+        }
+    }
+
 # ==================== SOLUÇÕES DE UM PROBLEMA (EMPRESA) ====================
 
 @router.get("/problema/{problema_id}/solucoes", response_model=List[dict])
@@ -269,29 +282,34 @@ def solucoes_do_problema(
     ORDER BY s.pontuacao_final DESC, s.data_submissao ASC
     """
     
-    cursor.execute(query, (problema_id,))
-    return cursor.fetchall()
+    # A permissão já foi verificada: devolve a conexão antes de abrir o stream
+    cursor.release()
+    return stream_json_rows(query, (problema_id,))
 
 # ==================== AVALIAR MANUALMENTE (EMPRESA) ====================
 
 @router.patch("/{solucao_id}/avaliar", response_model=dict)
-def avaliar_solucao(
+async def avaliar_solucao(
     solucao_id: int,
     avaliacao_data: AvaliacaoManual = Body(...),
     current_empresa = Depends(get_current_empresa),
-    cursor = Depends(get_db)
+    cursor = Depends(get_async_db)
 ):
-    """Empresa pode adicionar avaliação manual (complementar à AI)"""
+    """
+    Empresa pode adicionar avaliação manual (complementar à AI)
+    Para soluções em 'revisao', `decisao` aprova (credita os pontos) ou reprova
+    """
     
-    # Verificar permissões
-    cursor.execute("""
-        SELECT s.*, p.empresa_id, p.pontos_recompensa
+    # Verificar permissões (FOR UPDATE: duas decisões simultâneas não creditam duas vezes)
+    await cursor.execute("""
+        SELECT s.*, p.empresa_id, p.pontos_recompensa, p.area
         FROM solucoes s
         INNER JOIN problemas p ON s.problema_id = p.id
         WHERE s.id = %s
+        FOR UPDATE
     """, (solucao_id,))
     
-    solucao = cursor.fetchone()
+    solucao = await cursor.fetchone()
     
     if not solucao or solucao['empresa_id'] != current_empresa['id']:
         raise HTTPException(
@@ -299,6 +317,14 @@ def avaliar_solucao(
             detail="Sem permissão"
         )
     
+    if avaliacao_data.decisao is not None and solucao['status'] != 'revisao':
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="Só soluções em revisão aceitam decisão da empresa"
+        )
+    
+    pontuacao_final = ((solucao['pontuacao_ai'] or 0) + avaliacao_data.pontuacao) / 2
+    
     # Atualizar com avaliação da empresa
     query = """
     UPDATE solucoes SET
@@ -308,11 +334,38 @@ def avaliar_solucao(
     WHERE id = %s
     """
     
-    cursor.execute(query, (
+    await cursor.execute(query, (
         avaliacao_data.avaliacao, 
         avaliacao_data.pontuacao, 
         avaliacao_data.pontuacao, 
         solucao_id
     ))
     
-    return {"message": "Avaliação registrada com sucesso!"}
\ No newline at end of file
+    # Nota de solução já aprovada: a média da área (user_area_pontos) muda junto
+    if solucao['status'] == 'aprovada':
+        await ranking_area_service.recalcular(cursor, area=solucao['area'], user_ids=[solucao['user_id']])
+    
+    if avaliacao_data.decisao is None:
+        return {"message": "Avaliação registrada com sucesso!"}
+    
+    # Decisão sobre solução em revisão: os pontos passam pelo mesmo crédito da fila de avaliação
+    pontos = solucao['pontos_recompensa'] if avaliacao_data.decisao == 'aprovada' else 0
+    await cursor.execute("""
+        UPDATE solucoes SET
+            status = %s,
+            pontos_ganhos = %s,
+            data_avaliacao = NOW()
+        WHERE id = %s AND status = 'revisao'
+    """, (avaliacao_data.decisao, pontos, solucao_id))
+    
+    if cursor.rowcount == 1 and avaliacao_data.decisao == 'aprovada':
+        await creditar_pontos(
+            cursor, solucao['user_id'], pontos,
+            solucao_id=solucao_id, pontuacao=pontuacao_final
+        )
+    
+    return {
+        "message": "Avaliação registrada com sucesso!",
+        "status": avaliacao_data.decisao,
+        "pontos_ganhos": pontos
+    }
@@ -4,7 +4,12 @@ from typing import List, Optional
 from pydantic import BaseModel, EmailStr, Field
 from datetime import date
 from app.core.database import get_db
+from app.core.async_database import get_async_db
 from app.api.deps import get_current_user, get_current_active_user
+from app.core.identity_cache import invalidate_identity
+from app.services.leaderboard_service import leaderboard
+from app.services.ranking_area_service import ranking_por_area
+from app.services import rank_service
 
 router = APIRouter()
 
@@ -169,6 +174,10 @@ def update_my_profile(
     query = f"UPDATE users SET {', '.join(update_fields)} WHERE id = %s"
     cursor.execute(query, values)
     
+    # Commit antes de invalidar: outra requisição não recoloca o dado antigo no cache
+    cursor.release()
+    invalidate_identity('user', current_user['id'])
+    
     return {"message": "Perfil atualizado com sucesso!"}
 
 # ==================== ESTATÍSTICAS DO USUÁRIO ====================
@@ -204,13 +213,7 @@ def get_my_stats(
     user_data = cursor.fetchone()
     
     # Posição no ranking
-    cursor.execute("""
-        SELECT COUNT(*) + 1 as posicao
-        FROM users
-        WHERE pontos_totais > %s AND ativo = TRUE
-    """, (user_data['pontos_totais'],))
-    
-    ranking = cursor.fetchone()
+    posicao = rank_service.posicao_global(cursor, current_user['id'])
     
     # Certificados obtidos
     cursor.execute("""
@@ -230,7 +233,7 @@ def get_my_stats(
         "nivel_atual": user_data['nivel_atual'],
         "patente": user_data['patente'],
         "media_pontuacao": float(stats_solucoes['media_pontuacao']) if stats_solucoes['media_pontuacao'] else None,
-        "ranking_posicao": ranking['posicao'],
+        "ranking_posicao": posicao,
         "certificados_obtidos": certificados['total_certificados']
     }
 
@@ -306,34 +309,35 @@ def remove_habilidade(
 # ==================== MUDAR SENHA ====================
 
 @router.post("/me/change-password", response_model=dict)
-def change_password(
+async def change_password(
     password_data: PasswordChange,
     current_user = Depends(get_current_user),
-    cursor = Depends(get_db)
+    cursor = Depends(get_async_db)
 ):
     """Alterar senha do usuário"""
     
-    from app.core.security import verify_password, hash_password
+    from app.core.security import verify_password_async, hash_password_async
     
     # Buscar senha atual
-    cursor.execute(
+    await cursor.execute(
         "SELECT senha_hash FROM users WHERE id = %s",
         (current_user['id'],)
     )
     
-    user = cursor.fetchone()
+    user = await cursor.fetchone()
+    await cursor.release()
     
     # Verificar senha atual
-    if not verify_password(password_data.senha_atual, user['senha_hash']):
+    if not await verify_password_async(password_data.senha_atual, user['senha_hash']):
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Senha atual incorreta"
         )
     
     # Atualizar senha
-    nova_senha_hash = hash_password(password_data.senha_nova)
+    nova_senha_hash = await hash_password_async(password_data.senha_nova)
     
-    cursor.execute(
+    await cursor.execute(
         "UPDATE users SET senha_hash = %s WHERE id = %s",
         (nova_senha_hash, current_user['id'])
     )
@@ -406,6 +410,11 @@ def deactivate_account(
         (current_user['id'],)
     )
     
+    cursor.release()
+    invalidate_identity('user', current_user['id'])
+    leaderboard.remover_usuario(current_user['id'])
+    ranking_por_area.remover_usuario(current_user['id'])
+    
     return {"message": "Conta desativada com sucesso. Entre em contato com o suporte para reativar."}
 
 # ==================== PERFIL PÚBLICO ====================
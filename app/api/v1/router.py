@@ -1,6 +1,6 @@
 # Router principal V1
 from fastapi import APIRouter
-from app.api.v1.endpoints import ai_test, auth, user, problemas, solucoes, ranking, empresas
+from app.api.v1.endpoints import admin, ai_test, auth, user, problemas, solucoes, ranking, empresas
 
 # Router principal da API v1
 api_router = APIRouter()
@@ -12,6 +12,7 @@ api_router.include_router(empresas.router, prefix="/empresas", tags=["Empresas"]
 api_router.include_router(problemas.router, prefix="/problemas", tags=["Problemas"])
 api_router.include_router(solucoes.router, prefix="/solucoes", tags=["Soluções"])
 api_router.include_router(ranking.router, prefix="/ranking", tags=["Rankings"])
+api_router.include_router(admin.router, prefix="/admin", tags=["Administração"])
 
 # Endpoint de teste de IA (REMOVER EM PRODUÇÃO)
 api_router.include_router(ai_test.router, prefix="/ai-test", tags=["🤖 Testes de IA"])
\ No newline at end of file
@@ -0,0 +1,3 @@
+"""
+Comandos de linha de comando (python -m app.cli.<comando>)
+"""
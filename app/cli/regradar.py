@@ -0,0 +1,52 @@
+"""
+Reavaliação em lote das soluções de um problema, pela linha de comando
+
+Cada página gravada atualiza o checkpoint em regrade_runs: se o comando for
+interrompido (Ctrl+C, deploy), retome com --retomar <id da execução>.
+
+Uso:
+    python -m app.cli.regradar --problema 12
+    python -m app.cli.regradar --retomar 3 --concorrencia 8 --lote 100
+"""
+import argparse
+import asyncio
+import sys
+from app.core.async_database import AsyncDatabase
+from app.services.regrade_service import RegradeError, criar_execucao, executar_regrade
+
+
+async def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    alvo = parser.add_mutually_exclusive_group(required=True)
+    alvo.add_argument("--problema", type=int, help="Reavaliar as soluções deste problema")
+    alvo.add_argument("--retomar", type=int, metavar="RUN_ID", help="Retomar uma execução interrompida")
+    parser.add_argument("--concorrencia", type=int, default=None)
+    parser.add_argument("--lote", type=int, default=None)
+    args = parser.parse_args()
+
+    try:
+        if args.retomar is not None:
+            run_id = args.retomar
+        else:
+            execucao = await criar_execucao(args.problema, iniciado_por="cli")
+            run_id = execucao['id']
+            print(f"📋 Execução {run_id}: {execucao['total']} soluções do problema {args.problema}")
+
+        resultado = await executar_regrade(run_id, concorrencia=args.concorrencia, lote=args.lote)
+    except RegradeError as e:
+        print(f"❌ {e}")
+        return 1
+    finally:
+        await AsyncDatabase.close_pool()
+
+    print(f"✅ Execução {run_id} concluída: {resultado['atualizadas']} atualizadas, "
+          f"{resultado['erros']} erros (de {resultado['processadas']})")
+    return 0
+
+
+if __name__ == "__main__":
+    try:
+        sys.exit(asyncio.run(main()))
+    except KeyboardInterrupt:
+        print("\n⏸️ Interrompido: retome com --retomar <id da execução>")
+        sys.exit(130)
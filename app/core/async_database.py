@@ -0,0 +1,305 @@
+"""
+Acesso assíncrono ao banco de dados
+Para endpoints `async def`: as queries não bloqueiam o event loop do worker
+"""
+import time
+from contextlib import asynccontextmanager
+from typing import Any, AsyncGenerator, Callable, Dict, List, Optional
+from fastapi import Request
+from mysql.connector import Error
+from starlette.concurrency import run_in_threadpool
+from app.core.config import settings
+from app.core.database import Database, LazyCursor, is_write_statement
+from app.core.instrumentation import record_query
+from app.core.replicas import identity_from_request
+from app.core.pool import AsyncConnectionPool, PooledConnection
+
+try:
+    from mysql.connector import aio as mysql_aio
+except ImportError:  # mysql-connector-python < 9.0
+    mysql_aio = None
+
+
+# ==================== ADAPTERS DE CURSOR ====================
+
+class AsyncCursor:
+    """
+    Cursor assíncrono com a mesma interface do cursor de `get_db`
+    (execute/fetchone/fetchall/lastrowid/rowcount), apenas com `await`
+
+    Migrar um endpoint = trocar `Depends(get_db)` por `Depends(get_async_db)`
+    e colocar `await` antes de execute/fetch*.
+
+    Como o LazyCursor, só pega conexão do pool no primeiro execute e pode
+    devolvê-la com `await cursor.release()` antes de esperas longas.
+
+    Estado em memória que depende da transação (rankings, caches) é publicado
+    com `after_commit`: roda só se o commit acontecer.
+    """
+
+    def __init__(self, pool: AsyncConnectionPool, dictionary=True):
+        self._pool = pool
+        self._dictionary = dictionary
+        self._pooled: Optional[PooledConnection] = None
+        self._cursor: Any = None
+        self._lastrowid: Optional[int] = None
+        self._rowcount: int = -1
+        self._apos_commit: List[Callable[[], Any]] = []
+        self.wrote = False
+
+    @property
+    def connected(self) -> bool:
+        """True se há uma conexão do pool presa a este cursor"""
+        return self._pooled is not None
+
+    def after_commit(self, callback: Callable[[], Any]):
+        """Agenda `callback` para depois do commit da transação atual (descartado no rollback)"""
+        self._apos_commit.append(callback)
+
+    def _publicar(self, commit: bool):
+        callbacks, self._apos_commit = self._apos_commit, []
+        if not commit:
+            return
+        for callback in callbacks:
+            try:
+                callback()
+            except Exception as e:
+                print(f"⚠️ Callback pós-commit falhou: {e}")
+
+    async def _ensure_cursor(self):
+        if self._cursor is None:
+            self._pooled = await self._pool.acquire()
+            try:
+                self._cursor = await self._pooled.raw.cursor(
+                    dictionary=self._dictionary, buffered=True
+                )
+            except Exception:
+                await self._pool.discard(self._pooled)
+                self._pooled = None
+                raise
+        return self._cursor
+
+    async def execute(self, query: str, params: Any = None):
+        cursor = await self._ensure_cursor()
+        self.wrote = self.wrote or is_write_statement(query)
+        inicio = time.perf_counter()
+        await cursor.execute(query, params)
+        self._lastrowid = cursor.lastrowid
+        self._rowcount = cursor.rowcount
+        record_query(query, (time.perf_counter() - inicio) * 1000, self._rowcount, self._pool.name)
+
+    async def executemany(self, query: str, seq_params: List[Any]):
+        cursor = await self._ensure_cursor()
+        self.wrote = self.wrote or is_write_statement(query)
+        inicio = time.perf_counter()
+        await cursor.executemany(query, seq_params)
+        self._lastrowid = cursor.lastrowid
+        self._rowcount = cursor.rowcount
+        record_query(query, (time.perf_counter() - inicio) * 1000, self._rowcount, self._pool.name)
+
+    async def fetchone(self) -> Optional[Dict[str, Any]]:
+        return await self._cursor.fetchone() if self._cursor is not None else None
+
+    async def fetchall(self) -> List[Dict[str, Any]]:
+        return await self._cursor.fetchall() if self._cursor is not None else []
+
+    async def fetchmany(self, size: int = 1) -> List[Dict[str, Any]]:
+        return await self._cursor.fetchmany(size) if self._cursor is not None else []
+
+    @property
+    def lastrowid(self) -> Optional[int]:
+        return self._lastrowid
+
+    @property
+    def rowcount(self) -> int:
+        return self._rowcount
+
+    async def release(self, commit: bool = True):
+        """
+        Encerra a transação atual e devolve a conexão ao pool
+        Busque os resultados (fetch*) antes de liberar
+        """
+        if self._pooled is None:
+            self._publicar(commit)
+            return
+
+        pooled, cursor = self._pooled, self._cursor
+        self._pooled = self._cursor = None
+        try:
+            if commit:
+                await pooled.raw.commit()
+            else:
+                await pooled.raw.rollback()
+        except BaseException:
+            self._apos_commit.clear()
+            raise
+        finally:
+            try:
+                await cursor.close()
+            except Error:
+                pass
+            await self._pool.release(pooled)
+        self._publicar(commit)
+
+    async def close(self):
+        """Alias de release() (compatível com a interface de cursor)"""
+        await self.release()
+
+
+class ThreadedCursor(AsyncCursor):
+    """
+    Expõe um LazyCursor síncrono com a interface do AsyncCursor
+    Cada chamada roda no threadpool, fora do event loop
+
+    Usado quando o driver asyncio não está disponível (DB_ASYNC_DRIVER=threadpool)
+    """
+
+    def __init__(self, cursor: LazyCursor):
+        self._sync = cursor
+        self._apos_commit: List[Callable[[], Any]] = []
+
+    @property
+    def wrote(self) -> bool:
+        return self._sync.wrote
+
+    @property
+    def connected(self) -> bool:
+        return self._sync.connected
+
+    async def execute(self, query: str, params: Any = None):
+        await run_in_threadpool(self._sync.execute, query, params)
+
+    async def executemany(self, query: str, seq_params: List[Any]):
+        await run_in_threadpool(self._sync.executemany, query, seq_params)
+
+    async def fetchone(self) -> Optional[Dict[str, Any]]:
+        return self._sync.fetchone()  # resultado já está em memória (buffered)
+
+    async def fetchall(self) -> List[Dict[str, Any]]:
+        return self._sync.fetchall()
+
+    async def fetchmany(self, size: int = 1) -> List[Dict[str, Any]]:
+        return self._sync.fetchmany(size)
+
+    @property
+    def lastrowid(self) -> Optional[int]:
+        return self._sync.lastrowid
+
+    @property
+    def rowcount(self) -> int:
+        return self._sync.rowcount
+
+    async def release(self, commit: bool = True):
+        if self._sync.connected:
+            try:
+                await run_in_threadpool(self._sync.release, commit)
+            except BaseException:
+                self._apos_commit.clear()
+                raise
+        self._publicar(commit)
+
+
+# ==================== DATABASE ASSÍNCRONO ====================
+
+class AsyncDatabase:
+    """Classe para gerenciar conexões assíncronas com o MySQL."""
+
+    _pool: Optional[AsyncConnectionPool] = None
+
+    @staticmethod
+    def uses_native_driver() -> bool:
+        """True se as queries usam o driver asyncio (senão, threadpool)"""
+        return settings.DB_ASYNC_DRIVER == "native" and mysql_aio is not None
+
+    @staticmethod
+    async def get_connection():
+        """Cria uma nova conexão assíncrona com o banco de dados"""
+        try:
+            return await mysql_aio.connect(
+                host=settings.DB_HOST,
+                port=settings.DB_PORT,
+                user=settings.DB_USER,
+                password=settings.DB_PASSWORD,
+                database=settings.DB_NAME,
+                charset='utf8mb4',
+                collation='utf8mb4_unicode_ci',
+                connection_timeout=settings.DB_CONNECT_TIMEOUT_SECONDS
+            )
+        except Error as e:
+            print(f"Erro ao conectar ao MySQL (async): {e}")
+            raise
+
+    @classmethod
+    def get_pool(cls) -> AsyncConnectionPool:
+        """Retorna o pool assíncrono global (criado no primeiro uso, dentro do event loop)"""
+        if cls._pool is None:
+            cls._pool = AsyncConnectionPool(
+                connect=cls.get_connection,
+                size=settings.DB_ASYNC_POOL_SIZE,
+                max_overflow=settings.DB_ASYNC_POOL_MAX_OVERFLOW,
+                timeout=settings.DB_POOL_TIMEOUT_SECONDS,
+                recycle_seconds=settings.DB_POOL_RECYCLE_SECONDS,
+                pre_ping=settings.DB_POOL_PRE_PING
+            )
+        return cls._pool
+
+    @classmethod
+    async def close_pool(cls):
+        """Fecha todas as conexões do pool assíncrono (shutdown da aplicação)"""
+        if cls._pool is not None:
+            await cls._pool.close()
+            cls._pool = None
+
+    @staticmethod
+    @asynccontextmanager
+    async def get_cursor(dictionary=True) -> AsyncGenerator[AsyncCursor, None]:
+        """
+        Context manager assíncrono para obter cursor
+        A conexão vem do pool no primeiro execute e é devolvida ao final do bloco
+        Usage:
+            async with AsyncDatabase.get_cursor() as cursor:
+                await cursor.execute("SELECT * FROM users")
+                results = await cursor.fetchall()
+        """
+        if AsyncDatabase.uses_native_driver():
+            cursor = AsyncCursor(AsyncDatabase.get_pool(), dictionary)
+        else:
+            cursor = ThreadedCursor(LazyCursor(Database._acquire_primary, dictionary))
+
+        try:
+            yield cursor
+        except BaseException as e:
+            if isinstance(e, Error):
+                print(f"Erro no banco de dados: {e}")
+            try:
+                await cursor.release(commit=False)
+            except Error:
+                pass
+            raise
+        await cursor.release()
+
+
+def get_async_pool_stats() -> Dict[str, Any]:
+    """Estatísticas do pool assíncrono"""
+    if not AsyncDatabase.uses_native_driver():
+        return {'initialized': False, 'driver': 'threadpool'}
+    if AsyncDatabase._pool is None:
+        return {'initialized': False, 'driver': 'native'}
+    return {'initialized': True, 'driver': 'native', **AsyncDatabase._pool.stats()}
+
+# Dependency para FastAPI
+async def get_async_db(request: Request) -> AsyncGenerator:
+    """
+    Dependency do FastAPI para injeção de cursor assíncrono
+    Usage nos endpoints async:
+        @router.get("/users")
+        async def get_users(cursor = Depends(get_async_db)):
+            await cursor.execute("SELECT * FROM users")
+            return await cursor.fetchall()
+    """
+    async with AsyncDatabase.get_cursor() as cursor:
+        yield cursor
+
+    # Após o commit: as próximas leituras desta identidade vão ao primário
+    if cursor.wrote:
+        Database.get_replicas().note_write(identity_from_request(request))
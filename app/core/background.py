@@ -0,0 +1,89 @@
+"""
+Tarefas em segundo plano do processo (workers de fila, rotinas periódicas)
+Iniciadas no startup da aplicação e canceladas no shutdown
+"""
+import asyncio
+import time
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+
+class BackgroundTaskManager:
+    """
+    Registro das tasks asyncio de longa duração do processo
+
+    Uma task que termina com exceção é registrada (e logada) em vez de sumir
+    silenciosamente; `stats()` mostra o que está rodando em GET /admin/processo.
+    """
+
+    def __init__(self):
+        self._tasks: Dict[str, asyncio.Task] = {}
+        self._errors: Dict[str, str] = {}
+        self._runs: Dict[str, int] = {}
+
+    def spawn(self, name: str, coro: Awaitable[Any]) -> asyncio.Task:
+        """Inicia uma coroutine de longa duração (ex.: loop de um worker)"""
+        if name in self._tasks and not self._tasks[name].done():
+            raise RuntimeError(f"Task '{name}' já está rodando")
+
+        task = asyncio.get_running_loop().create_task(coro, name=name)
+        task.add_done_callback(lambda t: self._on_done(name, t))
+        self._tasks[name] = task
+        return task
+
+    def every(
+        self,
+        name: str,
+        interval_seconds: float,
+        func: Callable[[], Awaitable[Any]],
+        initial_delay: Optional[float] = None
+    ) -> asyncio.Task:
+        """
+        Executa `func` periodicamente; uma execução com erro é logada
+        e a próxima acontece normalmente
+        """
+        async def loop():
+            await asyncio.sleep(interval_seconds if initial_delay is None else initial_delay)
+            while True:
+                inicio = time.monotonic()
+                try:
+                    await func()
+                    self._runs[name] = self._runs.get(name, 0) + 1
+                except asyncio.CancelledError:
+                    raise
+                except Exception as e:
+                    self._errors[name] = str(e)
+                    print(f"⚠️ Rotina '{name}' falhou: {e}")
+                espera = interval_seconds - (time.monotonic() - inicio)
+                await asyncio.sleep(max(espera, 0))
+
+        return self.spawn(name, loop())
+
+    def _on_done(self, name: str, task: asyncio.Task):
+        if task.cancelled():
+            return
+        erro = task.exception()
+        if erro is not None:
+            self._errors[name] = str(erro)
+            print(f"❌ Task '{name}' terminou com erro: {erro}")
+
+    async def shutdown(self, timeout: float = 10.0):
+        """Cancela todas as tasks e espera que terminem"""
+        tasks = [t for t in self._tasks.values() if not t.done()]
+        for task in tasks:
+            task.cancel()
+        if tasks:
+            await asyncio.wait(tasks, timeout=timeout)
+        self._tasks.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            name: {
+                'running': not task.done(),
+                'runs': self._runs.get(name),
+                'last_error': self._errors.get(name)
+            }
+            for name, task in self._tasks.items()
+        }
+
+
+background_tasks = BackgroundTaskManager()
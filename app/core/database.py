@@ -1,64 +1,385 @@
+import threading
+import time
 import mysql.connector
 from mysql.connector import Error
 from contextlib import contextmanager
-from typing import Generator
+from typing import Any, Callable, Dict, Generator, Optional, Tuple
+from fastapi import Request
 from app.core.config import settings
+from app.core.instrumentation import record_query
+from app.core.pool import ConnectionPool, PooledConnection
+from app.core.replicas import Identity, ReplicaRouter, identity_from_request, parse_dsn
+from app.core.statements import ER_UNSUPPORTED_PS, PreparedStatementCache, RowBuffer, prepared_stats
+
+_WRITE_STATEMENTS = ('insert', 'update', 'delete', 'replace')
+
+
+def is_write_statement(query: str) -> bool:
+    """True se a query altera dados (usado pelo read-your-writes)"""
+    return query.lstrip()[:7].lower().startswith(_WRITE_STATEMENTS)
+
+
+class LazyCursor:
+    """
+    Cursor que só retira uma conexão do pool no primeiro `execute`
+
+    - rotas que retornam cedo (validação, 403...) não ocupam conexão
+    - `release()` faz commit e devolve a conexão antes de uma espera longa
+      (ex.: chamada à IA); o próximo `execute` pega outra conexão do pool
+    - registra se algo foi escrito (usado pelo read-your-writes)
+    - cada statement é medido (app.core.instrumentation)
+    - statements com parâmetros usam prepared statements cacheados na conexão
+      (DB_PREPARED_STATEMENTS)
+    - `stream=True` usa cursor não-buffered: as linhas chegam do servidor
+      conforme fetchone/fetchmany são chamados (resultados grandes)
+    """
+
+    def __init__(
+        self,
+        acquire: Callable[[], Tuple[ConnectionPool, PooledConnection]],
+        dictionary=True,
+        stream=False
+    ):
+        self._acquire = acquire
+        self._dictionary = dictionary
+        self._stream = stream
+        self._pool: Optional[ConnectionPool] = None
+        self._pooled: Optional[PooledConnection] = None
+        self._cursor: Any = None  # cursor texto (buffered, exceto em modo stream)
+        self._result: Any = None  # de onde os fetch* leem: cursor texto ou RowBuffer
+        self._lastrowid: Optional[int] = None
+        self._rowcount: int = -1
+        self.wrote = False
+
+    @property
+    def connected(self) -> bool:
+        """True se há uma conexão do pool presa a este cursor"""
+        return self._pooled is not None
+
+    def _ensure_connection(self) -> PooledConnection:
+        if self._pooled is None:
+            self._pool, self._pooled = self._acquire()
+        return self._pooled
+
+    def _ensure_cursor(self):
+        pooled = self._ensure_connection()
+        if self._cursor is None:
+            try:
+                self._cursor = pooled.raw.cursor(dictionary=self._dictionary, buffered=not self._stream)
+            except Exception:
+                self._pool.discard(pooled)
+                self._pool = self._pooled = None
+                raise
+        return self._cursor
+
+    def _prepared(self, query, params) -> Optional[Tuple[str, Any]]:
+        """(sql, cursor preparado) para a query, ou None para usar o protocolo texto"""
+        if self._stream or not settings.DB_PREPARED_STATEMENTS or not isinstance(params, (tuple, list)):
+            return None
+
+        pooled = self._ensure_connection()
+        if pooled.statements is None:
+            pooled.statements = PreparedStatementCache(settings.DB_PREPARED_CACHE_SIZE)
+        cache = pooled.statements
+        if not cache.supports(query):
+            return None
+
+        entry = cache.get(query)
+        if entry is None:
+            cursor = pooled.raw.cursor(prepared=True, dictionary=self._dictionary)
+            evicted = cache.put(query, cursor)
+            if evicted is not None:
+                evicted.close()  # desaloca o statement no servidor
+            entry = (query, cursor)
+        return entry
+
+    def execute(self, query, params=None):
+        if is_write_statement(query):
+            self.wrote = True
+
+        inicio = time.perf_counter()
+        result = None
+        prepared = self._prepared(query, params)
+
+        if prepared is not None:
+            sql, cursor = prepared
+            try:
+                # Mesmo objeto `sql` a cada chamada: o driver reaproveita o statement
+                cursor.execute(sql, params)
+            except Error as e:
+                if e.errno != ER_UNSUPPORTED_PS:
+                    raise
+                cursor.close()
+                self._pooled.statements.mark_unsupported(query)
+                prepared = None
+            else:
+                # Cursor preparado não é buffered: lê tudo antes do próximo statement
+                self._result = RowBuffer(cursor.fetchall() if cursor.with_rows else [])
+                self._rowcount = len(self._result) if cursor.with_rows else cursor.rowcount
+
+        if prepared is None:
+            cursor = self._ensure_cursor()
+            result = cursor.execute(query, params)
+            self._result = cursor
+            self._rowcount = cursor.rowcount
+
+        self._lastrowid = cursor.lastrowid
+        record_query(query, (time.perf_counter() - inicio) * 1000, self._rowcount, self._pool.name)
+        return result
+
+    def executemany(self, query, seq_params):
+        cursor = self._ensure_cursor()
+        if is_write_statement(query):
+            self.wrote = True
+        inicio = time.perf_counter()
+        result = cursor.executemany(query, seq_params)
+        self._result = cursor
+        self._lastrowid = cursor.lastrowid
+        self._rowcount = cursor.rowcount
+        record_query(query, (time.perf_counter() - inicio) * 1000, self._rowcount, self._pool.name)
+        return result
+
+    def fetchone(self):
+        return self._result.fetchone() if self._result is not None else None
+
+    def fetchall(self):
+        return self._result.fetchall() if self._result is not None else []
+
+    def fetchmany(self, size=1):
+        return self._result.fetchmany(size) if self._result is not None else []
+
+    @property
+    def lastrowid(self) -> Optional[int]:
+        return self._lastrowid
+
+    @property
+    def rowcount(self) -> int:
+        return self._rowcount
+
+    def release(self, commit: bool = True):
+        """
+        Encerra a transação atual e devolve a conexão ao pool
+        Busque os resultados (fetch*) antes de liberar
+        """
+        if self._pooled is None:
+            return
+
+        pool, pooled, cursor = self._pool, self._pooled, self._cursor
+        self._pool = self._pooled = self._cursor = self._result = None
+
+        if self._stream and getattr(pooled.raw, 'unread_result', False):
+            # Stream interrompido no meio (erro, cliente desconectou): fechar a
+            # conexão é mais barato que ler o resto do resultado do servidor
+            pool.discard(pooled)
+            return
+
+        try:
+            if commit:
+                pooled.raw.commit()
+            else:
+                pooled.raw.rollback()
+        finally:
+            try:
+                if cursor is not None:
+                    cursor.close()
+            except Error:
+                pass
+            # Conexões quebradas são detectadas pelo pre-ping no próximo checkout
+            # Os prepared statements ficam com a conexão (cache em pooled.statements)
+            pool.release(pooled)
+
+    def close(self):
+        """Alias de release() (compatível com a interface de cursor)"""
+        self.release()
+
 
 class Database:
     """Classe para gerenciar a conexão com o banco de dados MySQL."""
 
+    _pool: Optional[ConnectionPool] = None
+    _replicas: Optional[ReplicaRouter] = None
+    # Criação do pool/roteador: endpoints síncronos chegam juntos de várias
+    # threads do threadpool, e um pool criado em dobro nunca seria fechado
+    _init_lock = threading.Lock()
+
     @staticmethod
-    def get_connection():
-        """Cria uma nova conexão com o banco de dados"""
+    def get_connection(**overrides):
+        """
+        Cria uma nova conexão com o banco de dados
+        `overrides` permite apontar para outro servidor (ex.: réplica de leitura)
+        """
+        params = {
+            'host': settings.DB_HOST,
+            'port': settings.DB_PORT,
+            'user': settings.DB_USER,
+            'password': settings.DB_PASSWORD,
+            'database': settings.DB_NAME,
+            **overrides
+        }
         try:
             connection = mysql.connector.connect(
-                host=settings.DB_HOST,
-                port=settings.DB_PORT,
-                user=settings.DB_USER,
-                password=settings.DB_PASSWORD,
-                database=settings.DB_NAME,
+                **params,
                 charset='utf8mb4',
-                collation='utf8mb4_unicode_ci'
+                collation='utf8mb4_unicode_ci',
+                connection_timeout=settings.DB_CONNECT_TIMEOUT_SECONDS
             )
-            
+
             if connection.is_connected():
                 return connection
-            
+
+        except Error as e:
+            print(f"Erro ao conectar ao MySQL ({params['host']}): {e}")
+            raise
+
+    @classmethod
+    def get_pool(cls) -> ConnectionPool:
+        """Retorna o pool global de conexões (criado no primeiro uso)"""
+        if cls._pool is None:
+            with cls._init_lock:
+                if cls._pool is None:
+                    cls._pool = ConnectionPool(
+                        connect=cls.get_connection,
+                        size=settings.DB_POOL_SIZE,
+                        max_overflow=settings.DB_POOL_MAX_OVERFLOW,
+                        timeout=settings.DB_POOL_TIMEOUT_SECONDS,
+                        recycle_seconds=settings.DB_POOL_RECYCLE_SECONDS,
+                        pre_ping=settings.DB_POOL_PRE_PING
+                    )
+        return cls._pool
+
+    @classmethod
+    def get_replicas(cls) -> ReplicaRouter:
+        """
+        Retorna o roteador de réplicas de leitura (DB_READ_DSN)
+        Sem réplicas configuradas, todas as leituras vão para o primário
+        """
+        if cls._replicas is None:
+            with cls._init_lock:
+                if cls._replicas is None:
+                    pools = []
+                    dsns = [d for d in (settings.DB_READ_DSN or "").split(",") if d.strip()]
+                    for i, dsn in enumerate(dsns):
+                        params = parse_dsn(dsn)
+                        pools.append(ConnectionPool(
+                            connect=lambda params=params: Database.get_connection(**params),
+                            size=settings.DB_POOL_SIZE,
+                            max_overflow=settings.DB_POOL_MAX_OVERFLOW,
+                            # Réplica lenta não deve segurar a requisição: cai para o primário
+                            timeout=min(settings.DB_POOL_TIMEOUT_SECONDS, settings.DB_CONNECT_TIMEOUT_SECONDS),
+                            recycle_seconds=settings.DB_POOL_RECYCLE_SECONDS,
+                            pre_ping=settings.DB_POOL_PRE_PING,
+                            name=f"replica-{i}:{params['host']}"
+                        ))
+                    cls._replicas = ReplicaRouter(
+                        replicas=pools,
+                        read_your_writes_seconds=settings.DB_READ_YOUR_WRITES_SECONDS,
+                        retry_seconds=settings.DB_REPLICA_RETRY_SECONDS
+                    )
+        return cls._replicas
+
+    @classmethod
+    def close_pool(cls):
+        """Fecha todas as conexões do pool (shutdown da aplicação)"""
+        with cls._init_lock:
+            pool, replicas = cls._pool, cls._replicas
+            cls._pool = cls._replicas = None
+        if pool is not None:
+            pool.close()
+        if replicas is not None:
+            replicas.close()
+
+    @staticmethod
+    def _acquire_primary() -> Tuple[ConnectionPool, PooledConnection]:
+        """Retira uma conexão do pool primário"""
+        pool = Database.get_pool()
+        try:
+            return pool, pool.acquire()
         except Error as e:
-            print(f"Erro ao conectar ao MySQL: {e}")
+            print(f"Erro no banco de dados: {e}")
             raise
+
+    @staticmethod
+    def _acquire_read(identity: Optional[Identity] = None) -> Tuple[ConnectionPool, PooledConnection]:
+        """
+        Retira uma conexão de leitura: réplica saudável quando possível,
+        primário se não houver réplica ou se `identity` escreveu recentemente
+        """
+        router = Database.get_replicas()
+
+        for pool in router.candidates(identity):
+            try:
+                pooled = pool.acquire()
+            except Error as e:
+                router.mark_failure(pool, e)
+                continue
+            router.mark_success()
+            return pool, pooled
+
+        if router.replicas:
+            router.mark_fallback()
+        return Database._acquire_primary()
+
     @staticmethod
     @contextmanager
-    def get_cursor(dictionary=True):
+    def _lazy_cursor(acquire, dictionary=True, stream=False):
+        """Commit ao final do bloco, rollback em caso de erro; a conexão volta ao pool"""
+        cursor = LazyCursor(acquire, dictionary, stream)
+        try:
+            yield cursor
+        except BaseException as e:
+            if isinstance(e, Error):
+                print(f"Erro no banco de dados: {e}")
+            try:
+                cursor.release(commit=False)
+            except Error:
+                pass
+            raise
+        cursor.release()
+
+    @staticmethod
+    @contextmanager
+    def get_cursor(dictionary=True, stream=False):
         """
         Context manager para obter cursor
+        A conexão vem do pool no primeiro execute e é devolvida ao final do bloco
+        `stream=True`: cursor não-buffered, leia com fetchmany até esgotar
+        (ver app.utils.streaming.stream_json_rows)
         Usage:
             with Database.get_cursor() as cursor:
                 cursor.execute("SELECT * FROM users")
                 results = cursor.fetchall()
         """
-        connection = None
-        cursor = None
-        try:
-            connection = Database.get_connection()
-            cursor = connection.cursor(dictionary=dictionary)
+        with Database._lazy_cursor(Database._acquire_primary, dictionary, stream) as cursor:
             yield cursor
-            connection.commit()
-        except Error as e:
-            if connection:
-                connection.rollback()
-            print(f"Erro no banco de dados: {e}")
-            raise
-        finally:
-            if cursor:
-                cursor.close()
-            if connection and connection.is_connected():
-                connection.close()
+
+    @staticmethod
+    @contextmanager
+    def get_read_cursor(dictionary=True, identity: Optional[Identity] = None, stream=False):
+        """
+        Context manager para leituras: usa uma réplica quando possível
+        Cai para o primário se não houver réplica saudável ou se `identity`
+        escreveu recentemente (read-your-writes)
+        """
+        with Database._lazy_cursor(lambda: Database._acquire_read(identity), dictionary, stream) as cursor:
+            yield cursor
+
+
+def get_pool_stats() -> Dict[str, Any]:
+    """Estatísticas do pool de conexões"""
+    if Database._pool is None:
+        stats = {'initialized': False}
+    else:
+        stats = {'initialized': True, **Database._pool.stats()}
+    if Database._replicas is not None and Database._replicas.replicas:
+        stats['read_replicas'] = Database._replicas.stats()
+    if settings.DB_PREPARED_STATEMENTS:
+        stats['prepared_statements'] = prepared_stats.snapshot()
+    return stats
 
 # Dependency para FastAPI
-def get_db() -> Generator:
+def get_db(request: Request) -> Generator:
     """
-    Dependency do FastAPI para injeção de cursor
+    Dependency do FastAPI para injeção de cursor (primário, leitura e escrita)
     Usage nos endpoints:
         @router.get("/users")
         def get_users(cursor = Depends(get_db)):
@@ -66,4 +387,22 @@ def get_db() -> Generator:
             return cursor.fetchall()
     """
     with Database.get_cursor() as cursor:
-        yield cursor
\ No newline at end of file
+        yield cursor
+
+    # Só chega aqui após o commit: as próximas leituras desta identidade vão ao primário
+    if cursor.wrote:
+        Database.get_replicas().note_write(identity_from_request(request))
+
+def get_read_db(request: Request) -> Generator:
+    """
+    Dependency do FastAPI para endpoints somente leitura (rankings, dashboards, listagens)
+    Usa réplicas de leitura quando configuradas (DB_READ_DSN)
+    Usage nos endpoints:
+        @router.get("/ranking")
+        def ranking(cursor = Depends(get_read_db)):
+            cursor.execute("SELECT ...")
+            return cursor.fetchall()
+    """
+    identity = identity_from_request(request)
+    with Database.get_read_cursor(identity=identity) as cursor:
+        yield cursor
@@ -0,0 +1,113 @@
+"""
+Cache de identidades autenticadas
+Evita o SELECT em users/empresas a cada requisição autenticada (get_current_user)
+
+O cache é por processo: invalidações valem para o worker que as executou;
+nos demais, o dado expira em AUTH_IDENTITY_CACHE_SECONDS.
+"""
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+from app.core.config import settings
+
+IdentityKey = Tuple[str, int]  # (tipo_usuario, id)
+
+
+class IdentityCache:
+    """
+    LRU com TTL das linhas de identidade (id, nome, email, email_verificado, ativo)
+
+    Cada chave tem uma versão: `invalidate` a incrementa, e um `put` feito com
+    a versão lida antes do SELECT é ignorado se a chave foi invalidada no meio
+    (evita recolocar no cache um dado que acabou de mudar).
+
+    Todo `get` que devolve None abre uma leitura, encerrada pelo `put`
+    seguinte (com a identidade lida ou None): a versão de uma chave só é
+    descartada quando não há leitura dela em andamento.
+    """
+
+    def __init__(self, ttl_seconds: int = 60, max_entries: int = 10000):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[IdentityKey, Tuple[float, Dict[str, Any]]]" = OrderedDict()
+        self._versions: Dict[IdentityKey, int] = {}
+        self._leituras: Dict[IdentityKey, int] = {}  # SELECTs em andamento por chave
+        self._stats = {'hits': 0, 'misses': 0, 'expired': 0, 'invalidations': 0, 'evictions': 0}
+
+    def get(self, key: IdentityKey) -> Tuple[Optional[Dict[str, Any]], int]:
+        """(cópia da identidade ou None, versão atual da chave)"""
+        now = time.monotonic()
+        with self._lock:
+            versao = self._versions.get(key, 0)
+            entry = self._entries.get(key)
+            if entry is not None:
+                expira_em, identidade = entry
+                if expira_em > now:
+                    self._entries.move_to_end(key)
+                    self._stats['hits'] += 1
+                    return dict(identidade), versao
+                del self._entries[key]
+                self._stats['expired'] += 1
+            self._stats['misses'] += 1
+            self._leituras[key] = self._leituras.get(key, 0) + 1
+            return None, versao
+
+    def put(self, key: IdentityKey, identidade: Optional[Dict[str, Any]], versao: int):
+        """
+        Encerra a leitura aberta pelo `get` e guarda a identidade lida
+        (None: nada a guardar, ex.: conta inexistente ou erro no SELECT)
+        """
+        with self._lock:
+            restantes = self._leituras.get(key, 0) - 1
+            if restantes > 0:
+                self._leituras[key] = restantes
+            else:
+                self._leituras.pop(key, None)
+
+            if identidade is None or self.ttl_seconds <= 0 or self._versions.get(key, 0) != versao:
+                return
+            self._entries[key] = (time.monotonic() + self.ttl_seconds, dict(identidade))
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self._stats['evictions'] += 1
+
+    def invalidate(self, tipo: str, id: int):
+        """Remove a identidade do cache (chamar após o commit da alteração)"""
+        key = (tipo, int(id))
+        with self._lock:
+            self._entries.pop(key, None)
+            self._versions[key] = self._versions.get(key, 0) + 1
+            self._stats['invalidations'] += 1
+            # As versões só importam enquanto há SELECTs em andamento
+            if len(self._versions) > self.max_entries:
+                self._versions = {
+                    k: v for k, v in self._versions.items() if k in self._leituras
+                }
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._versions = {k: v for k, v in self._versions.items() if k in self._leituras}
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stats = dict(self._stats)
+            stats['size'] = len(self._entries)
+        total = stats['hits'] + stats['misses']
+        stats['hit_rate'] = round(stats['hits'] / total, 4) if total else 0.0
+        stats['ttl_seconds'] = self.ttl_seconds
+        return stats
+
+
+identity_cache = IdentityCache(
+    ttl_seconds=settings.AUTH_IDENTITY_CACHE_SECONDS,
+    max_entries=settings.AUTH_IDENTITY_CACHE_MAX_ENTRIES
+)
+
+
+def invalidate_identity(tipo: str, id: int):
+    """Atalho para os endpoints que alteram users/empresas"""
+    identity_cache.invalidate(tipo, id)
@@ -0,0 +1,228 @@
+"""
+Instrumentação de queries
+Mede cada statement executado pelos cursores do banco, registra queries lentas,
+resume as queries de cada requisição (header Server-Timing) e mantém
+agregados por fingerprint (p50/p95/p99) para o endpoint de admin
+"""
+import math
+import re
+import threading
+import time
+from collections import deque
+from functools import lru_cache
+from contextvars import ContextVar
+from typing import Any, Dict, List, Optional
+from app.core.config import settings
+
+# ==================== FINGERPRINT ====================
+
+_RE_COMMENTS = re.compile(r"/\*.*?\*/|--[^\n]*", re.S)
+_RE_STRINGS = re.compile(r"'(?:[^'\\]|\\.)*'|\"(?:[^\"\\]|\\.)*\"")
+_RE_NUMBERS = re.compile(r"\b\d+(?:\.\d+)?\b")
+_RE_PLACEHOLDERS = re.compile(r"%\(\w+\)s|%s|\?")
+_RE_IN_LIST = re.compile(r"\(\s*\?(?:\s*,\s*\?)*\s*\)")
+_RE_SPACES = re.compile(r"\s+")
+
+
+@lru_cache(maxsize=1024)  # o SQL dos endpoints é fixo: normaliza uma vez só
+def fingerprint(query: str) -> str:
+    """
+    Normaliza o SQL para agrupar execuções da mesma query
+    Literais e parâmetros viram `?`; listas IN (?, ?, ...) viram `(?+)`
+    """
+    sql = _RE_COMMENTS.sub(" ", query)
+    sql = _RE_STRINGS.sub("?", sql)
+    sql = _RE_PLACEHOLDERS.sub("?", sql)
+    sql = _RE_NUMBERS.sub("?", sql)
+    sql = _RE_IN_LIST.sub("(?+)", sql)
+    return _RE_SPACES.sub(" ", sql).strip().lower()
+
+
+# ==================== CONTEXTO DA REQUISIÇÃO ====================
+
+class QueryRecord:
+    """Uma execução de statement dentro da requisição"""
+
+    __slots__ = ('fingerprint', 'duration_ms', 'rows', 'pool')
+
+    def __init__(self, fingerprint: str, duration_ms: float, rows: int, pool: Optional[str]):
+        self.fingerprint = fingerprint
+        self.duration_ms = duration_ms
+        self.rows = rows
+        self.pool = pool
+
+
+class RequestQueries:
+    """Queries executadas durante uma requisição (preenchido pelos cursores)"""
+
+    def __init__(self, scope: Optional[Dict[str, Any]] = None):
+        self.scope = scope
+        self.started_at = time.perf_counter()
+        self.records: List[QueryRecord] = []
+
+    @property
+    def endpoint(self) -> Optional[str]:
+        """Rota que está executando (template da rota, ex.: /api/v1/users/{user_id})"""
+        if self.scope is None:
+            return None
+        route = self.scope.get("route")
+        path = getattr(route, "path", None) or self.scope.get("path")
+        return f"{self.scope.get('method', '')} {path}".strip()
+
+    @property
+    def total_ms(self) -> float:
+        return sum(r.duration_ms for r in self.records)
+
+
+_current_request: ContextVar[Optional[RequestQueries]] = ContextVar("_current_request", default=None)
+
+
+def start_request(scope: Optional[Dict[str, Any]] = None):
+    """Abre o registro de queries da requisição atual (usado pelo middleware)"""
+    return _current_request.set(RequestQueries(scope))
+
+
+def end_request(token) -> Optional[RequestQueries]:
+    """Fecha o registro e devolve as queries coletadas"""
+    atual = _current_request.get()
+    _current_request.reset(token)
+    return atual
+
+
+def current_request() -> Optional[RequestQueries]:
+    return _current_request.get()
+
+
+# ==================== AGREGADOS ====================
+
+class QueryStats:
+    """
+    Agregados em memória por fingerprint
+    Guarda as últimas `samples` durações de cada query para os percentis
+    """
+
+    def __init__(self, samples: int = 1000, max_fingerprints: int = 500):
+        self.samples = samples
+        self.max_fingerprints = max_fingerprints
+        self._lock = threading.Lock()
+        self._stats: Dict[str, Dict[str, Any]] = {}
+        self._dropped = 0
+
+    def add(self, record: QueryRecord, endpoint: Optional[str]):
+        with self._lock:
+            stats = self._stats.get(record.fingerprint)
+            if stats is None:
+                if len(self._stats) >= self.max_fingerprints:
+                    # SQL gerado dinamicamente não pode crescer a memória sem limite
+                    self._dropped += 1
+                    return
+                stats = self._stats[record.fingerprint] = {
+                    'count': 0,
+                    'total_ms': 0.0,
+                    'max_ms': 0.0,
+                    'rows': 0,
+                    'slow': 0,
+                    'durations': deque(maxlen=self.samples),
+                    'endpoints': {},
+                }
+            stats['count'] += 1
+            stats['total_ms'] += record.duration_ms
+            stats['max_ms'] = max(stats['max_ms'], record.duration_ms)
+            stats['rows'] += max(record.rows, 0)
+            if record.duration_ms >= settings.DB_SLOW_QUERY_MS:
+                stats['slow'] += 1
+            stats['durations'].append(record.duration_ms)
+            if endpoint:
+                stats['endpoints'][endpoint] = stats['endpoints'].get(endpoint, 0) + 1
+
+    @staticmethod
+    def _percentile(ordenadas: List[float], p: float) -> float:
+        if not ordenadas:
+            return 0.0
+        # Nearest-rank
+        indice = max(0, math.ceil(p / 100 * len(ordenadas)) - 1)
+        return ordenadas[indice]
+
+    def snapshot(self, limit: int = 50, order_by: str = 'total_ms') -> Dict[str, Any]:
+        """Agregados ordenados por `order_by` (total_ms, p95_ms, count, max_ms)"""
+        with self._lock:
+            copia = {
+                fp: {**s, 'durations': list(s['durations']), 'endpoints': dict(s['endpoints'])}
+                for fp, s in self._stats.items()
+            }
+            dropped = self._dropped
+
+        queries = []
+        for fp, s in copia.items():
+            ordenadas = sorted(s['durations'])
+            queries.append({
+                'fingerprint': fp,
+                'count': s['count'],
+                'total_ms': round(s['total_ms'], 2),
+                'avg_ms': round(s['total_ms'] / s['count'], 2),
+                'p50_ms': round(self._percentile(ordenadas, 50), 2),
+                'p95_ms': round(self._percentile(ordenadas, 95), 2),
+                'p99_ms': round(self._percentile(ordenadas, 99), 2),
+                'max_ms': round(s['max_ms'], 2),
+                'avg_rows': round(s['rows'] / s['count'], 1),
+                'slow': s['slow'],
+                'endpoints': s['endpoints'],
+            })
+
+        queries.sort(key=lambda q: q.get(order_by, 0), reverse=True)
+        return {
+            'slow_query_ms': settings.DB_SLOW_QUERY_MS,
+            'fingerprints': len(queries),
+            'fingerprints_dropped': dropped,
+            'queries': queries[:limit],
+        }
+
+    def reset(self):
+        with self._lock:
+            self._stats.clear()
+            self._dropped = 0
+
+
+query_stats = QueryStats(
+    samples=settings.DB_QUERY_STATS_SAMPLES,
+    max_fingerprints=settings.DB_QUERY_STATS_MAX_FINGERPRINTS
+)
+
+
+# ==================== REGISTRO ====================
+
+def record_query(query: str, duration_ms: float, rows: int, pool: Optional[str] = None):
+    """
+    Registra uma execução de statement (chamado pelos cursores após o execute)
+    Alimenta o resumo da requisição, o log de queries lentas e os agregados
+    """
+    if not settings.DB_INSTRUMENTATION:
+        return
+
+    record = QueryRecord(fingerprint(query), duration_ms, rows, pool)
+    requisicao = _current_request.get()
+    endpoint = requisicao.endpoint if requisicao is not None else None
+
+    if requisicao is not None:
+        requisicao.records.append(record)
+
+    if duration_ms >= settings.DB_SLOW_QUERY_MS:
+        print(
+            f"🐢 Query lenta ({duration_ms:.1f}ms, {rows} linhas, {pool or '-'}) "
+            f"em {endpoint or 'fora de requisição'}: {record.fingerprint[:300]}"
+        )
+
+    query_stats.add(record, endpoint)
+
+
+def server_timing(requisicao: RequestQueries) -> str:
+    """
+    Valor do header Server-Timing para a requisição
+    Ex.: db;dur=12.4;desc="6 queries", db-max;dur=8.1, app;dur=20.3
+    """
+    app_ms = (time.perf_counter() - requisicao.started_at) * 1000
+    partes = [f'db;dur={requisicao.total_ms:.1f};desc="{len(requisicao.records)} queries"']
+    if requisicao.records:
+        partes.append(f"db-max;dur={max(r.duration_ms for r in requisicao.records):.1f}")
+    partes.append(f"app;dur={app_ms:.1f}")
+    return ", ".join(partes)
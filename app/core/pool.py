@@ -0,0 +1,414 @@
+"""
+Pool de conexões MySQL
+Reaproveita conexões entre requisições (sem handshake TCP/auth por chamada)
+"""
+import asyncio
+import threading
+import time
+from collections import deque
+from typing import Any, Awaitable, Callable, Deque, Dict, List, Optional
+from mysql.connector import Error
+
+
+class PoolTimeoutError(Error):
+    """Nenhuma conexão livre dentro do tempo limite de espera"""
+    pass
+
+
+class PooledConnection:
+    """
+    Conexão física gerenciada pelo pool
+    Guarda metadados usados para reciclagem e health check
+    """
+
+    def __init__(self, raw: Any):
+        self.raw = raw
+        self.created_at = time.monotonic()
+        self.last_used = self.created_at
+        self.statements: Any = None  # PreparedStatementCache (criado pelo cursor no 1º uso)
+
+    @property
+    def age(self) -> float:
+        return time.monotonic() - self.created_at
+
+    @property
+    def idle_time(self) -> float:
+        return time.monotonic() - self.last_used
+
+    def close(self):
+        """Fecha a conexão física ignorando erros (conexão pode já estar morta)"""
+        try:
+            self.raw.close()
+        except Exception:
+            pass
+
+
+class _PoolBase:
+    """
+    Contabilidade comum aos pools síncrono e assíncrono
+
+    - `size` conexões ficam ociosas no pool entre requisições
+    - até `max_overflow` conexões extras são abertas em picos e fechadas na devolução
+    - conexões mais velhas que `recycle_seconds` são recriadas
+    - `pre_ping` valida a conexão (ping) antes de entregá-la
+
+    Os métodos `_reservar`/`_devolver`/`_liberar_vaga`/`_encerrar` mexem no
+    estado do pool: chamar com o lock do pool. As subclasses implementam só a
+    espera por vaga e o I/O (conectar, ping, fechar), síncrono ou com await.
+    """
+
+    def __init__(
+        self,
+        size: int,
+        max_overflow: int,
+        timeout: float,
+        recycle_seconds: int,
+        pre_ping: bool,
+        name: str
+    ):
+        self.size = size
+        self.max_overflow = max_overflow
+        self.timeout = timeout
+        self.recycle_seconds = recycle_seconds
+        self.pre_ping = pre_ping
+        self.name = name
+
+        self._idle: Deque[PooledConnection] = deque()
+        self._in_use = 0
+        self._closed = False
+
+        self._stats = {
+            'checkouts': 0,
+            'connections_created': 0,
+            'connections_closed': 0,
+            'recycled': 0,
+            'failed_pings': 0,
+            'waits': 0,
+            'timeouts': 0,
+        }
+
+    # ==================== ESTADO (COM O LOCK DO POOL) ====================
+
+    def _total(self) -> int:
+        return len(self._idle) + self._in_use
+
+    def _esgotado(self) -> bool:
+        """Sem conexão ociosa e sem vaga para abrir outra"""
+        return not self._idle and self._total() >= self.size + self.max_overflow
+
+    def _verificar_aberto(self):
+        if self._closed:
+            raise Error("Pool de conexões encerrado")
+
+    def _erro_timeout(self) -> PoolTimeoutError:
+        self._stats['timeouts'] += 1
+        return PoolTimeoutError(
+            f"Pool '{self.name}' esgotado: nenhuma conexão livre em {self.timeout}s"
+        )
+
+    def _reservar(self) -> Optional[PooledConnection]:
+        """Ocupa uma vaga; devolve a conexão ociosa (ou None: criar uma nova)"""
+        conn = self._idle.pop() if self._idle else None
+        self._in_use += 1
+        self._stats['checkouts'] += 1
+        return conn
+
+    def _devolver(self, conn: PooledConnection, descartar: bool) -> bool:
+        """Libera a vaga; True se a conexão deve ser fechada (overflow, pool encerrado ou com erro)"""
+        self._in_use -= 1
+        if self._closed or descartar or len(self._idle) >= self.size:
+            return True
+        conn.last_used = time.monotonic()
+        self._idle.append(conn)
+        return False
+
+    def _liberar_vaga(self):
+        """Vaga de uma conexão que não volta ao pool (falha no checkout ou discard)"""
+        self._in_use -= 1
+
+    def _encerrar(self) -> List[PooledConnection]:
+        """Impede novos checkouts; devolve as ociosas para fechar"""
+        self._closed = True
+        ociosas = list(self._idle)
+        self._idle.clear()
+        return ociosas
+
+    # ==================== MANUTENÇÃO ====================
+
+    def _count(self, stat: str, n: int = 1):
+        self._stats[stat] += n
+
+    def _expirada(self, conn: PooledConnection) -> bool:
+        """True se a conexão passou de `recycle_seconds` (e conta a reciclagem)"""
+        if self.recycle_seconds and conn.age > self.recycle_seconds:
+            self._count('recycled')
+            return True
+        return False
+
+    def _snapshot(self) -> Dict[str, Any]:
+        return {
+            'name': self.name,
+            'size': self.size,
+            'max_overflow': self.max_overflow,
+            'idle': len(self._idle),
+            'in_use': self._in_use,
+            'total': self._total(),
+            **self._stats
+        }
+
+
+class ConnectionPool(_PoolBase):
+    """Pool de conexões thread-safe com overflow (semântica em _PoolBase)"""
+
+    def __init__(
+        self,
+        connect: Callable[[], Any],
+        size: int = 5,
+        max_overflow: int = 10,
+        timeout: float = 30,
+        recycle_seconds: int = 3600,
+        pre_ping: bool = True,
+        name: str = "primary"
+    ):
+        super().__init__(size, max_overflow, timeout, recycle_seconds, pre_ping, name)
+        self._connect = connect
+        self._lock = threading.Lock()
+        self._available = threading.Condition(self._lock)
+
+    # ==================== CHECKOUT / CHECKIN ====================
+
+    def acquire(self) -> PooledConnection:
+        """
+        Retira uma conexão do pool
+        Bloqueia até `timeout` segundos se o pool + overflow estiverem esgotados
+        """
+        deadline = time.monotonic() + self.timeout
+
+        with self._available:
+            self._verificar_aberto()
+            while self._esgotado():
+                restante = deadline - time.monotonic()
+                if restante <= 0:
+                    raise self._erro_timeout()
+                self._stats['waits'] += 1
+                self._available.wait(restante)
+            conn = self._reservar()
+
+        # Validação e criação ficam fora do lock (envolvem I/O)
+        try:
+            if conn is not None:
+                conn = self._validate(conn)
+            if conn is None:
+                conn = self._create()
+        except Exception:
+            with self._available:
+                self._liberar_vaga()
+                self._available.notify()
+            raise
+
+        conn.last_used = time.monotonic()
+        return conn
+
+    def release(self, conn: PooledConnection):
+        """
+        Devolve a conexão ao pool
+        Transações pendentes são desfeitas; conexões de overflow são fechadas
+        """
+        descartar = False
+
+        try:
+            if conn.raw.in_transaction:
+                conn.raw.rollback()
+        except Exception:
+            descartar = True
+
+        with self._available:
+            descartar = self._devolver(conn, descartar)
+            self._available.notify()
+
+        if descartar:
+            self._discard(conn)
+
+    def discard(self, conn: PooledConnection):
+        """Remove do pool uma conexão em uso que ficou inutilizável"""
+        with self._available:
+            self._liberar_vaga()
+            self._available.notify()
+        self._discard(conn)
+
+    # ==================== MANUTENÇÃO ====================
+
+    def _count(self, stat: str, n: int = 1):
+        with self._lock:
+            super()._count(stat, n)
+
+    def _create(self) -> PooledConnection:
+        raw = self._connect()
+        self._count('connections_created')
+        return PooledConnection(raw)
+
+    def _discard(self, conn: PooledConnection):
+        conn.close()
+        self._count('connections_closed')
+
+    def _validate(self, conn: PooledConnection) -> Optional[PooledConnection]:
+        """
+        Retorna a conexão se ainda estiver saudável, ou None se precisar ser recriada
+        """
+        if self._expirada(conn):
+            self._discard(conn)
+            return None
+
+        if self.pre_ping:
+            try:
+                conn.raw.ping(reconnect=False)
+            except Exception:
+                self._discard(conn)
+                self._count('failed_pings')
+                return None
+
+        return conn
+
+    def close(self):
+        """Fecha todas as conexões ociosas e impede novos checkouts"""
+        with self._available:
+            ociosas = self._encerrar()
+            self._available.notify_all()
+
+        for conn in ociosas:
+            self._discard(conn)
+
+    def stats(self) -> Dict[str, Any]:
+        """Estatísticas do pool (para health check / monitoramento)"""
+        with self._lock:
+            return self._snapshot()
+
+
+class AsyncConnectionPool(_PoolBase):
+    """
+    Versão asyncio do ConnectionPool (para o driver mysql.connector.aio)
+
+    A espera por uma conexão livre suspende apenas a corrotina, nunca o
+    event loop. As conexões ficam presas ao event loop em que foram criadas.
+    """
+
+    def __init__(
+        self,
+        connect: Callable[[], Awaitable[Any]],
+        size: int = 5,
+        max_overflow: int = 10,
+        timeout: float = 30,
+        recycle_seconds: int = 3600,
+        pre_ping: bool = True,
+        name: str = "primary-async"
+    ):
+        super().__init__(size, max_overflow, timeout, recycle_seconds, pre_ping, name)
+        self._connect = connect
+        self.loop = asyncio.get_running_loop()
+        self._available = asyncio.Condition()
+
+    # ==================== CHECKOUT / CHECKIN ====================
+
+    async def acquire(self) -> PooledConnection:
+        """
+        Retira uma conexão do pool
+        Aguarda até `timeout` segundos se o pool + overflow estiverem esgotados
+        """
+        async with self._available:
+            self._verificar_aberto()
+            if self._esgotado():
+                self._stats['waits'] += 1
+                try:
+                    await asyncio.wait_for(
+                        self._available.wait_for(lambda: not self._esgotado()),
+                        timeout=self.timeout
+                    )
+                except asyncio.TimeoutError:
+                    raise self._erro_timeout()
+            conn = self._reservar()
+
+        try:
+            if conn is not None:
+                conn = await self._validate(conn)
+            if conn is None:
+                conn = await self._create()
+        except BaseException:
+            async with self._available:
+                self._liberar_vaga()
+                self._available.notify()
+            raise
+
+        conn.last_used = time.monotonic()
+        return conn
+
+    async def release(self, conn: PooledConnection):
+        """
+        Devolve a conexão ao pool
+        Transações pendentes são desfeitas; conexões de overflow são fechadas
+        """
+        descartar = False
+
+        try:
+            if conn.raw.in_transaction:
+                await conn.raw.rollback()
+        except Exception:
+            descartar = True
+
+        async with self._available:
+            descartar = self._devolver(conn, descartar)
+            self._available.notify()
+
+        if descartar:
+            await self._discard(conn)
+
+    async def discard(self, conn: PooledConnection):
+        """Remove do pool uma conexão em uso que ficou inutilizável"""
+        async with self._available:
+            self._liberar_vaga()
+            self._available.notify()
+        await self._discard(conn)
+
+    # ==================== MANUTENÇÃO ====================
+
+    async def _create(self) -> PooledConnection:
+        raw = await self._connect()
+        self._count('connections_created')
+        return PooledConnection(raw)
+
+    async def _discard(self, conn: PooledConnection):
+        try:
+            await conn.raw.close()
+        except Exception:
+            pass
+        self._count('connections_closed')
+
+    async def _validate(self, conn: PooledConnection) -> Optional[PooledConnection]:
+        """
+        Retorna a conexão se ainda estiver saudável, ou None se precisar ser recriada
+        """
+        if self._expirada(conn):
+            await self._discard(conn)
+            return None
+
+        if self.pre_ping:
+            try:
+                await conn.raw.ping(reconnect=False)
+            except Exception:
+                await self._discard(conn)
+                self._count('failed_pings')
+                return None
+
+        return conn
+
+    async def close(self):
+        """Fecha todas as conexões ociosas e impede novos checkouts"""
+        async with self._available:
+            ociosas = self._encerrar()
+            self._available.notify_all()
+
+        for conn in ociosas:
+            await self._discard(conn)
+
+    def stats(self) -> Dict[str, Any]:
+        """Estatísticas do pool (para health check / monitoramento)"""
+        return self._snapshot()
@@ -1,11 +1,22 @@
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from passlib.context import CryptContext
 from jose import JWTError, jwt
 from datetime import datetime, timedelta
-from typing import Optional, Union
+from typing import Any, Callable, Dict, Optional, Union
+from fastapi import HTTPException, status
 from app.core.config import settings
 
 # 🔥 MUDANÇA IMPORTANTE: Usando argon2 em vez de bcrypt
-pwd_context = CryptContext(schemes=["argon2"], deprecated="auto")
+# Os parâmetros valem para hashes novos; hashes antigos guardam os seus e continuam válidos
+pwd_context = CryptContext(
+    schemes=["argon2"],
+    deprecated="auto",
+    argon2__time_cost=settings.ARGON2_TIME_COST,
+    argon2__memory_cost=settings.ARGON2_MEMORY_COST,
+    argon2__parallelism=settings.ARGON2_PARALLELISM
+)
 
 def hash_password(password: str) -> str:
     """
@@ -19,6 +30,85 @@ def verify_password(plain_password: str, hashed_password: str) -> bool:
     """
     return pwd_context.verify(plain_password, hashed_password)
 
+# ==================== POOL DE HASHING ====================
+
+class PasswordHasherPool:
+    """
+    Executa o argon2 em threads dedicadas, fora do event loop e do threadpool
+    das requisições (o argon2-cffi libera o GIL, então threads bastam)
+
+    No máximo `workers` hashes rodam ao mesmo tempo e `max_queue` esperam;
+    acima disso a requisição falha na hora com 503 em vez de entrar numa fila
+    que derrubaria a latência de todas as outras rotas.
+    """
+
+    def __init__(self, workers: int = 2, max_queue: int = 16):
+        self.workers = workers
+        self.max_queue = max_queue
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._lock = threading.Lock()
+        self._pending = 0
+        self._stats = {'submitted': 0, 'completed': 0, 'rejected': 0}
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self.workers,
+                    thread_name_prefix="argon2"
+                )
+            return self._executor
+
+    async def run(self, fn: Callable[..., Any], *args) -> Any:
+        """Executa `fn(*args)` no pool ou levanta 503 se a fila estiver cheia"""
+        with self._lock:
+            if self._pending >= self.workers + self.max_queue:
+                self._stats['rejected'] += 1
+                raise HTTPException(
+                    status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                    detail="Servidor ocupado. Tente novamente em instantes.",
+                    headers={"Retry-After": "1"}
+                )
+            self._pending += 1
+            self._stats['submitted'] += 1
+
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self._get_executor(), fn, *args)
+        finally:
+            with self._lock:
+                self._pending -= 1
+                self._stats['completed'] += 1
+
+    def shutdown(self):
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                'workers': self.workers,
+                'max_queue': self.max_queue,
+                'pending': self._pending,
+                **self._stats
+            }
+
+
+password_hasher = PasswordHasherPool(
+    workers=settings.PASSWORD_HASH_WORKERS,
+    max_queue=settings.PASSWORD_HASH_MAX_QUEUE
+)
+
+async def hash_password_async(password: str) -> str:
+    """hash_password no pool de hashing (usar em endpoints async)"""
+    return await password_hasher.run(hash_password, password)
+
+async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+    """verify_password no pool de hashing (usar em endpoints async)"""
+    return await password_hasher.run(verify_password, plain_password, hashed_password)
+
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     """
     Cria um JWT access token
@@ -0,0 +1,44 @@
+"""
+Coalescência de chamadas idênticas em andamento (single-flight)
+Enquanto a primeira chamada de uma chave não termina, as demais com a mesma
+chave aguardam o mesmo resultado em vez de repetir o trabalho
+"""
+import asyncio
+import copy
+from typing import Any, Awaitable, Callable, Dict
+
+
+class SingleFlight:
+    """
+    Uma execução por chave por vez, no event loop do processo
+
+    O trabalho roda numa task própria: se quem a iniciou for cancelado
+    (ex.: cliente desconectou), os demais que aguardam continuam recebendo
+    o resultado. Cada chamador recebe uma cópia profunda do resultado.
+    """
+
+    def __init__(self):
+        self._inflight: Dict[str, asyncio.Task] = {}
+        self._stats = {'executions': 0, 'coalesced': 0}
+
+    async def do(self, key: str, func: Callable[[], Awaitable[Any]]) -> Any:
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.get_running_loop().create_task(func())
+            self._inflight[key] = task
+            task.add_done_callback(lambda t: self._forget(key, t))
+            self._stats['executions'] += 1
+        else:
+            self._stats['coalesced'] += 1
+
+        resultado = await asyncio.shield(task)
+        return copy.deepcopy(resultado)
+
+    def _forget(self, key: str, task: asyncio.Task):
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+        if not task.cancelled():
+            task.exception()  # marca a exceção como recuperada (evita warning no log)
+
+    def stats(self) -> Dict[str, Any]:
+        return {**self._stats, 'inflight': len(self._inflight)}
@@ -0,0 +1,129 @@
+"""
+Skip list indexável (estatística de ordem)
+Inserção, remoção, posição de uma chave e chave na posição i em O(log n)
+"""
+import random
+from typing import Any, Iterator, List, Optional
+
+
+class _No:
+    __slots__ = ('chave', 'proximos', 'larguras')
+
+    def __init__(self, chave: Any, niveis: int):
+        self.chave = chave
+        self.proximos: List[Optional['_No']] = [None] * niveis
+        # larguras[n] = quantos elementos o salto proximos[n] avança
+        # (para proximos[n] = None, a distância até o fim da lista)
+        self.larguras: List[int] = [1] * niveis
+
+
+class IndexableSkipList:
+    """
+    Conjunto ordenado de chaves distintas e comparáveis (ex.: tuplas)
+
+    Cada salto guarda quantos elementos ele pula, então a posição de uma chave
+    é a soma dos saltos até ela, e a chave na posição i é achada descendo pelos
+    níveis sem passar de i. Não é thread-safe: quem a usa sincroniza o acesso.
+    """
+
+    def __init__(self, max_niveis: int = 24, seed: Optional[int] = None):
+        self.max_niveis = max_niveis
+        self._cabeca = _No(None, max_niveis)
+        self._tamanho = 0
+        self._random = random.Random(seed)
+
+    def __len__(self) -> int:
+        return self._tamanho
+
+    def _sortear_niveis(self) -> int:
+        niveis = 1
+        while niveis < self.max_niveis and self._random.getrandbits(1):
+            niveis += 1
+        return niveis
+
+    def _antecessores(self, chave: Any):
+        """Último nó com chave < `chave` em cada nível e a posição de cada um"""
+        caminho: List[_No] = [self._cabeca] * self.max_niveis
+        posicoes = [0] * self.max_niveis
+        no, posicao = self._cabeca, 0
+        for nivel in reversed(range(self.max_niveis)):
+            while no.proximos[nivel] is not None and no.proximos[nivel].chave < chave:
+                posicao += no.larguras[nivel]
+                no = no.proximos[nivel]
+            caminho[nivel] = no
+            posicoes[nivel] = posicao
+        return caminho, posicoes
+
+    def insert(self, chave: Any):
+        caminho, posicoes = self._antecessores(chave)
+        seguinte = caminho[0].proximos[0]
+        if seguinte is not None and seguinte.chave == chave:
+            raise KeyError(f"Chave duplicada: {chave!r}")
+
+        niveis = self._sortear_niveis()
+        novo = _No(chave, niveis)
+        posicao_nova = posicoes[0] + 1
+        for nivel in range(niveis):
+            anterior = caminho[nivel]
+            avanco = posicao_nova - posicoes[nivel]  # do anterior até o novo
+            novo.proximos[nivel] = anterior.proximos[nivel]
+            novo.larguras[nivel] = anterior.larguras[nivel] - avanco + 1
+            anterior.proximos[nivel] = novo
+            anterior.larguras[nivel] = avanco
+        for nivel in range(niveis, self.max_niveis):
+            caminho[nivel].larguras[nivel] += 1
+        self._tamanho += 1
+
+    def remove(self, chave: Any):
+        caminho, _ = self._antecessores(chave)
+        alvo = caminho[0].proximos[0]
+        if alvo is None or alvo.chave != chave:
+            raise KeyError(chave)
+
+        niveis = len(alvo.proximos)
+        for nivel in range(niveis):
+            anterior = caminho[nivel]
+            anterior.larguras[nivel] += alvo.larguras[nivel] - 1
+            anterior.proximos[nivel] = alvo.proximos[nivel]
+        for nivel in range(niveis, self.max_niveis):
+            caminho[nivel].larguras[nivel] -= 1
+        self._tamanho -= 1
+
+    def count_less(self, chave: Any) -> int:
+        """Quantas chaves são menores que `chave` (ela estando ou não na lista)"""
+        _, posicoes = self._antecessores(chave)
+        return posicoes[0]
+
+    def index(self, chave: Any) -> int:
+        """Posição (0-based) da chave; KeyError se não está na lista"""
+        caminho, posicoes = self._antecessores(chave)
+        seguinte = caminho[0].proximos[0]
+        if seguinte is None or seguinte.chave != chave:
+            raise KeyError(chave)
+        return posicoes[0]
+
+    def _no_na_posicao(self, indice: int) -> _No:
+        if not 0 <= indice < self._tamanho:
+            raise IndexError(indice)
+        restante = indice + 1
+        no = self._cabeca
+        for nivel in reversed(range(self.max_niveis)):
+            while no.proximos[nivel] is not None and no.larguras[nivel] <= restante:
+                restante -= no.larguras[nivel]
+                no = no.proximos[nivel]
+        return no
+
+    def __getitem__(self, indice: int) -> Any:
+        return self._no_na_posicao(indice).chave
+
+    def iter_from(self, indice: int) -> Iterator[Any]:
+        """Chaves a partir da posição `indice`, em ordem"""
+        if indice >= self._tamanho:
+            return
+        no = self._no_na_posicao(max(indice, 0))
+        while no is not None:
+            yield no.chave
+            no = no.proximos[0]
+
+    def __iter__(self) -> Iterator[Any]:
+        return self.iter_from(0)
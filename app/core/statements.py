@@ -0,0 +1,115 @@
+"""
+Cache de prepared statements por conexão
+O MySQL faz o parse de cada statement uma vez por conexão; as execuções
+seguintes enviam só o id do statement e os parâmetros (protocolo binário)
+"""
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+# Statement que o MySQL não aceita no protocolo de prepared statements
+ER_UNSUPPORTED_PS = 1295
+
+
+class RowBuffer:
+    """
+    Resultado já lido de um cursor preparado, com a interface de fetch de um cursor
+    (cursores preparados não são buffered: as linhas precisam ser lidas antes do
+    próximo statement na mesma conexão)
+    """
+
+    __slots__ = ('_rows', '_pos')
+
+    def __init__(self, rows: List[Any]):
+        self._rows = rows
+        self._pos = 0
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+    def fetchone(self):
+        if self._pos >= len(self._rows):
+            return None
+        row = self._rows[self._pos]
+        self._pos += 1
+        return row
+
+    def fetchmany(self, size=1):
+        rows = self._rows[self._pos:self._pos + size]
+        self._pos += len(rows)
+        return rows
+
+    def fetchall(self):
+        rows = self._rows[self._pos:]
+        self._pos = len(self._rows)
+        return rows
+
+
+class PreparedStatementStats:
+    """Contadores globais (todas as conexões do processo)"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._stats = {'hits': 0, 'misses': 0, 'evictions': 0, 'unsupported': 0}
+
+    def incr(self, key: str):
+        with self._lock:
+            self._stats[key] += 1
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            stats = dict(self._stats)
+        total = stats['hits'] + stats['misses']
+        stats['hit_rate'] = round(stats['hits'] / total, 4) if total else 0.0
+        return stats
+
+
+prepared_stats = PreparedStatementStats()
+
+
+class PreparedStatementCache:
+    """
+    LRU de cursores preparados de UMA conexão, indexado pelo texto do SQL
+
+    O cursor preparado só reaproveita o statement se receber o mesmo objeto
+    de string (`operation is self._executed`), por isso o cache devolve a
+    string guardada junto com o cursor.
+
+    Não é thread-safe: uma conexão do pool é usada por uma requisição de cada vez.
+    """
+
+    def __init__(self, capacity: int = 32):
+        self.capacity = capacity
+        self._entries: "OrderedDict[str, Tuple[str, Any]]" = OrderedDict()
+        self._unsupported: Set[str] = set()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def supports(self, sql: str) -> bool:
+        return sql not in self._unsupported
+
+    def get(self, sql: str) -> Optional[Tuple[str, Any]]:
+        """(sql guardado, cursor) se o statement já foi preparado nesta conexão"""
+        entry = self._entries.get(sql)
+        if entry is None:
+            prepared_stats.incr('misses')
+            return None
+        self._entries.move_to_end(sql)
+        prepared_stats.incr('hits')
+        return entry
+
+    def put(self, sql: str, cursor: Any) -> Optional[Any]:
+        """Guarda o cursor; devolve o cursor despejado (o chamador deve fechá-lo)"""
+        self._entries[sql] = (sql, cursor)
+        if len(self._entries) > self.capacity:
+            _, (_, evicted) = self._entries.popitem(last=False)
+            prepared_stats.incr('evictions')
+            return evicted
+        return None
+
+    def mark_unsupported(self, sql: str):
+        """Statement não pode ser preparado: passa a usar o protocolo texto (o chamador fecha o cursor)"""
+        self._unsupported.add(sql)
+        self._entries.pop(sql, None)
+        prepared_stats.incr('unsupported')
@@ -2,7 +2,17 @@
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from app.core.config import settings
+from app.core.database import Database
+from app.core.async_database import AsyncDatabase
+from app.core.background import background_tasks
+from app.core.security import password_hasher
 from app.api.v1.router import api_router
+from app.middleware.timing import ServerTimingMiddleware
+from app.services.grading_queue import grading_queue
+from app.services.leaderboard_service import leaderboard
+from app.services import ranking_mensal_service
+from app.services.ranking_area_service import ranking_por_area
+from app.services.ranking_periodo_service import ranking_periodo
 
 # Criar aplicação FastAPI
 app = FastAPI(
@@ -22,6 +32,9 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Tempo de banco por requisição (header Server-Timing + log de queries lentas)
+app.add_middleware(ServerTimingMiddleware)
+
 # Incluir rotas da API v1
 app.include_router(api_router, prefix=settings.API_V1_PREFIX)
 
@@ -37,11 +50,11 @@ def root():
 
 @app.get("/health")
 def health_check():
-    """Endpoint de health check"""
-    return {
-        "status": "healthy",
-        "environment": settings.ENVIRONMENT
-    }
+    """
+    Endpoint de health check (público: só o estado)
+    Pools, fila e tarefas em segundo plano: GET /admin/processo
+    """
+    return {"status": "healthy"}
 
 # Event handlers
 @app.on_event("startup")
@@ -49,8 +62,20 @@ async def startup_event():
     """Executado quando a API inicia"""
     print(f"🚀 API iniciada no ambiente: {settings.ENVIRONMENT}")
     print(f"📚 Documentação disponível em: /docs")
+    # Pools síncronos criados antes das requisições (as conexões abrem sob demanda)
+    Database.get_pool()
+    Database.get_replicas()
+    grading_queue.start()
+    leaderboard.start()
+    ranking_mensal_service.start()
+    ranking_periodo.start()
+    ranking_por_area.start()
 
 @app.on_event("shutdown")
 async def shutdown_event():
     """Executado quando a API desliga"""
+    await background_tasks.shutdown()
+    Database.close_pool()
+    await AsyncDatabase.close_pool()
+    password_hasher.shutdown()
     print("🛑 API desligada")
\ No newline at end of file
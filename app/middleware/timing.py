@@ -0,0 +1,38 @@
+"""
+Middleware de tempo por requisição
+Abre o registro de queries da requisição e devolve o resumo no header Server-Timing
+"""
+from app.core.config import settings
+from app.core.instrumentation import current_request, end_request, server_timing, start_request
+
+
+class ServerTimingMiddleware:
+    """
+    Middleware ASGI puro (não bufferiza o corpo, funciona com StreamingResponse)
+
+    O header é montado quando a resposta começa: queries executadas depois
+    disso (ex.: dentro de um stream) entram nos agregados, mas não no header.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not settings.DB_INSTRUMENTATION:
+            await self.app(scope, receive, send)
+            return
+
+        token = start_request(scope)
+        requisicao = current_request()
+
+        async def send_with_timing(message):
+            if message["type"] == "http.response.start":
+                headers = list(message.get("headers", []))
+                headers.append((b"server-timing", server_timing(requisicao).encode("latin-1")))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            end_request(token)
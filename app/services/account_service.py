@@ -0,0 +1,143 @@
+"""
+Busca de contas (users + empresas) para login e verificação de email
+Uma única ida ao banco resolve o email/token nas duas tabelas
+"""
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+from app.core.config import settings
+
+# Só as colunas que login/verificação usam (sem os campos de texto grandes)
+_LOOKUP_EMAIL = """
+SELECT 0 AS prioridade, 'user' AS tipo, id, nome, email, senha_hash, ativo, email_verificado
+FROM users WHERE email = %s
+UNION ALL
+SELECT 1 AS prioridade, 'empresa' AS tipo, id, nome, email, senha_hash, ativo, email_verificado
+FROM empresas WHERE email = %s
+ORDER BY prioridade
+LIMIT 1
+"""
+
+_LOOKUP_TOKEN = """
+SELECT 0 AS prioridade, 'user' AS tipo, id, nome, email, email_verificado
+FROM users WHERE token_verificacao = %s
+UNION ALL
+SELECT 1 AS prioridade, 'empresa' AS tipo, id, nome, email, email_verificado
+FROM empresas WHERE token_verificacao = %s
+ORDER BY prioridade
+LIMIT 1
+"""
+
+TABELAS = {'user': 'users', 'empresa': 'empresas'}
+
+
+# ==================== CACHE NEGATIVO ====================
+
+class NegativeEmailCache:
+    """
+    Lembra emails que não pertencem a nenhuma conta
+
+    Um email só passa a ser respondido pelo cache depois de `threshold` buscas
+    sem resultado dentro da janela: tentativas repetidas com email errado param
+    de ir ao MySQL, mas quem se cadastrou há pouco em outro worker não é barrado
+    por um único login anterior ao cadastro.
+    """
+
+    def __init__(self, ttl_seconds: int = 30, threshold: int = 2, max_entries: int = 10000):
+        self.ttl_seconds = ttl_seconds
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[str, list]" = OrderedDict()  # email -> [expira_em, falhas]
+        self._stats = {'hits': 0, 'misses_recorded': 0, 'forgotten': 0}
+
+    @staticmethod
+    def _key(email: str) -> str:
+        return email.strip().lower()
+
+    def is_known_missing(self, email: str) -> bool:
+        if self.ttl_seconds <= 0:
+            return False
+        key = self._key(email)
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return False
+            if entry[0] <= now:
+                del self._entries[key]
+                return False
+            if entry[1] >= self.threshold:
+                self._stats['hits'] += 1
+                return True
+            return False
+
+    def record_missing(self, email: str):
+        if self.ttl_seconds <= 0:
+            return
+        key = self._key(email)
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] <= now:
+                self._entries[key] = [now + self.ttl_seconds, 1]
+            else:
+                entry[1] += 1
+            self._entries.move_to_end(key)
+            self._stats['misses_recorded'] += 1
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def forget(self, email: str):
+        """Chamado no cadastro: o email passa a existir"""
+        with self._lock:
+            if self._entries.pop(self._key(email), None) is not None:
+                self._stats['forgotten'] += 1
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                'size': len(self._entries),
+                'ttl_seconds': self.ttl_seconds,
+                'threshold': self.threshold,
+                **self._stats
+            }
+
+
+negative_email_cache = NegativeEmailCache(
+    ttl_seconds=settings.AUTH_NEGATIVE_CACHE_SECONDS,
+    threshold=settings.AUTH_NEGATIVE_CACHE_THRESHOLD
+)
+
+
+# ==================== BUSCAS ====================
+
+async def buscar_conta_por_email(cursor, email: str) -> Optional[Dict[str, Any]]:
+    """
+    Resolve o email em users ou empresas (users tem prioridade)
+    Retorna {tipo, id, nome, email, senha_hash, ativo, email_verificado} ou None
+    """
+    if negative_email_cache.is_known_missing(email):
+        return None
+
+    await cursor.execute(_LOOKUP_EMAIL, (email, email))
+    conta = await cursor.fetchone()
+
+    if conta is None:
+        negative_email_cache.record_missing(email)
+    return conta
+
+
+async def buscar_conta_por_token(cursor, token: str) -> Optional[Dict[str, Any]]:
+    """
+    Resolve o token de verificação em users ou empresas
+    Retorna {tipo, id, nome, email, email_verificado} ou None
+    """
+    await cursor.execute(_LOOKUP_TOKEN, (token, token))
+    return await cursor.fetchone()
+
+
+def esquecer_email_inexistente(email: str):
+    """Remove o email do cache negativo (após cadastro de user/empresa)"""
+    negative_email_cache.forget(email)
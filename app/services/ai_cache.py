@@ -0,0 +1,363 @@
+"""
+Backends do cache de análises da IA
+memory: LRU por processo | sqlite: arquivo compartilhado pelos workers do host |
+redis: compartilhado entre hosts (dependência opcional: pip install redis)
+
+Os valores são guardados como JSON: cada leitura devolve uma cópia nova
+e o tamanho em bytes de cada entrada é conhecido.
+"""
+import json
+import os
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+from app.core.config import settings
+
+try:
+    import redis
+except ImportError:  # Redis é opcional
+    redis = None
+
+
+class AICacheBackend(ABC):
+    """
+    Interface dos backends de cache
+
+    `blocking` indica se as operações fazem I/O (arquivo/rede): nesse caso o
+    serviço de IA as executa no threadpool, fora do event loop.
+    """
+
+    name = "base"
+    blocking = False
+
+    def __init__(self, ttl_seconds: int):
+        self.ttl_seconds = ttl_seconds
+        self._lock = threading.Lock()
+        self._stats = {'hits': 0, 'misses': 0, 'sets': 0, 'evictions': 0, 'expirations': 0, 'errors': 0}
+
+    @abstractmethod
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """Valor guardado em `key` (None se ausente, expirado ou backend indisponível)"""
+        pass
+
+    @abstractmethod
+    def set(self, key: str, value: Dict[str, Any]):
+        """Guarda `value` por ttl_seconds; falha do backend não propaga"""
+        pass
+
+    @abstractmethod
+    def clear(self):
+        """Remove todas as entradas; falha do backend não propaga"""
+        pass
+
+    def _count(self, stat: str, n: int = 1):
+        with self._lock:
+            self._stats[stat] += n
+
+    def _storage_stats(self) -> Dict[str, Any]:
+        return {}
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stats = dict(self._stats)
+        total = stats['hits'] + stats['misses']
+        stats['hit_rate'] = round(stats['hits'] / total, 4) if total else 0.0
+        stats['backend'] = self.name
+        stats['ttl_seconds'] = self.ttl_seconds
+        stats.update(self._storage_stats())
+        return stats
+
+
+# ==================== MEMÓRIA (LRU) ====================
+
+class MemoryAICache(AICacheBackend):
+    """LRU por processo, limitado por número de entradas e por bytes"""
+
+    name = "memory"
+
+    def __init__(self, ttl_seconds: int, max_entries: int = 1000, max_bytes: int = 50 * 1024 * 1024):
+        super().__init__(ttl_seconds)
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[str, Tuple[float, str]]" = OrderedDict()  # key -> (expira_em, json)
+        self._bytes = 0
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] <= now:
+                self._remove(key)
+                self._stats['expirations'] += 1
+                entry = None
+            if entry is None:
+                self._stats['misses'] += 1
+                return None
+            self._entries.move_to_end(key)
+            self._stats['hits'] += 1
+        return json.loads(entry[1])
+
+    def set(self, key: str, value: Dict[str, Any]):
+        data = json.dumps(value, default=str)
+        if len(data) > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (time.monotonic() + self.ttl_seconds, data)
+            self._bytes += len(data)
+            self._stats['sets'] += 1
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                self._remove(next(iter(self._entries)))
+                self._stats['evictions'] += 1
+
+    def _remove(self, key: str):
+        _, data = self._entries.pop(key)
+        self._bytes -= len(data)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def _storage_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                'entries': len(self._entries),
+                'bytes': self._bytes,
+                'max_entries': self.max_entries,
+                'max_bytes': self.max_bytes
+            }
+
+
+# ==================== SQLITE (ARQUIVO) ====================
+
+class SQLiteAICache(AICacheBackend):
+    """
+    Cache em arquivo SQLite (modo WAL), compartilhado pelos workers do uvicorn
+    no mesmo host e preservado entre restarts enquanto o disco existir
+
+    Contadores de hit/miss são deste processo; entradas e bytes são do arquivo.
+    """
+
+    name = "sqlite"
+    blocking = True
+
+    def __init__(self, path: str, ttl_seconds: int, max_entries: int = 1000, max_bytes: int = 50 * 1024 * 1024):
+        super().__init__(ttl_seconds)
+        self.path = path
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._local = threading.local()
+
+        diretorio = os.path.dirname(path)
+        if diretorio:
+            os.makedirs(diretorio, exist_ok=True)
+        conn = self._conn()
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS ai_cache (
+                key TEXT PRIMARY KEY,
+                value TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                expires_at REAL NOT NULL,
+                last_access REAL NOT NULL
+            )
+        """)
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_ai_cache_access ON ai_cache (last_access)")
+
+    def _conn(self) -> sqlite3.Connection:
+        """Uma conexão por thread (o threadpool reaproveita as threads)"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            conn.execute("PRAGMA busy_timeout=5000")
+            self._local.conn = conn
+        return conn
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        now = time.time()
+        try:
+            conn = self._conn()
+            row = conn.execute(
+                "SELECT value, expires_at FROM ai_cache WHERE key = ?", (key,)
+            ).fetchone()
+            if row is not None and row[1] <= now:
+                conn.execute("DELETE FROM ai_cache WHERE key = ?", (key,))
+                self._count('expirations')
+                row = None
+            if row is None:
+                self._count('misses')
+                return None
+            conn.execute("UPDATE ai_cache SET last_access = ? WHERE key = ?", (now, key))
+        except sqlite3.Error as e:
+            self._count('errors')
+            print(f"⚠️ Cache SQLite indisponível: {e}")
+            return None
+
+        self._count('hits')
+        return json.loads(row[0])
+
+    def set(self, key: str, value: Dict[str, Any]):
+        data = json.dumps(value, default=str)
+        now = time.time()
+        try:
+            conn = self._conn()
+            conn.execute(
+                "INSERT OR REPLACE INTO ai_cache (key, value, size, expires_at, last_access) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (key, data, len(data), now + self.ttl_seconds, now)
+            )
+            self._count('sets')
+            self._evict(conn, now)
+        except sqlite3.Error as e:
+            self._count('errors')
+            print(f"⚠️ Cache SQLite indisponível: {e}")
+
+    def _evict(self, conn: sqlite3.Connection, now: float):
+        """Remove expirados e, se ainda acima dos limites, os menos acessados"""
+        expirados = conn.execute("DELETE FROM ai_cache WHERE expires_at <= ?", (now,)).rowcount
+        if expirados:
+            self._count('expirations', expirados)
+
+        entries, total_bytes = conn.execute(
+            "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM ai_cache"
+        ).fetchone()
+        if entries <= self.max_entries and total_bytes <= self.max_bytes:
+            return
+
+        removidos = 0
+        for key, size in conn.execute(
+            "SELECT key, size FROM ai_cache ORDER BY last_access"
+        ).fetchall():
+            if entries <= self.max_entries and total_bytes <= self.max_bytes:
+                break
+            conn.execute("DELETE FROM ai_cache WHERE key = ?", (key,))
+            entries -= 1
+            total_bytes -= size
+            removidos += 1
+        self._count('evictions', removidos)
+
+    def clear(self):
+        try:
+            self._conn().execute("DELETE FROM ai_cache")
+        except sqlite3.Error as e:
+            self._count('errors')
+            print(f"⚠️ Cache SQLite indisponível: {e}")
+
+    def _storage_stats(self) -> Dict[str, Any]:
+        try:
+            entries, total_bytes = self._conn().execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM ai_cache"
+            ).fetchone()
+        except sqlite3.Error:
+            entries = total_bytes = None
+        return {
+            'entries': entries,
+            'bytes': total_bytes,
+            'max_entries': self.max_entries,
+            'max_bytes': self.max_bytes,
+            'path': self.path
+        }
+
+
+# ==================== REDIS ====================
+
+class RedisAICache(AICacheBackend):
+    """
+    Cache em Redis (ou compatível: Valkey, KeyDB, Upstash)
+    Expiração pelo TTL das chaves; o limite de memória e a política de
+    eviction são os do servidor (maxmemory / maxmemory-policy)
+    """
+
+    name = "redis"
+    blocking = True
+    prefix = "nerus:ai:"
+
+    def __init__(self, url: str, ttl_seconds: int):
+        super().__init__(ttl_seconds)
+        self.client = redis.Redis.from_url(url, socket_timeout=2, socket_connect_timeout=2)
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        try:
+            data = self.client.get(self.prefix + key)
+        except redis.RedisError as e:
+            self._count('errors')
+            print(f"⚠️ Cache Redis indisponível: {e}")
+            return None
+
+        if data is None:
+            self._count('misses')
+            return None
+        self._count('hits')
+        return json.loads(data)
+
+    def set(self, key: str, value: Dict[str, Any]):
+        try:
+            self.client.set(self.prefix + key, json.dumps(value, default=str), ex=self.ttl_seconds)
+            self._count('sets')
+        except redis.RedisError as e:
+            self._count('errors')
+            print(f"⚠️ Cache Redis indisponível: {e}")
+
+    def clear(self):
+        try:
+            chaves = list(self.client.scan_iter(match=self.prefix + "*", count=500))
+            for i in range(0, len(chaves), 500):
+                self.client.delete(*chaves[i:i + 500])
+        except redis.RedisError as e:
+            self._count('errors')
+            print(f"⚠️ Cache Redis indisponível: {e}")
+
+    def _storage_stats(self) -> Dict[str, Any]:
+        try:
+            info = self.client.info()
+            return {
+                'server_evicted_keys': info.get('evicted_keys'),
+                'server_expired_keys': info.get('expired_keys'),
+                'used_memory': info.get('used_memory'),
+                'maxmemory_policy': info.get('maxmemory_policy')
+            }
+        except redis.RedisError:
+            return {'server': 'indisponível'}
+
+
+# ==================== FACTORY ====================
+
+def create_ai_cache() -> AICacheBackend:
+    """Cria o backend configurado em AI_CACHE_BACKEND (memory se o escolhido não estiver disponível)"""
+    ttl = settings.AI_CACHE_TTL_HOURS * 3600
+    limites = {
+        'max_entries': settings.AI_CACHE_MAX_ENTRIES,
+        'max_bytes': settings.AI_CACHE_MAX_BYTES
+    }
+    backend = settings.AI_CACHE_BACKEND
+
+    if backend == "redis":
+        if redis is None:
+            print("⚠️ AI_CACHE_BACKEND=redis, mas o pacote redis não está instalado. Usando memória.")
+        elif not settings.AI_CACHE_REDIS_URL:
+            print("⚠️ AI_CACHE_BACKEND=redis sem AI_CACHE_REDIS_URL. Usando memória.")
+        else:
+            return RedisAICache(settings.AI_CACHE_REDIS_URL, ttl)
+    elif backend == "sqlite":
+        try:
+            return SQLiteAICache(settings.AI_CACHE_SQLITE_PATH, ttl, **limites)
+        except (sqlite3.Error, OSError) as e:
+            print(f"⚠️ Não foi possível abrir o cache SQLite ({e}). Usando memória.")
+
+    return MemoryAICache(ttl, **limites)
+
+
+_ai_cache: Optional[AICacheBackend] = None
+
+
+def get_ai_cache() -> AICacheBackend:
+    """Retorna o backend global do cache de análises (criado no primeiro uso)"""
+    global _ai_cache
+    if _ai_cache is None:
+        _ai_cache = create_ai_cache()
+    return _ai_cache
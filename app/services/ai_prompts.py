@@ -1,46 +1,58 @@
 """
 Templates de prompts otimizados para análise de soluções
 """
+import math
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, List, Tuple
 
-def get_analise_prompt(problema: dict, solucao_texto: str) -> str:
+# Média de caracteres por token dos tokenizers (Gemini/Llama) em texto em português
+CARACTERES_POR_TOKEN = 3.5
+
+# Tamanho típico da resposta JSON da análise (o limite é max_tokens=2048)
+TOKENS_RESPOSTA_ESTIMADOS = 1024
+
+
+def estimar_tokens(prompt: str) -> int:
     """
-    Gera prompt otimizado para análise de solução
-    
-    Args:
-        problema: Dict com dados do problema
-        solucao_texto: Texto da solução submetida
-    
-    Returns:
-        Prompt formatado para a IA
+    Estimativa de tokens de uma chamada (prompt + resposta esperada)
+    Usada pelo rate limiter para respeitar a cota de tokens/minuto dos providers
     """
-    
-    prompt = f"""Você é um avaliador técnico especializado da plataforma NERUS, responsável por avaliar soluções de estudantes angolanos para problemas reais de empresas.
+    return math.ceil(len(prompt) / CARACTERES_POR_TOKEN) + TOKENS_RESPOSTA_ESTIMADOS
+
+
+# Parte do prompt que depende só do problema (campos preenchidos por PromptBuilder)
+_TEMPLATE_PROBLEMA = """Você é um avaliador técnico especializado da plataforma NERUS, responsável por avaliar soluções de estudantes angolanos para problemas reais de empresas.
 
 ## CONTEXTO DO PROBLEMA
 
-**Título:** {problema['titulo']}
+**Título:** {titulo}
 
 **Descrição do Problema:**
-{problema['descricao']}
+{descricao}
 
-**Área:** {problema.get('area', 'Não especificada')}
+**Área:** {area}
 
-**Nível de Dificuldade:** {problema.get('nivel_dificuldade', 'intermediario')}
+**Nível de Dificuldade:** {nivel_dificuldade}
 
 **Contexto da Empresa:**
-{problema.get('contexto_empresa', 'Não fornecido')}
+{contexto_empresa}
 
 **Objetivos Esperados:**
-{problema.get('objetivos', 'Resolver o problema de forma prática e viável')}
+{objetivos}
 
 **Requisitos Técnicos:**
-{problema.get('requisitos', 'Não especificados')}
+{requisitos}
 
 ---
 
-## SOLUÇÃO SUBMETIDA PELO ESTUDANTE
+"""
+
+_CABECALHO_SOLUCAO = "## SOLUÇÃO SUBMETIDA PELO ESTUDANTE\n\n"
 
-{solucao_texto}
+
+# Tarefa, formato da resposta e critérios: parte fixa de todo prompt de análise
+INSTRUCOES_ANALISE = """
 
 ---
 
@@ -83,7 +95,7 @@ Avalie considerando:
 
 O JSON deve ter EXATAMENTE esta estrutura:
 
-{{
+{
   "pontuacao": <número entre 0-100>,
   "status_recomendado": "<aprovada|reprovada|revisao>",
   "feedback": "<análise geral em 2-3 parágrafos>",
@@ -97,18 +109,18 @@ O JSON deve ter EXATAMENTE esta estrutura:
     "<melhoria 2>",
     "<melhoria 3>"
   ],
-  "criterios": {{
+  "criterios": {
     "adequacao_problema": <0-30>,
     "qualidade_tecnica": <0-25>,
     "criatividade": <0-20>,
     "clareza": <0-15>,
     "viabilidade": <0-10>
-  }},
+  },
   "recomendacoes_especificas": [
     "<recomendação prática 1>",
     "<recomendação prática 2>"
   ]
-}}
+}
 
 ## CRITÉRIOS DE APROVAÇÃO
 
@@ -128,7 +140,172 @@ O JSON deve ter EXATAMENTE esta estrutura:
 
 RESPONDA AGORA APENAS COM O JSON (SEM MARKDOWN):"""
 
-    return prompt
+
+# ==================== MONTAGEM COM ORÇAMENTO DE TOKENS ====================
+
+# Campos do problema que podem ser cortados (os demais são curtos)
+CAMPOS_LONGOS_PROBLEMA = ('descricao', 'contexto_empresa', 'objetivos', 'requisitos')
+
+# Fração do espaço livre do orçamento que a seção do problema pode ocupar;
+# o restante fica para a solução do estudante
+FRACAO_MAXIMA_PROBLEMA = 0.4
+
+# Nenhum campo cortado fica menor que isso, mesmo com orçamento muito pequeno
+MINIMO_CARACTERES_CAMPO = 300
+
+_CAMPOS_TEMPLATE = ('titulo', 'area', 'nivel_dificuldade', *CAMPOS_LONGOS_PROBLEMA)
+
+# Caracteres do texto fixo (template sem os campos + instruções): contados uma vez
+_CARACTERES_TEMPLATE = len(_TEMPLATE_PROBLEMA.format(**dict.fromkeys(_CAMPOS_TEMPLATE, '')))
+_CARACTERES_FIXOS = _CARACTERES_TEMPLATE + len(_CABECALHO_SOLUCAO) + len(INSTRUCOES_ANALISE)
+
+
+def cortar_texto(texto: str, max_caracteres: int) -> str:
+    """
+    Reduz o texto a ~max_caracteres mantendo o início (2/3) e o fim (1/3),
+    onde costumam estar a proposta e a conclusão
+    """
+    if len(texto) <= max_caracteres:
+        return texto
+    marcador = f"\n\n[... {len(texto) - max_caracteres} caracteres omitidos ...]\n\n"
+    manter = max(max_caracteres - len(marcador), 0)
+    inicio = manter * 2 // 3
+    fim = manter - inicio
+    return texto[:inicio] + marcador + (texto[-fim:] if fim else '')
+
+
+def _distribuir(tamanhos: Dict[str, int], disponivel: int) -> Dict[str, int]:
+    """
+    Divide `disponivel` caracteres entre os campos (max-min justo): campos
+    menores que a parte igual ficam inteiros e a sobra vai para os maiores
+    """
+    limites = {}
+    restantes = sorted(tamanhos, key=tamanhos.get)
+    while restantes:
+        parte = max(disponivel // len(restantes), MINIMO_CARACTERES_CAMPO)
+        campo = restantes[0]
+        if tamanhos[campo] > parte:
+            for campo in restantes:
+                limites[campo] = parte
+            break
+        limites[campo] = tamanhos[campo]
+        disponivel -= tamanhos[campo]
+        restantes.pop(0)
+    return limites
+
+
+class PromptMontado:
+    """Prompt de análise pronto para envio, com a estimativa de tokens da chamada"""
+
+    def __init__(self, texto: str, campos_cortados: List[str]):
+        self.texto = texto
+        self.campos_cortados = campos_cortados
+        self.tokens_estimados = estimar_tokens(texto)
+
+
+class PromptBuilder:
+    """
+    Monta o prompt de análise dentro do orçamento de tokens do provider
+
+    O texto fixo (template e instruções) é medido uma vez no import; a seção de
+    cada problema é renderizada uma vez por orçamento e reaproveitada por todas
+    as soluções do problema (LRU de `max_secoes`). Campos grandes demais são
+    cortados com cortar_texto para caber no orçamento.
+    """
+
+    def __init__(self, max_secoes: int = 256):
+        self.max_secoes = max_secoes
+        self._secoes: "OrderedDict[tuple, Tuple[str, List[str]]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = {'section_hits': 0, 'section_misses': 0, 'prompts': 0, 'truncated': 0}
+
+    def secao_problema(self, problema: Dict[str, Any], max_caracteres: int = 0) -> Tuple[str, List[str]]:
+        """
+        (seção do problema, campos cortados); max_caracteres 0 = sem limite
+        A chave inclui os campos: editar o problema gera outra seção
+        """
+        valores = {
+            'titulo': problema['titulo'],
+            'descricao': problema['descricao'],
+            'area': problema.get('area', 'Não especificada'),
+            'nivel_dificuldade': problema.get('nivel_dificuldade', 'intermediario'),
+            'contexto_empresa': problema.get('contexto_empresa', 'Não fornecido'),
+            'objetivos': problema.get('objetivos', 'Resolver o problema de forma prática e viável'),
+            'requisitos': problema.get('requisitos', 'Não especificados')
+        }
+        valores = {campo: str(valor) for campo, valor in valores.items()}
+        chave = (max_caracteres, *valores.values())
+
+        with self._lock:
+            secao = self._secoes.get(chave)
+            if secao is not None:
+                self._secoes.move_to_end(chave)
+                self._stats['section_hits'] += 1
+                return secao
+            self._stats['section_misses'] += 1
+
+        cortados = []
+        if max_caracteres:
+            curtos = sum(len(v) for c, v in valores.items() if c not in CAMPOS_LONGOS_PROBLEMA)
+            tamanhos = {campo: len(valores[campo]) for campo in CAMPOS_LONGOS_PROBLEMA}
+            for campo, limite in _distribuir(tamanhos, max_caracteres - curtos).items():
+                if tamanhos[campo] > limite:
+                    valores[campo] = cortar_texto(valores[campo], limite)
+                    cortados.append(campo)
+
+        secao = (_TEMPLATE_PROBLEMA.format(**valores), cortados)
+        with self._lock:
+            self._secoes[chave] = secao
+            while len(self._secoes) > self.max_secoes:
+                self._secoes.popitem(last=False)
+        return secao
+
+    def montar(self, problema: Dict[str, Any], solucao_texto: str, max_tokens: int = 0) -> PromptMontado:
+        """
+        Prompt completo para a solução; max_tokens é o orçamento da chamada
+        (prompt + resposta, como em estimar_tokens; 0 = sem limite)
+        """
+        if not max_tokens:
+            secao, cortados = self.secao_problema(problema)
+        else:
+            livre = int((max_tokens - TOKENS_RESPOSTA_ESTIMADOS) * CARACTERES_POR_TOKEN) - _CARACTERES_FIXOS
+            livre = max(livre, 2 * MINIMO_CARACTERES_CAMPO)
+            secao, cortados = self.secao_problema(problema, int(livre * FRACAO_MAXIMA_PROBLEMA))
+
+            # A solução fica com tudo o que a seção do problema não usou
+            usado = len(secao) - _CARACTERES_TEMPLATE
+            max_solucao = max(livre - usado, MINIMO_CARACTERES_CAMPO)
+            if len(solucao_texto) > max_solucao:
+                solucao_texto = cortar_texto(solucao_texto, max_solucao)
+                cortados = [*cortados, 'solucao']
+
+        montado = PromptMontado(f"{secao}{_CABECALHO_SOLUCAO}{solucao_texto}{INSTRUCOES_ANALISE}", cortados)
+        with self._lock:
+            self._stats['prompts'] += 1
+            if cortados:
+                self._stats['truncated'] += 1
+        return montado
+
+    def stats(self) -> Dict[str, Any]:
+        return {**self._stats, 'sections_cached': len(self._secoes)}
+
+
+prompt_builder = PromptBuilder()
+
+
+def get_analise_prompt(problema: dict, solucao_texto: str, max_tokens: int = 0) -> str:
+    """
+    Gera prompt otimizado para análise de solução
+    
+    Args:
+        problema: Dict com dados do problema
+        solucao_texto: Texto da solução submetida
+        max_tokens: Orçamento de tokens da chamada (0 = sem limite)
+    
+    Returns:
+        Prompt formatado para a IA
+    """
+    return prompt_builder.montar(problema, solucao_texto, max_tokens).texto
 
 
 def get_prompt_simplificado(problema_titulo: str, problema_desc: str, solucao: str) -> str:
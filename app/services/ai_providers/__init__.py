@@ -1,8 +1,17 @@
 """
 Providers de IA
 """
-from app.services.ai_providers.base import AIProvider
+from app.services.ai_providers.base import (
+    AIProvider, AIProviderTimeout, AIProviderUnavailable, AIProviderRateLimited
+)
+from app.services.ai_providers.circuit_breaker import CircuitBreaker
+from app.services.ai_providers.rate_limiter import ProviderRateLimiter, TokenBucket
 from app.services.ai_providers.gemini_provider import GeminiProvider
 from app.services.ai_providers.groq_provider import GroqProvider
+from app.services.ai_providers.fake_provider import FakeProvider
 
-__all__ = ["AIProvider", "GeminiProvider", "GroqProvider"]
\ No newline at end of file
+__all__ = [
+    "AIProvider", "AIProviderTimeout", "AIProviderUnavailable", "AIProviderRateLimited",
+    "CircuitBreaker", "ProviderRateLimiter", "TokenBucket",
+    "GeminiProvider", "GroqProvider", "FakeProvider"
+]
\ No newline at end of file
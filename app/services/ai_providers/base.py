@@ -3,18 +3,144 @@ Interface base para providers de IA
 """
 from abc import ABC, abstractmethod
 from typing import Dict, Any, Optional
+import asyncio
 import json
 import re
+import time
+from app.services.ai_prompts import estimar_tokens
+from app.services.ai_providers.circuit_breaker import CircuitBreaker
+from app.services.ai_providers.rate_limiter import ProviderRateLimiter
+
+class AIProviderTimeout(Exception):
+    """O provider não respondeu dentro de AI_TIMEOUT_SECONDS"""
+    pass
+
+class AIProviderUnavailable(Exception):
+    """Circuit breaker aberto: o provider está sendo poupado após muitas falhas"""
+    pass
+
+class AIProviderRateLimited(Exception):
+    """Sem cota no rate limiter do provider (requisições ou tokens)"""
+    pass
+
+def is_rate_limit_error(erro: Exception) -> bool:
+    """Erro de cota devolvido pela API (HTTP 429 / RESOURCE_EXHAUSTED)"""
+    texto = str(erro).lower()
+    return '429' in texto or 'rate limit' in texto or 'resource_exhausted' in texto or 'quota' in texto
+
+def is_daily_quota_error(erro: Exception) -> bool:
+    """Erro de cota que cita o limite diário (ex.: 'PerDay', 'requests per day (RPD)')"""
+    texto = str(erro).lower()
+    return 'per day' in texto or 'perday' in texto or 'daily' in texto or '(rpd)' in texto
 
 class AIProvider(ABC):
     """
     Classe abstrata para providers de IA
     Todos os providers devem implementar esta interface
+    
+    `analisar` deve ser realmente assíncrono (cliente async do SDK): uma
+    chamada síncrona congela o worker inteiro durante a resposta do LLM.
+    O serviço chama `executar`, que limita a concorrência e aplica o timeout.
     """
     
-    def __init__(self, api_key: str, model: str):
+    def __init__(
+        self,
+        api_key: str,
+        model: str,
+        max_concurrency: int = 8,
+        timeout_seconds: float = 30,
+        breaker: Optional[CircuitBreaker] = None,
+        rate_limiter: Optional[ProviderRateLimiter] = None,
+        prompt_max_tokens: int = 0
+    ):
         self.api_key = api_key
         self.model = model
+        self.max_concurrency = max_concurrency
+        self.timeout_seconds = timeout_seconds
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self.breaker = breaker or CircuitBreaker(name=type(self).__name__)
+        self.rate_limiter = rate_limiter
+        self.prompt_max_tokens = prompt_max_tokens  # Orçamento por chamada (PromptBuilder); 0 = sem limite
+        self._stats = {'calls': 0, 'in_flight': 0, 'waiting': 0, 'timeouts': 0, 'errors': 0, 'rate_limited': 0}
+    
+    async def executar(self, prompt: str, aguardar_cota: bool = False) -> Dict[str, Any]:
+        """
+        Chama `analisar` respeitando o limite de chamadas simultâneas do provider
+        
+        O timeout cobre a espera por uma vaga + a chamada: se o provider estiver
+        saturado ou lento, a análise falha a tempo de tentar o fallback.
+        O resultado alimenta o circuit breaker; com o circuito aberto a chamada
+        falha na hora com AIProviderUnavailable.
+        Sem cota no rate limiter, falha com AIProviderRateLimited (ou espera até
+        `max_wait_seconds` pela cota, se `aguardar_cota`).
+        """
+        tokens = estimar_tokens(prompt)
+        if self.rate_limiter is not None:
+            espera = self.rate_limiter.max_wait_seconds if aguardar_cota else 0
+            if not await self.rate_limiter.acquire(tokens, max_wait=espera):
+                self._stats['rate_limited'] += 1
+                raise AIProviderRateLimited(
+                    f"{type(self).__name__} sem cota (próxima em {self.rate_limiter.wait_time(tokens):.1f}s)"
+                )
+        
+        if not self.breaker.allow_request():
+            if self.rate_limiter is not None:
+                self.rate_limiter.refund(tokens)
+            raise AIProviderUnavailable(
+                f"{type(self).__name__} com circuit breaker {self.breaker.state}"
+            )
+        
+        self._stats['calls'] += 1
+        inicio = time.monotonic()
+        try:
+            resultado = await asyncio.wait_for(self._executar_limitado(prompt), timeout=self.timeout_seconds)
+        except asyncio.TimeoutError:
+            self._stats['timeouts'] += 1
+            self.breaker.record_failure(time.monotonic() - inicio)
+            raise AIProviderTimeout(
+                f"{type(self).__name__} não respondeu em {self.timeout_seconds}s"
+            )
+        except asyncio.CancelledError:
+            self.breaker.cancel_request()
+            raise
+        except Exception as e:
+            self._stats['errors'] += 1
+            self.breaker.record_failure(time.monotonic() - inicio)
+            if self.rate_limiter is not None and is_rate_limit_error(e):
+                self.rate_limiter.drain(diario=is_daily_quota_error(e))
+            raise
+        
+        # Resposta que não pôde ser interpretada (parse_response) também é falha
+        if resultado.get('erro'):
+            self.breaker.record_failure(time.monotonic() - inicio)
+        else:
+            self.breaker.record_success(time.monotonic() - inicio)
+        return resultado
+    
+    async def _executar_limitado(self, prompt: str) -> Dict[str, Any]:
+        self._stats['waiting'] += 1
+        try:
+            await self._semaphore.acquire()
+        finally:
+            self._stats['waiting'] -= 1
+        
+        self._stats['in_flight'] += 1
+        try:
+            return await self.analisar(prompt)
+        finally:
+            self._stats['in_flight'] -= 1
+            self._semaphore.release()
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """Chamadas, concorrência atual e timeouts do provider"""
+        return {
+            'max_concurrency': self.max_concurrency,
+            'timeout_seconds': self.timeout_seconds,
+            'prompt_max_tokens': self.prompt_max_tokens,
+            **self._stats,
+            'circuit_breaker': self.breaker.snapshot(),
+            'rate_limit': self.rate_limiter.snapshot() if self.rate_limiter is not None else None
+        }
     
     @abstractmethod
     async def analisar(self, prompt: str) -> Dict[str, Any]:
@@ -0,0 +1,154 @@
+"""
+Circuit breaker por provider de IA
+Evita pagar o timeout inteiro em cada chamada a um provider que está falhando
+"""
+import math
+import time
+from collections import deque
+from typing import Any, Deque, Dict, Optional, Tuple
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitBreaker:
+    """
+    closed -> open quando a taxa de erro na janela passa de `error_rate_threshold`
+    (com pelo menos `min_calls` chamadas); open -> half_open após `cooldown_seconds`;
+    em half_open uma chamada de teste (probe) decide: sucesso fecha, falha reabre.
+
+    A janela (últimos `window_seconds`) também guarda latências, usadas pelo
+    roteamento para preferir o provider mais saudável.
+    """
+
+    def __init__(
+        self,
+        name: str = "provider",
+        window_seconds: float = 120,
+        min_calls: int = 5,
+        error_rate_threshold: float = 0.5,
+        cooldown_seconds: float = 30,
+        slow_call_seconds: float = 15,
+        max_samples: int = 500
+    ):
+        self.name = name
+        self.window_seconds = window_seconds
+        self.min_calls = min_calls
+        self.error_rate_threshold = error_rate_threshold
+        self.cooldown_seconds = cooldown_seconds
+        self.slow_call_seconds = slow_call_seconds
+        self._calls: Deque[Tuple[float, bool, float]] = deque(maxlen=max_samples)  # (quando, ok, latência s)
+        self._state = CLOSED
+        self._opened_at = 0.0
+        self._probe_in_flight = False
+        self._stats = {'opened': 0, 'rejected': 0, 'probes': 0}
+
+    # ==================== ESTADO ====================
+
+    @property
+    def state(self) -> str:
+        if self._state == OPEN and time.monotonic() - self._opened_at >= self.cooldown_seconds:
+            self._state = HALF_OPEN
+        return self._state
+
+    def can_probe(self) -> bool:
+        """True se o provider está em half_open e a vaga de teste está livre"""
+        return self.state == HALF_OPEN and not self._probe_in_flight
+
+    def allow_request(self) -> bool:
+        """
+        Reserva a chamada: chamar imediatamente antes de executar e sempre
+        registrar o resultado com record_success/record_failure
+        """
+        state = self.state
+        if state == CLOSED:
+            return True
+        if state == HALF_OPEN and not self._probe_in_flight:
+            self._probe_in_flight = True
+            self._stats['probes'] += 1
+            return True
+        self._stats['rejected'] += 1
+        return False
+
+    def cancel_request(self):
+        """Chamada reservada que foi cancelada antes de terminar (não conta como erro)"""
+        if self._state == HALF_OPEN:
+            self._probe_in_flight = False
+
+    def record_success(self, latency_seconds: float):
+        self._record(True, latency_seconds)
+        if self._state == HALF_OPEN:
+            self._probe_in_flight = False
+            self._state = CLOSED
+            self._calls.clear()  # recomeça a janela com o provider recuperado
+            print(f"✅ Circuit breaker de {self.name} fechado após probe bem-sucedido")
+
+    def record_failure(self, latency_seconds: float):
+        self._record(False, latency_seconds)
+        if self._state == HALF_OPEN:
+            self._probe_in_flight = False
+            self._open()
+        elif self._state == CLOSED:
+            total, erros, _ = self._window()
+            if total >= self.min_calls and erros / total >= self.error_rate_threshold:
+                self._open()
+
+    def _open(self):
+        self._state = OPEN
+        self._opened_at = time.monotonic()
+        self._stats['opened'] += 1
+        print(f"🔌 Circuit breaker de {self.name} aberto por {self.cooldown_seconds}s")
+
+    # ==================== JANELA ====================
+
+    def _record(self, ok: bool, latency_seconds: float):
+        self._calls.append((time.monotonic(), ok, latency_seconds))
+
+    def _window(self) -> Tuple[int, int, list]:
+        limite = time.monotonic() - self.window_seconds
+        while self._calls and self._calls[0][0] < limite:
+            self._calls.popleft()
+        chamadas = list(self._calls)
+        erros = sum(1 for _, ok, _ in chamadas if not ok)
+        return len(chamadas), erros, [lat for _, ok, lat in chamadas if ok]
+
+    def latency_percentile(self, pct: float) -> Optional[float]:
+        """Percentil (nearest-rank) da latência das chamadas bem-sucedidas na janela, em segundos"""
+        _, _, latencias = self._window()
+        if not latencias:
+            return None
+        latencias.sort()
+        return latencias[max(math.ceil(pct / 100 * len(latencias)) - 1, 0)]
+
+    def health_score(self) -> float:
+        """
+        0 = saudável; cresce com a taxa de erro e com chamadas lentas
+        (latência acima de `slow_call_seconds` conta meio erro)
+        Com menos de `min_calls` chamadas na janela não há dado suficiente: 0
+        """
+        total, erros, latencias = self._window()
+        if total < self.min_calls:
+            return 0.0
+        lentas = sum(1 for lat in latencias if lat >= self.slow_call_seconds)
+        return (erros + 0.5 * lentas) / total
+
+    def snapshot(self) -> Dict[str, Any]:
+        total, erros, _ = self._window()
+        p50 = self.latency_percentile(50)
+        p95 = self.latency_percentile(95)
+        snapshot = {
+            'state': self.state,
+            'window_calls': total,
+            'window_errors': erros,
+            'error_rate': round(erros / total, 4) if total else 0.0,
+            'health_score': round(self.health_score(), 4),
+            'latency_p50_ms': round(p50 * 1000) if p50 is not None else None,
+            'latency_p95_ms': round(p95 * 1000) if p95 is not None else None,
+            **self._stats
+        }
+        if self._state == OPEN:
+            snapshot['retry_in_seconds'] = round(
+                max(self.cooldown_seconds - (time.monotonic() - self._opened_at), 0), 1
+            )
+        return snapshot
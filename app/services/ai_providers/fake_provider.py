@@ -0,0 +1,63 @@
+"""
+Provider falso para desenvolvimento, testes de carga e benchmarks
+Não chama nenhuma API: espera a latência configurada e devolve uma análise fixa
+"""
+from typing import Dict, Any
+from app.services.ai_providers.base import AIProvider
+import asyncio
+import json
+import time
+
+class FakeProvider(AIProvider):
+    """
+    Provider local (AI_PROVIDER=fake)
+    Simula a latência de um LLM com asyncio.sleep, sem custo nem rate limit
+    """
+    
+    def __init__(self, latency_seconds: float = 1.0, pontuacao: float = 75, **kwargs):
+        super().__init__(api_key="fake", model="fake", **kwargs)
+        self.latency_seconds = latency_seconds
+        self.pontuacao = pontuacao
+    
+    def is_available(self) -> bool:
+        return True
+    
+    async def analisar(self, prompt: str) -> Dict[str, Any]:
+        inicio = time.time()
+        await asyncio.sleep(self.latency_seconds)
+        return self.montar_resposta(inicio)
+    
+    def montar_resposta(self, inicio: float) -> Dict[str, Any]:
+        """Análise fixa no mesmo formato dos providers reais"""
+        response_text = json.dumps({
+            "pontuacao": self.pontuacao,
+            "status_recomendado": "aprovada" if self.pontuacao >= 60 else "reprovada",
+            "feedback": "Análise simulada pelo provider fake.",
+            "pontos_fortes": ["Resposta simulada"],
+            "pontos_melhoria": [],
+            "criterios": {
+                "adequacao_problema": 25,
+                "qualidade_tecnica": 20,
+                "criatividade": 15,
+                "clareza": 10,
+                "viabilidade": 5
+            },
+            "recomendacoes_especificas": []
+        })
+        
+        resultado = self.parse_response(response_text)
+        resultado['tempo_analise_ms'] = int((time.time() - inicio) * 1000)
+        resultado['provider'] = 'fake'
+        resultado['model'] = self.model
+        
+        return resultado
+    
+    def get_info(self) -> Dict[str, Any]:
+        """Retorna informações sobre o provider"""
+        return {
+            "name": "Fake (local)",
+            "model": self.model,
+            "free_tier": True,
+            "latency_seconds": self.latency_seconds,
+            "available": True
+        }
@@ -13,8 +13,8 @@ class GeminiProvider(AIProvider):
     Limites: 60 requisições/minuto gratuitas
     """
     
-    def __init__(self, api_key: str, model: str = "gemini-pro"):
-        super().__init__(api_key, model)
+    def __init__(self, api_key: str, model: str = "gemini-pro", **kwargs):
+        super().__init__(api_key, model, **kwargs)
         
         if api_key:
             genai.configure(api_key=api_key)
@@ -72,11 +72,12 @@ class GeminiProvider(AIProvider):
                 }
             ]
             
-            # Gerar resposta
-            response = self.client.generate_content(
+            # Gerar resposta (cliente async: não bloqueia o event loop)
+            response = await self.client.generate_content_async(
                 prompt,
                 generation_config=generation_config,
-                safety_settings=safety_settings
+                safety_settings=safety_settings,
+                request_options={"timeout": self.timeout_seconds}
             )
             
             # Extrair texto
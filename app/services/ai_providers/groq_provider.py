@@ -1,7 +1,7 @@
 """
 Provider para Groq (BACKUP - GRATUITO)
 """
-from groq import Groq
+from groq import AsyncGroq
 from typing import Dict, Any
 from app.services.ai_providers.base import AIProvider
 import time
@@ -13,11 +13,12 @@ class GroqProvider(AIProvider):
     Limites: 14,400 tokens/minuto (MUITO RÁPIDO)
     """
     
-    def __init__(self, api_key: str, model: str = "llama-3.1-70b-versatile"):
-        super().__init__(api_key, model)
+    def __init__(self, api_key: str, model: str = "llama-3.1-70b-versatile", **kwargs):
+        super().__init__(api_key, model, **kwargs)
         
         if api_key:
-            self.client = Groq(api_key=api_key)
+            # Cliente async: não bloqueia o event loop durante a resposta
+            self.client = AsyncGroq(api_key=api_key, timeout=self.timeout_seconds)
         else:
             self.client = None
     
@@ -44,7 +45,7 @@ class GroqProvider(AIProvider):
             print(f"⚡ [GROQ] Iniciando análise com modelo {self.model}...")
             
             # Criar chat completion
-            completion = self.client.chat.completions.create(
+            completion = await self.client.chat.completions.create(
                 model=self.model,
                 messages=[
                     {
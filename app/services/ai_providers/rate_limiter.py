@@ -0,0 +1,136 @@
+"""
+Rate limiter do lado do cliente para os providers de IA
+Respeita as cotas (requisições e tokens) antes de chamar a API, em vez de
+descobri-las recebendo 429
+"""
+import asyncio
+import time
+from typing import Any, Dict, List, Optional
+
+
+class TokenBucket:
+    """Balde com `capacity` fichas, reabastecido continuamente a `refill_per_second`"""
+
+    def __init__(self, name: str, capacity: float, refill_per_second: float):
+        self.name = name
+        self.capacity = capacity
+        self.refill_per_second = refill_per_second
+        self._tokens = capacity
+        self._updated = time.monotonic()
+
+    def _refill(self):
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.refill_per_second)
+        self._updated = now
+
+    def available(self) -> float:
+        self._refill()
+        return self._tokens
+
+    def wait_time(self, amount: float) -> float:
+        """Segundos até haver `amount` fichas (inf se nunca couber no balde)"""
+        if amount > self.capacity:
+            return float('inf')
+        falta = amount - self.available()
+        return max(falta, 0) / self.refill_per_second
+
+    def take(self, amount: float):
+        self._refill()
+        self._tokens -= amount
+
+    def give_back(self, amount: float):
+        self._refill()
+        self._tokens = min(self.capacity, self._tokens + amount)
+
+    def drain(self):
+        self._refill()
+        self._tokens = min(self._tokens, 0)
+
+
+class ProviderRateLimiter:
+    """
+    Conjunto de token buckets de um provider (req/min, req/dia, tokens/min)
+
+    Uma chamada consome 1 ficha de cada balde de requisições e a estimativa de
+    tokens do balde de tokens; só passa se todos tiverem saldo. Limite 0 = sem balde.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        requests_per_minute: int = 0,
+        requests_per_day: int = 0,
+        tokens_per_minute: int = 0,
+        max_wait_seconds: float = 5.0
+    ):
+        self.name = name
+        self.max_wait_seconds = max_wait_seconds
+        self._request_buckets: List[TokenBucket] = []
+        self._token_bucket: Optional[TokenBucket] = None
+        if requests_per_minute > 0:
+            self._request_buckets.append(TokenBucket('requests_per_minute', requests_per_minute, requests_per_minute / 60))
+        if requests_per_day > 0:
+            self._request_buckets.append(TokenBucket('requests_per_day', requests_per_day, requests_per_day / 86400))
+        if tokens_per_minute > 0:
+            self._token_bucket = TokenBucket('tokens_per_minute', tokens_per_minute, tokens_per_minute / 60)
+        self._lock = asyncio.Lock()
+        self._stats = {'granted': 0, 'rejected': 0, 'waited': 0, 'wait_seconds': 0.0, 'drained': 0}
+
+    def _demandas(self, tokens: int):
+        demandas = [(bucket, 1) for bucket in self._request_buckets]
+        if self._token_bucket is not None:
+            # Prompt maior que o balde inteiro: cobra o balde cheio em vez de nunca passar
+            demandas.append((self._token_bucket, min(tokens, self._token_bucket.capacity)))
+        return demandas
+
+    def wait_time(self, tokens: int) -> float:
+        """Segundos até a chamada caber em todos os baldes"""
+        return max((bucket.wait_time(qtd) for bucket, qtd in self._demandas(tokens)), default=0.0)
+
+    async def acquire(self, tokens: int, max_wait: float = 0.0) -> bool:
+        """
+        Reserva a cota da chamada; espera até `max_wait` segundos por saldo
+        Retorna False (sem consumir nada) se não houver cota a tempo
+        """
+        async with self._lock:  # fila por ordem de chegada
+            espera = self.wait_time(tokens)
+            if espera > max_wait:
+                self._stats['rejected'] += 1
+                return False
+            if espera > 0:
+                self._stats['waited'] += 1
+                self._stats['wait_seconds'] += espera
+                await asyncio.sleep(espera)
+
+            for bucket, qtd in self._demandas(tokens):
+                bucket.take(qtd)
+            self._stats['granted'] += 1
+            return True
+
+    def refund(self, tokens: int):
+        """Devolve a cota de uma chamada que não chegou a ser feita"""
+        for bucket, qtd in self._demandas(tokens):
+            bucket.give_back(qtd)
+
+    def drain(self, diario: bool = False):
+        """
+        O provider respondeu 429: zera os baldes por minuto até reabastecerem
+        O balde diário só é zerado com `diario` (a resposta diz que a cota do
+        dia acabou): reabastecido a req/dia / 86400, ele bloquearia o
+        provider por horas depois de um simples throttle por minuto
+        """
+        for bucket in self._request_buckets:
+            if diario or bucket.name != 'requests_per_day':
+                bucket.drain()
+        if self._token_bucket is not None:
+            self._token_bucket.drain()
+        self._stats['drained'] += 1
+
+    def snapshot(self) -> Dict[str, Any]:
+        buckets = self._request_buckets + ([self._token_bucket] if self._token_bucket else [])
+        return {
+            'limits': {b.name: b.capacity for b in buckets},
+            'remaining': {b.name: int(b.available()) for b in buckets},
+            **self._stats,
+            'wait_seconds': round(self._stats['wait_seconds'], 2)
+        }
@@ -2,22 +2,37 @@
 Serviço principal de análise com IA
 Sistema com fallback automático e cache
 """
-from typing import Dict, Any, Optional
+from typing import Callable, Dict, Any, List, Optional, Union
+import asyncio
 import json
 import hashlib
-from datetime import datetime, timedelta
+from starlette.concurrency import run_in_threadpool
 from app.core.config import settings
+from app.core.singleflight import SingleFlight
+from app.services.ai_cache import get_ai_cache
 from app.services.ai_providers.gemini_provider import GeminiProvider
 from app.services.ai_providers.groq_provider import GroqProvider
-from app.services.ai_prompts import get_analise_prompt
+from app.services.ai_providers.fake_provider import FakeProvider
+from app.services.ai_providers.base import AIProviderRateLimited
+from app.services.ai_providers.circuit_breaker import CircuitBreaker, CLOSED
+from app.services.ai_providers.rate_limiter import ProviderRateLimiter
+from app.services.ai_prompts import PromptMontado, estimar_tokens, prompt_builder
+from app.services.similarity_index import normalizar_texto
 
-# Cache em memória (em produção, usar Redis)
-_cache: Dict[str, Dict[str, Any]] = {}
+# Análises idênticas (mesma chave de cache) em andamento: uma chamada ao provider
+_analises_em_andamento = SingleFlight()
+
+# Hedging: issued = hedges disparados; won = o hedge respondeu primeiro;
+# wasted = o principal respondeu primeiro (a chamada do hedge foi desperdiçada)
+_hedge_stats = {'issued': 0, 'won': 0, 'wasted': 0}
 
 class AIAnalysisService:
     """
     Serviço de análise com IA
     Implementa sistema de fallback e cache
+
+    Cada provider tem um circuit breaker: provider com o circuito aberto não é
+    chamado, e a ordem de tentativa segue a saúde recente de cada um.
     """
     
     def __init__(self):
@@ -29,11 +44,49 @@ class AIAnalysisService:
         """Inicializa todos os providers disponíveis"""
         providers = {}
         
+        # Limites aplicados por provider (AIProvider.executar)
+        # Cotas: requisições/minuto, requisições/dia e tokens/minuto (0 = sem limite)
+        # e orçamento de tokens do prompt
+        def limites(
+            nome: str,
+            rpm: int = 0,
+            rpd: int = 0,
+            tpm: int = 0,
+            prompt_max_tokens: Optional[int] = None
+        ) -> Dict[str, Any]:
+            rate_limiter = None
+            if rpm or rpd or tpm:
+                rate_limiter = ProviderRateLimiter(
+                    name=nome,
+                    requests_per_minute=rpm,
+                    requests_per_day=rpd,
+                    tokens_per_minute=tpm,
+                    max_wait_seconds=settings.AI_RATE_LIMIT_MAX_WAIT_SECONDS
+                )
+            return {
+                'rate_limiter': rate_limiter,
+                'prompt_max_tokens': (
+                    settings.AI_PROMPT_MAX_TOKENS if prompt_max_tokens is None else prompt_max_tokens
+                ),
+                'max_concurrency': settings.AI_PROVIDER_MAX_CONCURRENCY,
+                'timeout_seconds': settings.AI_TIMEOUT_SECONDS,
+                'breaker': CircuitBreaker(
+                    name=nome,
+                    window_seconds=settings.AI_BREAKER_WINDOW_SECONDS,
+                    min_calls=settings.AI_BREAKER_MIN_CALLS,
+                    error_rate_threshold=settings.AI_BREAKER_ERROR_RATE,
+                    cooldown_seconds=settings.AI_BREAKER_COOLDOWN_SECONDS,
+                    slow_call_seconds=settings.AI_SLOW_CALL_SECONDS
+                )
+            }
+        
         # Gemini (Principal)
         if settings.GEMINI_API_KEY:
             providers['gemini'] = GeminiProvider(
                 api_key=settings.GEMINI_API_KEY,
-                model=settings.GEMINI_MODEL
+                model=settings.GEMINI_MODEL,
+                **limites('gemini', settings.GEMINI_RPM, settings.GEMINI_RPD, settings.GEMINI_TPM,
+                          settings.GEMINI_PROMPT_MAX_TOKENS)
             )
             print("✅ Gemini Provider inicializado")
         
@@ -41,10 +94,20 @@ class AIAnalysisService:
         if settings.GROQ_API_KEY:
             providers['groq'] = GroqProvider(
                 api_key=settings.GROQ_API_KEY,
-                model=settings.GROQ_MODEL
+                model=settings.GROQ_MODEL,
+                **limites('groq', settings.GROQ_RPM, settings.GROQ_RPD, settings.GROQ_TPM,
+                          settings.GROQ_PROMPT_MAX_TOKENS)
             )
             print("✅ Groq Provider inicializado")
         
+        # Fake (desenvolvimento / testes de carga)
+        if 'fake' in (settings.AI_PROVIDER, settings.AI_FALLBACK_PROVIDER):
+            providers['fake'] = FakeProvider(
+                latency_seconds=settings.AI_FAKE_LATENCY_SECONDS,
+                **limites('fake')
+            )
+            print("🧪 Fake Provider inicializado (sem chamadas externas)")
+        
         # TODO: Adicionar OpenAI e Claude no futuro
         
         if not providers:
@@ -55,52 +118,48 @@ class AIAnalysisService:
     def _generate_cache_key(self, problema_id: int, solucao_texto: str) -> str:
         """
         Gera chave única para cache baseada no problema e solução
+        O texto é normalizado: reenvios que só mudam espaços, pontuação ou
+        maiúsculas caem na mesma chave
         """
-        content = f"{problema_id}:{solucao_texto}"
+        content = f"{problema_id}:{normalizar_texto(solucao_texto)}"
         return hashlib.md5(content.encode()).hexdigest()
     
-    def _get_from_cache(self, cache_key: str) -> Optional[Dict[str, Any]]:
+    async def _get_from_cache(self, cache_key: str) -> Optional[Dict[str, Any]]:
         """
-        Busca análise do cache se ainda válida
+        Busca análise do cache (backend de AI_CACHE_BACKEND) se ainda válida
         """
         if not settings.AI_ENABLE_CACHE:
             return None
         
-        if cache_key not in _cache:
-            return None
-        
-        cached = _cache[cache_key]
-        cache_time = cached.get('cached_at')
-        
-        if not cache_time:
-            return None
-        
-        # Verificar se cache expirou
-        ttl = timedelta(hours=settings.AI_CACHE_TTL_HOURS)
-        if datetime.now() - cache_time > ttl:
-            del _cache[cache_key]
-            return None
+        cache = get_ai_cache()
+        if cache.blocking:
+            cached = await run_in_threadpool(cache.get, cache_key)
+        else:
+            cached = cache.get(cache_key)
         
-        print(f"✅ Análise encontrada no cache (key: {cache_key[:8]}...)")
-        return cached['data']
+        if cached is not None:
+            print(f"✅ Análise encontrada no cache (key: {cache_key[:8]}...)")
+        return cached
     
-    def _save_to_cache(self, cache_key: str, data: Dict[str, Any]):
+    async def _save_to_cache(self, cache_key: str, data: Dict[str, Any]):
         """
         Salva análise no cache
         """
         if not settings.AI_ENABLE_CACHE:
             return
         
-        _cache[cache_key] = {
-            'data': data,
-            'cached_at': datetime.now()
-        }
+        cache = get_ai_cache()
+        if cache.blocking:
+            await run_in_threadpool(cache.set, cache_key, data)
+        else:
+            cache.set(cache_key, data)
         print(f"💾 Análise salva no cache (key: {cache_key[:8]}...)")
     
     async def analisar_com_provider(
         self, 
         provider_name: str, 
-        prompt: str
+        prompt: str,
+        aguardar_cota: bool = False
     ) -> Dict[str, Any]:
         """
         Analisa usando um provider específico
@@ -113,50 +172,197 @@ class AIAnalysisService:
         if not provider.is_available():
             raise ValueError(f"Provider '{provider_name}' não está configurado")
         
-        return await provider.analisar(prompt)
+        return await provider.executar(prompt, aguardar_cota=aguardar_cota)
+    
+    def ordem_de_roteamento(self) -> List[str]:
+        """
+        Providers na ordem em que serão tentados
+        
+        Provider em half_open com a vaga de teste livre vai primeiro (uma
+        chamada por cooldown verifica se ele se recuperou); depois os fechados,
+        do mais saudável para o menos (taxa de erro + chamadas lentas);
+        empate mantém a preferência configurada (principal, depois fallback).
+        Providers com o circuito aberto ficam de fora.
+        """
+        preferencia = [
+            nome for nome in dict.fromkeys([self.primary_provider, self.fallback_provider])
+            if nome and nome in self.providers
+        ]
+        
+        def chave(item):
+            posicao, nome = item
+            breaker = self.providers[nome].breaker
+            if breaker.can_probe():
+                return (0, 0.0, posicao)
+            return (1, round(breaker.health_score(), 1), posicao)
+        
+        candidatos = [
+            (posicao, nome) for posicao, nome in enumerate(preferencia)
+            if self.providers[nome].breaker.state == CLOSED or self.providers[nome].breaker.can_probe()
+        ]
+        return [nome for _, nome in sorted(candidatos, key=chave)]
     
     async def analisar_com_fallback(
         self, 
-        prompt: str
+        prompt: Union[str, Callable[[str], str]]
     ) -> Dict[str, Any]:
         """
-        Tenta analisar com provider principal, se falhar usa fallback
+        Tenta os providers na ordem de roteamento até um responder
+        (com AI_HEDGING_ENABLED, os dois primeiros podem correr em paralelo)
+        
+        `prompt` pode ser uma função nome do provider -> prompt, para montar
+        o prompt dentro do orçamento de tokens de cada provider
         """
         tentativas = []
+        ordem = self.ordem_de_roteamento()
+        sem_cota = []
+        restantes = list(ordem)
         
-        # Tentar provider principal
-        try:
-            print(f"🎯 Tentando análise com provider principal: {self.primary_provider}")
-            resultado = await self.analisar_com_provider(self.primary_provider, prompt)
-            resultado['used_fallback'] = False
-            return resultado
-        except Exception as e:
-            erro_primary = str(e)
-            print(f"⚠️ Provider principal falhou: {erro_primary}")
-            tentativas.append({
-                'provider': self.primary_provider,
-                'erro': erro_primary
-            })
+        if settings.AI_HEDGING_ENABLED and len(ordem) >= 2:
+            nome, resultado = await self._analisar_com_hedge(ordem[0], ordem[1], prompt, tentativas, sem_cota)
+            if resultado is not None:
+                return self._marcar_fallback(resultado, nome, tentativas)
+            restantes = [n for n in ordem if n not in {t['provider'] for t in tentativas}]
+        
+        for nome in restantes:
+            resultado = await self._tentar_provider(nome, prompt, tentativas, sem_cota)
+            if resultado is not None:
+                return self._marcar_fallback(resultado, nome, tentativas)
         
-        # Tentar fallback
-        if self.fallback_provider and self.fallback_provider in self.providers:
+        # Todos os que sobraram estavam sem cota: espera brevemente pelo que libera primeiro
+        if sem_cota:
+            nome = min(sem_cota, key=lambda n: self.providers[n].rate_limiter.wait_time(
+                estimar_tokens(self._prompt_para(prompt, n))
+            ))
             try:
-                print(f"🔄 Tentando fallback: {self.fallback_provider}")
-                resultado = await self.analisar_com_provider(self.fallback_provider, prompt)
-                resultado['used_fallback'] = True
-                resultado['fallback_reason'] = erro_primary
-                return resultado
+                print(f"⏳ Aguardando cota de {nome}")
+                resultado = await self.analisar_com_provider(nome, self._prompt_para(prompt, nome), aguardar_cota=True)
+                return self._marcar_fallback(resultado, nome, tentativas)
             except Exception as e:
-                erro_fallback = str(e)
-                print(f"❌ Fallback também falhou: {erro_fallback}")
-                tentativas.append({
-                    'provider': self.fallback_provider,
-                    'erro': erro_fallback
-                })
+                print(f"⚠️ Provider {nome} falhou: {e}")
+                tentativas.append({'provider': nome, 'erro': str(e)})
+        
+        if not ordem:
+            raise Exception("Todos os providers estão com o circuit breaker aberto")
         
         # Todos os providers falharam
         raise Exception(f"Todos os providers falharam. Tentativas: {json.dumps(tentativas)}")
     
+    @staticmethod
+    def _prompt_para(prompt: Union[str, Callable[[str], str]], nome: str) -> str:
+        return prompt(nome) if callable(prompt) else prompt
+    
+    def orcamento_de_tokens(self, nome: str) -> int:
+        """Orçamento de tokens por chamada do provider (0 = sem limite)"""
+        provider = self.providers.get(nome)
+        return provider.prompt_max_tokens if provider is not None else settings.AI_PROMPT_MAX_TOKENS
+    
+    async def _tentar_provider(
+        self,
+        nome: str,
+        prompt: Union[str, Callable[[str], str]],
+        tentativas: List[Dict[str, str]],
+        sem_cota: List[str]
+    ) -> Optional[Dict[str, Any]]:
+        """Uma tentativa em um provider; falhas são anotadas em `tentativas`"""
+        try:
+            print(f"🎯 Tentando análise com provider: {nome}")
+            return await self.analisar_com_provider(nome, self._prompt_para(prompt, nome))
+        except AIProviderRateLimited as e:
+            # Sem cota agora: tenta o próximo provider antes de esperar
+            print(f"⏳ {e}")
+            sem_cota.append(nome)
+            tentativas.append({'provider': nome, 'erro': str(e)})
+        except Exception as e:
+            print(f"⚠️ Provider {nome} falhou: {e}")
+            tentativas.append({'provider': nome, 'erro': str(e)})
+        return None
+    
+    # ==================== HEDGING ====================
+    
+    def atraso_do_hedge(self, nome: str) -> float:
+        """
+        Quanto esperar pelo provider antes de disparar o hedge:
+        o percentil AI_HEDGE_PERCENTILE da latência recente dele, nunca menos
+        que AI_HEDGE_MIN_DELAY_SECONDS (sem histórico: AI_HEDGE_DEFAULT_DELAY_SECONDS)
+        """
+        percentil = self.providers[nome].breaker.latency_percentile(settings.AI_HEDGE_PERCENTILE)
+        if percentil is None:
+            return settings.AI_HEDGE_DEFAULT_DELAY_SECONDS
+        return max(percentil, settings.AI_HEDGE_MIN_DELAY_SECONDS)
+    
+    async def _analisar_com_hedge(
+        self,
+        principal: str,
+        secundario: str,
+        prompt: Union[str, Callable[[str], str]],
+        tentativas: List[Dict[str, str]],
+        sem_cota: List[str]
+    ):
+        """
+        Dispara o principal; se ele não responder dentro do atraso do hedge,
+        dispara o mesmo prompt no secundário e fica com a primeira resposta
+        bem-sucedida (a outra chamada é cancelada)
+        
+        Retorna (provider, resultado) ou (None, None) se nenhum respondeu
+        """
+        tarefas = {
+            asyncio.ensure_future(self._tentar_provider(principal, prompt, tentativas, sem_cota)): principal
+        }
+        pendentes = set(tarefas)
+        atraso = self.atraso_do_hedge(principal)
+        
+        try:
+            concluidas, pendentes = await asyncio.wait(pendentes, timeout=atraso)
+            
+            if pendentes:
+                # Principal lento: hedge no secundário (o rate limiter dele decide se pode)
+                print(f"🏁 {principal} sem resposta em {atraso:.1f}s, hedge em {secundario}")
+                _hedge_stats['issued'] += 1
+                hedge = asyncio.ensure_future(self._tentar_provider(secundario, prompt, tentativas, sem_cota))
+                tarefas[hedge] = secundario
+                pendentes.add(hedge)
+            
+            while True:
+                for tarefa in concluidas:
+                    resultado = tarefa.result()
+                    if resultado is not None:
+                        vencedor = tarefas[tarefa]
+                        if len(tarefas) > 1:
+                            _hedge_stats['won' if vencedor == secundario else 'wasted'] += 1
+                        return vencedor, resultado
+                if not pendentes:
+                    return None, None
+                concluidas, pendentes = await asyncio.wait(pendentes, return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            for tarefa in pendentes:
+                tarefa.cancel()
+    
+    def _marcar_fallback(
+        self,
+        resultado: Dict[str, Any],
+        nome: str,
+        tentativas: List[Dict[str, str]]
+    ) -> Dict[str, Any]:
+        resultado['used_fallback'] = nome != self.primary_provider
+        if resultado['used_fallback']:
+            resultado['fallback_reason'] = self._motivo_fallback(tentativas)
+        return resultado
+    
+    def _motivo_fallback(self, tentativas: List[Dict[str, str]]) -> str:
+        """Por que o provider principal não foi usado"""
+        for tentativa in tentativas:
+            if tentativa['provider'] == self.primary_provider:
+                return tentativa['erro']
+        
+        principal = self.providers.get(self.primary_provider)
+        if principal is None:
+            return f"Provider principal '{self.primary_provider}' não disponível"
+        return (
+            f"Roteado pela saúde dos providers (principal: circuit breaker "
+            f"{principal.breaker.state}, health score {principal.breaker.health_score():.2f})"
+        )
+    
     def get_available_providers(self) -> Dict[str, Any]:
         """
         Lista providers disponíveis e seus status
@@ -165,7 +371,8 @@ class AIAnalysisService:
         for name, provider in self.providers.items():
             status[name] = {
                 'available': provider.is_available(),
-                'info': provider.get_info()
+                'info': provider.get_info(),
+                'stats': provider.get_stats()
             }
         return status
 
@@ -208,7 +415,9 @@ async def analisar_solucao(
             'recomendacoes_especificas': List[str],
             'tempo_analise_ms': int,
             'provider': str,
-            'used_fallback': bool
+            'used_fallback': bool,
+            'tokens_estimados': int,
+            'campos_cortados': List[str]
         }
     """
     service = get_ai_service()
@@ -218,21 +427,51 @@ async def analisar_solucao(
     
     # Tentar buscar do cache
     if use_cache:
-        cached = service._get_from_cache(cache_key)
+        cached = await service._get_from_cache(cache_key)
         if cached:
             cached['from_cache'] = True
             return cached
     
-    # Gerar prompt
-    prompt = get_analise_prompt(problema, solucao_texto)
+    # Chamadas simultâneas com a mesma chave (retries, duplo submit) esperam
+    # a análise que já está em andamento em vez de chamar o provider de novo
+    return await _analises_em_andamento.do(
+        cache_key,
+        lambda: _executar_analise(service, cache_key, problema, solucao_texto, use_cache)
+    )
+
+
+async def _executar_analise(
+    service: AIAnalysisService,
+    cache_key: str,
+    problema: Dict[str, Any],
+    solucao_texto: str,
+    use_cache: bool
+) -> Dict[str, Any]:
+    """
+    Gera o prompt, chama os providers (com fallback) e salva no cache
+    Nunca levanta exceção: falhas viram uma resposta de erro estruturada
+    """
+    # Um prompt por orçamento de tokens (providers com o mesmo orçamento compartilham)
+    montados: Dict[int, PromptMontado] = {}
+    
+    def prompt_para(nome: str) -> str:
+        orcamento = service.orcamento_de_tokens(nome)
+        if orcamento not in montados:
+            montados[orcamento] = prompt_builder.montar(problema, solucao_texto, orcamento)
+        return montados[orcamento].texto
     
     # Analisar com sistema de fallback
     try:
-        resultado = await service.analisar_com_fallback(prompt)
+        resultado = await service.analisar_com_fallback(prompt_para)
+        
+        montado = montados.get(service.orcamento_de_tokens(resultado.get('provider')))
+        if montado is not None:
+            resultado['tokens_estimados'] = montado.tokens_estimados
+            resultado['campos_cortados'] = montado.campos_cortados
         
         # Salvar no cache
         if use_cache:
-            service._save_to_cache(cache_key, resultado)
+            await service._save_to_cache(cache_key, resultado)
         
         resultado['from_cache'] = False
         return resultado
@@ -274,33 +513,31 @@ def clear_cache():
     """
     Limpa todo o cache de análises
     """
-    global _cache
-    _cache.clear()
+    get_ai_cache().clear()
     print("🗑️ Cache de análises limpo")
 
 
 def get_cache_stats() -> Dict[str, Any]:
     """
-    Retorna estatísticas do cache
+    Retorna estatísticas do cache (hits, misses, evictions, tamanho)
     """
-    total = len(_cache)
-    validos = 0
-    expirados = 0
-    
-    ttl = timedelta(hours=settings.AI_CACHE_TTL_HOURS)
-    now = datetime.now()
-    
-    for cached in _cache.values():
-        cache_time = cached.get('cached_at')
-        if cache_time and (now - cache_time) <= ttl:
-            validos += 1
-        else:
-            expirados += 1
-    
     return {
-        'total_entries': total,
-        'valid_entries': validos,
-        'expired_entries': expirados,
+        **get_ai_cache().stats(),
         'cache_enabled': settings.AI_ENABLE_CACHE,
-        'ttl_hours': settings.AI_CACHE_TTL_HOURS
-    }
\ No newline at end of file
+        'ttl_hours': settings.AI_CACHE_TTL_HOURS,
+        # executions = chamadas reais; coalesced = chamadas ao provider economizadas
+        'single_flight': _analises_em_andamento.stats(),
+        # seções de problema reaproveitadas e prompts cortados pelo orçamento de tokens
+        'prompt_builder': prompt_builder.stats()
+    }
+
+
+def get_hedging_stats() -> Dict[str, Any]:
+    """
+    Contadores do hedging entre providers
+    """
+    return {
+        'enabled': settings.AI_HEDGING_ENABLED,
+        'percentile': settings.AI_HEDGE_PERCENTILE,
+        **_hedge_stats
+    }
@@ -0,0 +1,316 @@
+"""
+Fila de avaliação das soluções por IA
+O endpoint de submissão só grava a solução e o job (tabela solucoes_jobs);
+workers assíncronos consomem a fila, chamam a IA e gravam o resultado.
+
+Os jobs ficam no MySQL: sobrevivem a restarts, e vários processos/hosts
+consomem a mesma fila sem pegar o mesmo job (SELECT ... FOR UPDATE SKIP LOCKED).
+"""
+import asyncio
+import json
+import os
+import random
+import socket
+from typing import Any, Dict, Optional
+from app.core.async_database import AsyncDatabase
+from app.core.background import background_tasks
+from app.core.config import settings
+from app.services.ai_service import analisar_solucao
+from app.services.pontuacao_service import creditar_pontos, resultado_da_analise
+from app.services.similarity_index import similarity_index
+
+# Um job 'processando' também é elegível quando o prazo vence: o worker que o
+# pegou morreu ou travou (ao pegar, proxima_tentativa_em = agora + lease)
+_CLAIM = """
+SELECT id, solucao_id, tentativas
+FROM solucoes_jobs
+WHERE status IN ('pendente', 'processando') AND proxima_tentativa_em <= NOW()
+ORDER BY proxima_tentativa_em
+LIMIT 1
+FOR UPDATE SKIP LOCKED
+"""
+
+_FEEDBACK_FALHA = (
+    'Não foi possível analisar a solução automaticamente. '
+    'A empresa analisará manualmente.'
+)
+
+
+class AnaliseIndisponivel(Exception):
+    """A IA não devolveu uma análise (todos os providers falharam)"""
+
+
+async def enfileirar_avaliacao(cursor, solucao_id: int):
+    """
+    Cria (ou reinicia) o job de avaliação da solução
+    Usa o cursor da submissão: solução e job são gravados na mesma transação
+    """
+    await cursor.execute("""
+        INSERT INTO solucoes_jobs (solucao_id, status, tentativas, proxima_tentativa_em)
+        VALUES (%s, 'pendente', 0, NOW())
+        ON DUPLICATE KEY UPDATE
+            status = 'pendente',
+            tentativas = 0,
+            proxima_tentativa_em = NOW(),
+            ultimo_erro = NULL
+    """, (solucao_id,))
+
+
+class GradingQueue:
+    """
+    Workers que consomem a tabela solucoes_jobs
+
+    Cada job passa por: pendente -> processando -> concluido, ou volta para
+    pendente com backoff exponencial se a análise falhar; após
+    `max_attempts` tentativas vira 'falhou' e a solução fica em 'revisao'
+    (avaliação manual pela empresa).
+    """
+
+    def __init__(
+        self,
+        workers: int = 2,
+        max_attempts: int = 5,
+        retry_base_seconds: int = 30,
+        retry_max_seconds: int = 1800,
+        poll_seconds: float = 2.0,
+        lease_seconds: int = 300
+    ):
+        self.workers = workers
+        self.max_attempts = max_attempts
+        self.retry_base_seconds = retry_base_seconds
+        self.retry_max_seconds = retry_max_seconds
+        self.poll_seconds = poll_seconds
+        self.lease_seconds = lease_seconds
+        self._wake: Optional[asyncio.Event] = None
+        self._started = False
+        self._stats = {'claimed': 0, 'completed': 0, 'retried': 0, 'failed': 0, 'skipped': 0}
+
+    # ==================== CICLO DE VIDA ====================
+
+    def start(self):
+        """Inicia os workers deste processo (chamar no startup, dentro do event loop)"""
+        if self._started or self.workers <= 0:
+            return
+        self._wake = asyncio.Event()
+        for n in range(self.workers):
+            worker_id = f"{socket.gethostname()}:{os.getpid()}:{n}"
+            background_tasks.spawn(f"grading-worker-{n}", self._run(worker_id))
+        self._started = True
+        print(f"📝 Fila de avaliação: {self.workers} worker(s) iniciado(s)")
+
+    def notify(self):
+        """Acorda os workers locais (chamar após o commit do job)"""
+        if self._wake is not None:
+            self._wake.set()
+
+    def backoff_seconds(self, tentativas: int) -> int:
+        """Espera antes da próxima tentativa (exponencial, com jitter de ±20%)"""
+        atraso = min(self.retry_base_seconds * 2 ** max(tentativas - 1, 0), self.retry_max_seconds)
+        return max(1, int(atraso * random.uniform(0.8, 1.2)))
+
+    # ==================== WORKER ====================
+
+    async def _run(self, worker_id: str):
+        while True:
+            try:
+                job = await self._claim(worker_id)
+            except Exception as e:
+                print(f"⚠️ Fila de avaliação: erro ao buscar job: {e}")
+                job = None
+
+            if job is None:
+                await self._wait()
+                continue
+
+            try:
+                await self._process(job)
+            except asyncio.CancelledError:
+                # Shutdown no meio da análise: o job volta à fila quando o lease vencer
+                raise
+            except Exception as e:
+                print(f"⚠️ Avaliação da solução {job['solucao_id']} falhou "
+                      f"(tentativa {job['tentativas']}): {e}")
+                try:
+                    await self._fail(job, str(e))
+                except Exception as erro_db:
+                    print(f"❌ Fila de avaliação: não foi possível registrar a falha: {erro_db}")
+
+    async def _wait(self):
+        try:
+            await asyncio.wait_for(self._wake.wait(), timeout=self.poll_seconds)
+        except asyncio.TimeoutError:
+            pass
+        self._wake.clear()
+
+    async def _claim(self, worker_id: str) -> Optional[Dict[str, Any]]:
+        """Reserva o próximo job elegível e carrega a solução e o problema"""
+        async with AsyncDatabase.get_cursor() as cursor:
+            await cursor.execute(_CLAIM)
+            job = await cursor.fetchone()
+            if job is None:
+                return None
+
+            await cursor.execute("""
+                UPDATE solucoes_jobs SET
+                    status = 'processando',
+                    tentativas = tentativas + 1,
+                    proxima_tentativa_em = NOW() + INTERVAL %s SECOND,
+                    bloqueado_por = %s
+                WHERE id = %s
+            """, (self.lease_seconds, worker_id, job['id']))
+
+            await cursor.execute(
+                "SELECT id, user_id, problema_id, descricao_solucao, status FROM solucoes WHERE id = %s",
+                (job['solucao_id'],)
+            )
+            solucao = await cursor.fetchone()
+
+            problema = None
+            if solucao is not None:
+                await cursor.execute("SELECT * FROM problemas WHERE id = %s", (solucao['problema_id'],))
+                problema = await cursor.fetchone()
+
+        self._stats['claimed'] += 1
+        return {
+            'id': job['id'],
+            'solucao_id': job['solucao_id'],
+            'tentativas': job['tentativas'] + 1,
+            'worker_id': worker_id,
+            'solucao': solucao,
+            'problema': problema
+        }
+
+    async def _process(self, job: Dict[str, Any]):
+        solucao, problema = job['solucao'], job['problema']
+
+        # Já avaliada (ex.: job retomado após o lease) ou sem problema associado
+        if solucao is None or problema is None or solucao['status'] != 'em_analise':
+            async with AsyncDatabase.get_cursor() as cursor:
+                await self._finish(cursor, job)
+            self._stats['skipped'] += 1
+            return
+
+        # Texto quase idêntico a uma solução já avaliada: reaproveita a análise
+        verificacao = await similarity_index.verificar(solucao)
+        analise = verificacao['analise']
+        if analise is None:
+            analise = await analisar_solucao(problema=problema, solucao_texto=solucao['descricao_solucao'])
+            if analise.get('erro'):
+                raise AnaliseIndisponivel(analise['erro'])
+
+        status_final, pontos = resultado_da_analise(analise['pontuacao'], problema)
+
+        # Muito parecida com a solução de outro usuário: a empresa decide
+        if verificacao['plagio'] is not None:
+            analise['alerta_plagio'] = verificacao['plagio']
+            status_final, pontos = 'revisao', 0
+
+        async with AsyncDatabase.get_cursor() as cursor:
+            # status = 'em_analise' garante que a solução é avaliada (e pontuada) uma vez só
+            await cursor.execute("""
+                UPDATE solucoes SET
+                    analise_ai = %s,
+                    pontuacao_ai = %s,
+                    feedback_ai = %s,
+                    pontos_ganhos = %s,
+                    pontuacao_final = %s,
+                    status = %s,
+                    data_avaliacao = NOW()
+                WHERE id = %s AND status = 'em_analise'
+            """, (
+                json.dumps(analise),
+                analise['pontuacao'],
+                analise['feedback'],
+                pontos,
+                analise['pontuacao'],
+                status_final,
+                solucao['id']
+            ))
+
+            if cursor.rowcount == 1 and status_final == 'aprovada':
+                await creditar_pontos(
+                    cursor, solucao['user_id'], pontos,
+                    solucao_id=solucao['id'], pontuacao=analise['pontuacao']
+                )
+
+            await self._finish(cursor, job)
+
+        self._stats['completed'] += 1
+
+    async def _finish(self, cursor, job: Dict[str, Any]):
+        await cursor.execute("""
+            UPDATE solucoes_jobs SET
+                status = 'concluido',
+                bloqueado_por = NULL,
+                ultimo_erro = NULL
+            WHERE id = %s
+        """, (job['id'],))
+
+    async def _fail(self, job: Dict[str, Any], erro: str):
+        """
+        Agenda nova tentativa com backoff ou, esgotadas as tentativas, desiste
+        Só mexe no job se ele ainda é deste worker: com o lease vencido, outro
+        worker pode já tê-lo pego (ou concluído)
+        """
+        async with AsyncDatabase.get_cursor() as cursor:
+            if job['tentativas'] < self.max_attempts:
+                await cursor.execute("""
+                    UPDATE solucoes_jobs SET
+                        status = 'pendente',
+                        proxima_tentativa_em = NOW() + INTERVAL %s SECOND,
+                        bloqueado_por = NULL,
+                        ultimo_erro = %s
+                    WHERE id = %s AND status = 'processando' AND bloqueado_por = %s
+                """, (self.backoff_seconds(job['tentativas']), erro[:2000], job['id'], job['worker_id']))
+                if cursor.rowcount == 1:
+                    self._stats['retried'] += 1
+                return
+
+            await cursor.execute("""
+                UPDATE solucoes_jobs SET
+                    status = 'falhou',
+                    bloqueado_por = NULL,
+                    ultimo_erro = %s
+                WHERE id = %s AND status = 'processando' AND bloqueado_por = %s
+            """, (erro[:2000], job['id'], job['worker_id']))
+            if cursor.rowcount != 1:
+                return
+
+            # Sem análise automática: a solução vai para avaliação manual
+            await cursor.execute("""
+                UPDATE solucoes SET
+                    status = 'revisao',
+                    feedback_ai = %s
+                WHERE id = %s AND status = 'em_analise'
+            """, (_FEEDBACK_FALHA, job['solucao_id']))
+
+        self._stats['failed'] += 1
+        print(f"❌ Solução {job['solucao_id']} enviada para revisão manual "
+              f"após {job['tentativas']} tentativas")
+
+    # ==================== MONITORAMENTO ====================
+
+    def stats(self) -> Dict[str, Any]:
+        """Contadores deste processo"""
+        return {
+            'workers': self.workers if self._started else 0,
+            'max_attempts': self.max_attempts,
+            **self._stats
+        }
+
+
+async def contar_jobs_por_status() -> Dict[str, int]:
+    """Tamanho da fila (todos os processos), por status"""
+    async with AsyncDatabase.get_cursor() as cursor:
+        await cursor.execute("SELECT status, COUNT(*) AS total FROM solucoes_jobs GROUP BY status")
+        return {row['status']: row['total'] for row in await cursor.fetchall()}
+
+
+grading_queue = GradingQueue(
+    workers=settings.GRADING_WORKERS,
+    max_attempts=settings.GRADING_MAX_ATTEMPTS,
+    retry_base_seconds=settings.GRADING_RETRY_BASE_SECONDS,
+    retry_max_seconds=settings.GRADING_RETRY_MAX_SECONDS,
+    poll_seconds=settings.GRADING_POLL_SECONDS,
+    lease_seconds=settings.GRADING_LEASE_SECONDS
+)
@@ -0,0 +1,244 @@
+"""
+Ranking global em memória
+Serve /ranking/global (top-N, página por posição e posição do usuário) sem
+consultar o MySQL: uma skip list indexável ordenada por (pontos desc, id asc)
+
+Carregado inteiro no startup e mantido por delta (users.updated_at) a cada
+LEADERBOARD_SYNC_SECONDS; créditos de pontos deste processo entram logo após
+o commit (pontuacao_service). Uma recarga completa a cada LEADERBOARD_FULL_RELOAD_SECONDS
+corrige o que não muda updated_at (ex.: média das soluções).
+"""
+import threading
+import time
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+from starlette.concurrency import run_in_threadpool
+from app.core.async_database import AsyncDatabase
+from app.core.config import settings
+from app.core.skiplist import IndexableSkipList
+
+# Dados de cada usuário devolvidos pelo ranking (mesmas colunas da query antiga)
+_SELECT_USUARIOS = """
+    SELECT
+        u.id, u.nome, u.foto_perfil, u.pontos_totais, u.nivel_atual, u.patente, u.ativo,
+        COUNT(s.id) AS total_solucoes,
+        AVG(s.pontuacao_final) AS media_pontuacao
+    FROM users u
+    LEFT JOIN solucoes s ON s.user_id = u.id AND s.status = 'aprovada'
+"""
+
+
+# O delta relê também os últimos segundos antes da marca d'água: um UPDATE feito
+# antes da sincronização e confirmado depois tem updated_at anterior a ela
+_SOBREPOSICAO_SEGUNDOS = 60
+
+
+def _chave(user_id: int, pontos: int) -> Tuple[int, int]:
+    return (-pontos, user_id)
+
+
+class Leaderboard:
+    """
+    Ranking dos usuários ativos; posições únicas como o ROW_NUMBER() da query
+    antiga (empate em pontos: menor id primeiro)
+
+    Os endpoints síncronos leem de threads do threadpool enquanto a
+    sincronização escreve no event loop: todo acesso passa por `_lock`.
+    """
+
+    def __init__(self):
+        self._lista = IndexableSkipList()
+        self._usuarios: Dict[int, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+        self._alterados: Set[int] = set()  # créditos locais a reler do banco
+        self._marca_dagua = None  # NOW() do banco na última sincronização
+        self._carregado_em: Optional[float] = None
+        self._stats = {'full_loads': 0, 'delta_syncs': 0, 'delta_rows': 0, 'local_updates': 0}
+
+    @property
+    def carregado(self) -> bool:
+        return self._carregado_em is not None
+
+    # ==================== LEITURA ====================
+
+    def pagina(self, offset: int, limit: int) -> List[Dict[str, Any]]:
+        """Usuários das posições offset+1 .. offset+limit"""
+        with self._lock:
+            resultado = []
+            for posicao, (_, user_id) in enumerate(self._lista.iter_from(offset), start=offset + 1):
+                if len(resultado) >= limit:
+                    break
+                resultado.append({'posicao': posicao, **self._usuarios[user_id]})
+            return resultado
+
+    def posicao(self, user_id: int) -> Optional[int]:
+        """Posição (1 = primeiro) do usuário; None se inativo ou desconhecido"""
+        with self._lock:
+            usuario = self._usuarios.get(user_id)
+            if usuario is None:
+                return None
+            return self._lista.index(_chave(user_id, usuario['pontos_totais'])) + 1
+
+    def ao_redor(self, user_id: int, k: int) -> Optional[Dict[str, Any]]:
+        """Posição do usuário e os `k` usuários imediatamente acima e abaixo dele"""
+        with self._lock:
+            usuario = self._usuarios.get(user_id)
+            if usuario is None:
+                return None
+            indice = self._lista.index(_chave(user_id, usuario['pontos_totais']))
+            inicio = max(indice - k, 0)
+            vizinhos = []
+            for posicao, (_, outro_id) in enumerate(self._lista.iter_from(inicio), start=inicio + 1):
+                if posicao > indice + 1 + k:
+                    break
+                vizinhos.append({'posicao': posicao, **self._usuarios[outro_id]})
+            return {
+                'posicao': indice + 1,
+                'acima': vizinhos[:indice - inicio],
+                'usuario': vizinhos[indice - inicio],
+                'abaixo': vizinhos[indice - inicio + 1:]
+            }
+
+    def total(self) -> int:
+        with self._lock:
+            return len(self._lista)
+
+    # ==================== ESCRITA ====================
+
+    def _aplicar(self, linha: Dict[str, Any]):
+        """Insere, move ou remove o usuário conforme a linha do banco (com _lock)"""
+        user_id = linha['id']
+        anterior = self._usuarios.pop(user_id, None)
+        if anterior is not None:
+            self._lista.remove(_chave(user_id, anterior['pontos_totais']))
+        if not linha['ativo']:
+            return
+
+        usuario = {
+            'id': user_id,
+            'nome': linha['nome'],
+            'foto_perfil': linha['foto_perfil'],
+            'pontos_totais': linha['pontos_totais'] or 0,
+            'nivel_atual': linha['nivel_atual'],
+            'patente': linha['patente'],
+            'total_solucoes': linha['total_solucoes'],
+            'media_pontuacao': linha['media_pontuacao']
+        }
+        self._usuarios[user_id] = usuario
+        self._lista.insert(_chave(user_id, usuario['pontos_totais']))
+
+    def registrar_pontos(self, ajustes: Dict[int, int]):
+        """
+        Aplica variações de pontos já confirmadas por este processo
+        (pontuacao_service publica após o commit); o usuário é relido do banco
+        na próxima sincronização, que continua sendo a fonte da verdade
+        """
+        with self._lock:
+            for user_id, delta in ajustes.items():
+                usuario = self._usuarios.get(user_id)
+                if usuario is not None and delta:
+                    self._lista.remove(_chave(user_id, usuario['pontos_totais']))
+                    usuario['pontos_totais'] = max(usuario['pontos_totais'] + delta, 0)
+                    self._lista.insert(_chave(user_id, usuario['pontos_totais']))
+                self._alterados.add(user_id)
+            self._stats['local_updates'] += len(ajustes)
+
+    def remover_usuario(self, user_id: int):
+        """
+        Tira o usuário do ranking (conta desativada), após o commit; nos outros
+        processos ele sai no próximo delta (users.updated_at)
+        """
+        with self._lock:
+            usuario = self._usuarios.pop(user_id, None)
+            if usuario is not None:
+                self._lista.remove(_chave(user_id, usuario['pontos_totais']))
+
+    # ==================== SINCRONIZAÇÃO ====================
+
+    async def sincronizar(self):
+        """Carga completa (primeira vez / periódica) ou delta desde a última sincronização"""
+        if (self._carregado_em is None
+                or time.monotonic() - self._carregado_em >= settings.LEADERBOARD_FULL_RELOAD_SECONDS):
+            await self.recarregar()
+        else:
+            await self._sincronizar_delta()
+
+    async def recarregar(self):
+        """Reconstrói o ranking inteiro a partir de users + solucoes"""
+        async with AsyncDatabase.get_cursor() as cursor:
+            await cursor.execute("SELECT NOW() AS agora")
+            agora = (await cursor.fetchone())['agora']
+            await cursor.execute(f"{_SELECT_USUARIOS} WHERE u.ativo = TRUE GROUP BY u.id")
+            linhas = await cursor.fetchall()
+
+        # Montar a lista nova fora do event loop e trocar de uma vez
+        # (créditos locais pendentes continuam marcados e são relidos no próximo delta)
+        lista, usuarios = await run_in_threadpool(self._montar_isolado, linhas)
+        with self._lock:
+            self._lista, self._usuarios = lista, usuarios
+            self._marca_dagua = agora
+            self._carregado_em = time.monotonic()
+            self._stats['full_loads'] += 1
+        print(f"🏆 Ranking global carregado: {len(lista)} usuários")
+
+    @staticmethod
+    def _montar_isolado(linhas: Iterable[Dict[str, Any]]):
+        """Lista e dados de um ranking novo, sem tocar no atual"""
+        construtor = Leaderboard()
+        for linha in linhas:
+            construtor._aplicar(linha)
+        return construtor._lista, construtor._usuarios
+
+    async def _sincronizar_delta(self):
+        with self._lock:
+            alterados = list(self._alterados)
+            self._alterados.clear()
+
+        condicao = "u.updated_at >= %s - INTERVAL %s SECOND"
+        params: List[Any] = [self._marca_dagua, _SOBREPOSICAO_SEGUNDOS]
+        if alterados:
+            condicao += f" OR u.id IN ({', '.join(['%s'] * len(alterados))})"
+            params.extend(alterados)
+
+        try:
+            async with AsyncDatabase.get_cursor() as cursor:
+                await cursor.execute("SELECT NOW() AS agora")
+                agora = (await cursor.fetchone())['agora']
+                await cursor.execute(f"{_SELECT_USUARIOS} WHERE {condicao} GROUP BY u.id", params)
+                linhas = await cursor.fetchall()
+        except Exception:
+            with self._lock:
+                self._alterados.update(alterados)  # tenta de novo na próxima
+            raise
+
+        with self._lock:
+            for linha in linhas:
+                self._aplicar(linha)
+            self._marca_dagua = agora
+            self._stats['delta_syncs'] += 1
+            self._stats['delta_rows'] += len(linhas)
+
+    def start(self):
+        """Carga inicial e sincronização periódica (chamado no startup)"""
+        if not settings.LEADERBOARD_ENABLED:
+            return
+        from app.core.background import background_tasks
+        background_tasks.every(
+            "leaderboard-sync", settings.LEADERBOARD_SYNC_SECONDS, self.sincronizar, initial_delay=0
+        )
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                'enabled': settings.LEADERBOARD_ENABLED,
+                'loaded': self.carregado,
+                'users': len(self._lista),
+                'pending_local_updates': len(self._alterados),
+                'watermark': str(self._marca_dagua) if self._marca_dagua else None,
+                'loaded_seconds_ago': (
+                    round(time.monotonic() - self._carregado_em) if self._carregado_em else None
+                ),
+                **self._stats
+            }
+
+
+leaderboard = Leaderboard()
@@ -0,0 +1,87 @@
+"""
+Crédito de pontos aos usuários
+Ponto único por onde passam os pontos ganhos em soluções aprovadas
+"""
+from typing import Any, Dict, Optional, Tuple
+from app.services import ranking_area_service
+from app.services.leaderboard_service import leaderboard
+from app.services.ranking_mensal_service import registrar_no_mes, registrar_nos_meses
+from app.services.ranking_periodo_service import ranking_periodo
+
+NOTA_APROVACAO = 60
+
+
+def resultado_da_analise(pontuacao: float, problema: Dict[str, Any]) -> Tuple[str, int]:
+    """(status da solução, pontos ganhos) para uma pontuação da IA"""
+    if pontuacao >= NOTA_APROVACAO:
+        return 'aprovada', problema['pontos_recompensa']
+    return 'reprovada', 0
+
+
+async def creditar_pontos(
+    cursor,
+    user_id: int,
+    pontos: int,
+    solucao_id: Optional[int] = None,
+    pontuacao: Optional[float] = None
+):
+    """
+    Crédito de uma solução aprovada: soma `pontos` ao total do usuário e ao
+    ranking do mês (+1 problema resolvido), na transação do cursor recebido
+    (AsyncCursor): o crédito é gravado junto com a aprovação da solução
+    Com `solucao_id`, entra também nos totais da área do problema; os rankings
+    em memória (leaderboard e o dos últimos dias) são atualizados depois do
+    commit (cursor.after_commit)
+    """
+    await registrar_no_mes(cursor, {user_id: (max(pontos, 0), 1)})
+    if solucao_id is not None:
+        await ranking_area_service.registrar_aprovacao(cursor, solucao_id)
+        cursor.after_commit(
+            lambda: ranking_periodo.registrar_aprovacao(solucao_id, user_id, max(pontos, 0), pontuacao)
+        )
+    if pontos <= 0:
+        return
+
+    await cursor.execute("""
+        UPDATE users
+        SET pontos_totais = pontos_totais + %s
+        WHERE id = %s
+    """, (pontos, user_id))
+    cursor.after_commit(lambda: leaderboard.registrar_pontos({user_id: pontos}))
+
+
+async def ajustar_pontos(
+    cursor,
+    ajustes: Dict[int, int],
+    por_mes: Optional[Dict[Tuple[int, int, int], Tuple[int, int]]] = None,
+    area: Optional[str] = None
+):
+    """
+    Aplica variações de pontos (positivas ou negativas) a vários usuários
+    num único UPDATE (ex.: reavaliação em lote que muda pontos_ganhos)
+
+    Args:
+        por_mes: (user_id, ano, mes) -> (delta de pontos, delta de problemas
+            resolvidos) no ranking_mensal, no mês em que cada solução foi avaliada
+        area: os totais desses usuários na área são recalculados das soluções
+            (as notas também podem ter mudado)
+    """
+    if area is not None:
+        await ranking_area_service.recalcular(
+            cursor, area=area, user_ids=set(ajustes) | {user_id for user_id, _, _ in por_mes or ()}
+        )
+    if por_mes:
+        await registrar_nos_meses(cursor, por_mes)
+
+    ajustes = {user_id: delta for user_id, delta in ajustes.items() if delta}
+    if not ajustes:
+        return
+
+    linhas = " UNION ALL ".join(["SELECT %s AS id, %s AS delta"] * len(ajustes))
+    params = [valor for item in ajustes.items() for valor in item]
+    await cursor.execute(f"""
+        UPDATE users u
+        INNER JOIN ({linhas}) a ON a.id = u.id
+        SET u.pontos_totais = GREATEST(u.pontos_totais + a.delta, 0)
+    """, params)
+    cursor.after_commit(lambda: leaderboard.registrar_pontos(ajustes))
@@ -0,0 +1,155 @@
+"""
+Posição dos usuários no ranking global e nos rankings por área
+Ponto único para "posição do usuário X" e "usuários ao redor de X" usado por
+ranking, dashboard e estatísticas do usuário
+
+Responde pelos rankings em memória (leaderboard_service, ranking_area_service)
+em O(log n); antes da primeira carga, ou para um usuário que ainda não chegou ao
+ranking (ex.: cadastro de segundos atrás), usa o banco com o mesmo critério de
+desempate: mais pontos primeiro, empate pelo menor id.
+"""
+from typing import Any, Dict, List, Optional
+from app.services.leaderboard_service import leaderboard
+from app.services.ranking_area_service import ranking_por_area
+
+# Usuários "à frente" de (pontos, id) na ordenação do ranking
+_A_FRENTE = "ativo = TRUE AND (pontos_totais > %s OR (pontos_totais = %s AND id < %s))"
+_ATRAS = "ativo = TRUE AND (pontos_totais < %s OR (pontos_totais = %s AND id > %s))"
+
+_COLUNAS = "id, nome, foto_perfil, pontos_totais, nivel_atual, patente"
+
+
+def _pontos_do_usuario(cursor, user_id: int) -> Optional[int]:
+    cursor.execute("SELECT pontos_totais FROM users WHERE id = %s AND ativo = TRUE", (user_id,))
+    usuario = cursor.fetchone()
+    if usuario is None:
+        return None
+    return usuario['pontos_totais'] or 0
+
+
+def posicao_global(cursor, user_id: int) -> Optional[int]:
+    """
+    Posição do usuário no ranking global (1 = primeiro); None se inativo
+
+    Args:
+        cursor: Cursor síncrono do endpoint, usado só se o ranking em memória
+            não puder responder
+    """
+    posicao = leaderboard.posicao(user_id) if leaderboard.carregado else None
+    if posicao is not None:
+        return posicao
+
+    pontos = _pontos_do_usuario(cursor, user_id)
+    if pontos is None:
+        return None
+    cursor.execute(f"SELECT COUNT(*) + 1 AS posicao FROM users WHERE {_A_FRENTE}", (pontos, pontos, user_id))
+    return cursor.fetchone()['posicao']
+
+
+def ao_redor(cursor, user_id: int, k: int = 5) -> Optional[Dict[str, Any]]:
+    """
+    Posição do usuário e os `k` usuários imediatamente acima e abaixo
+
+    Returns:
+        {'posicao': int, 'acima': [...], 'usuario': {...}, 'abaixo': [...]}
+        (cada usuário com 'posicao'), ou None se o usuário está inativo
+    """
+    if leaderboard.carregado:
+        resultado = leaderboard.ao_redor(user_id, k)
+        if resultado is not None:
+            return resultado
+
+    pontos = _pontos_do_usuario(cursor, user_id)
+    if pontos is None:
+        return None
+    posicao = posicao_global(cursor, user_id)
+
+    # Keyset a partir do usuário, nos dois sentidos (sem OFFSET)
+    cursor.execute(f"""
+        SELECT {_COLUNAS} FROM users WHERE {_A_FRENTE}
+        ORDER BY pontos_totais ASC, id DESC
+        LIMIT %s
+    """, (pontos, pontos, user_id, k))
+    acima = list(reversed(cursor.fetchall()))
+
+    cursor.execute(f"SELECT {_COLUNAS} FROM users WHERE id = %s", (user_id,))
+    usuario = cursor.fetchone()
+
+    cursor.execute(f"""
+        SELECT {_COLUNAS} FROM users WHERE {_ATRAS}
+        ORDER BY pontos_totais DESC, id ASC
+        LIMIT %s
+    """, (pontos, pontos, user_id, k))
+    abaixo = cursor.fetchall()
+
+    primeira = posicao - len(acima)
+    return {
+        'posicao': posicao,
+        'acima': [{'posicao': primeira + i, **u} for i, u in enumerate(acima)],
+        'usuario': {'posicao': posicao, **usuario},
+        'abaixo': [{'posicao': posicao + 1 + i, **u} for i, u in enumerate(abaixo)]
+    }
+
+
+# ==================== POR ÁREA ====================
+
+_COLUNAS_AREA = """
+    uap.user_id, uap.area, uap.pontos, uap.solucoes,
+    IF(uap.com_pontuacao > 0, uap.soma_pontuacao / uap.com_pontuacao, NULL) AS media_pontuacao
+"""
+
+
+def _posicao_na_area_sql(cursor, totais: Dict[str, Any]) -> Dict[str, Any]:
+    """Posição a partir da linha de user_area_pontos (idx_area_pontos)"""
+    cursor.execute("""
+        SELECT
+            SUM(uap.pontos > %s OR (uap.pontos = %s AND uap.user_id < %s)) + 1 AS posicao,
+            COUNT(*) AS total_usuarios
+        FROM user_area_pontos uap
+        INNER JOIN users u ON u.id = uap.user_id AND u.ativo = TRUE
+        WHERE uap.area = %s AND uap.solucoes > 0
+    """, (totais['pontos'], totais['pontos'], totais['user_id'], totais['area']))
+    contagem = cursor.fetchone()
+    return {
+        'posicao': int(contagem['posicao'] or 1),
+        **totais,
+        'total_usuarios': contagem['total_usuarios']
+    }
+
+
+def posicao_na_area(cursor, area: str, user_id: int) -> Optional[Dict[str, Any]]:
+    """
+    Posição e totais do usuário no ranking da área; None se ele não tem
+    solução aprovada nela (ou está inativo)
+    """
+    if ranking_por_area.carregado:
+        posicao = ranking_por_area.posicao(area, user_id)
+        if posicao is not None:
+            return posicao
+
+    if _pontos_do_usuario(cursor, user_id) is None:
+        return None
+    cursor.execute(f"""
+        SELECT {_COLUNAS_AREA} FROM user_area_pontos uap
+        WHERE uap.user_id = %s AND uap.area = %s AND uap.solucoes > 0
+    """, (user_id, area))
+    totais = cursor.fetchone()
+    return _posicao_na_area_sql(cursor, totais) if totais else None
+
+
+def posicoes_por_area(cursor, user_id: int) -> List[Dict[str, Any]]:
+    """Posição do usuário em cada área em que pontuou, da melhor para a pior"""
+    if ranking_por_area.carregado:
+        posicoes = ranking_por_area.posicoes_do_usuario(user_id)
+        if posicoes:
+            return posicoes
+
+    if _pontos_do_usuario(cursor, user_id) is None:
+        return []
+    cursor.execute(f"""
+        SELECT {_COLUNAS_AREA} FROM user_area_pontos uap
+        WHERE uap.user_id = %s AND uap.solucoes > 0
+    """, (user_id,))
+    posicoes = [_posicao_na_area_sql(cursor, totais) for totais in cursor.fetchall()]
+    posicoes.sort(key=lambda p: (p['posicao'], -p['pontos'], p['area']))
+    return posicoes
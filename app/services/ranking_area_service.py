@@ -0,0 +1,323 @@
+"""
+Ranking por área
+Pontos de cada usuário por área (problemas.area) na tabela desnormalizada
+user_area_pontos, somados na transação de cada aprovação, e um ranking em
+memória por área (skip list indexável, como o leaderboard_service) para
+página do ranking e posição do usuário em O(log n)
+
+A memória é carregada inteira no startup e mantida por delta
+(user_area_pontos.updated_at) a cada RANKING_AREA_SYNC_SECONDS; uma recarga
+completa a cada RANKING_AREA_FULL_RELOAD_SECONDS tira usuários desativados.
+"""
+import threading
+import time
+import unicodedata
+from typing import Any, Dict, Iterable, List, Optional, Set
+from starlette.concurrency import run_in_threadpool
+from app.core.async_database import AsyncDatabase
+from app.core.config import settings
+from app.core.skiplist import IndexableSkipList
+
+# Mesma sobreposição do delta do leaderboard_service
+_SOBREPOSICAO_SEGUNDOS = 60
+
+# Totais por (usuário, área) a partir das soluções aprovadas
+_SELECT_TOTAIS = """
+    SELECT
+        s.user_id,
+        p.area,
+        SUM(s.pontos_ganhos) AS pontos,
+        COUNT(*) AS solucoes,
+        COALESCE(SUM(s.pontuacao_final), 0) AS soma_pontuacao,
+        COUNT(s.pontuacao_final) AS com_pontuacao
+    FROM solucoes s
+    INNER JOIN problemas p ON p.id = s.problema_id
+    WHERE s.status = 'aprovada'
+"""
+
+_SELECT_MEMORIA = """
+    SELECT uap.user_id, uap.area, uap.pontos, uap.solucoes,
+           uap.soma_pontuacao, uap.com_pontuacao, u.ativo
+    FROM user_area_pontos uap
+    INNER JOIN users u ON u.id = uap.user_id
+"""
+
+
+def chave_area(area: str) -> str:
+    """
+    Nome da área como o MySQL compara (utf8mb4_unicode_ci): sem diferença de
+    maiúsculas, acentos ou espaços no fim
+    """
+    area = unicodedata.normalize('NFKD', area or '')
+    return ''.join(c for c in area if not unicodedata.combining(c)).casefold().rstrip()
+
+
+# ==================== TABELA user_area_pontos ====================
+
+async def registrar_aprovacao(cursor, solucao_id: int):
+    """
+    Soma a solução aprovada aos totais do usuário na área do problema,
+    na transação do cursor recebido (AsyncCursor), depois do UPDATE da solução
+    """
+    await cursor.execute("""
+        INSERT INTO user_area_pontos (user_id, area, pontos, solucoes, soma_pontuacao, com_pontuacao)
+        SELECT * FROM (
+            SELECT s.user_id, p.area, s.pontos_ganhos AS pontos, 1 AS solucoes,
+                   COALESCE(s.pontuacao_final, 0) AS soma_pontuacao,
+                   (s.pontuacao_final IS NOT NULL) AS com_pontuacao
+            FROM solucoes s
+            INNER JOIN problemas p ON p.id = s.problema_id
+            WHERE s.id = %s AND s.status = 'aprovada'
+        ) AS novo
+        ON DUPLICATE KEY UPDATE
+            pontos = user_area_pontos.pontos + novo.pontos,
+            solucoes = user_area_pontos.solucoes + novo.solucoes,
+            soma_pontuacao = user_area_pontos.soma_pontuacao + novo.soma_pontuacao,
+            com_pontuacao = user_area_pontos.com_pontuacao + novo.com_pontuacao
+    """, (solucao_id,))
+
+
+async def recalcular(cursor, area: Optional[str] = None, user_ids: Optional[Iterable[int]] = None):
+    """
+    Recalcula os totais a partir das soluções aprovadas, de uma área e/ou de
+    alguns usuários (sem filtros: a tabela inteira), na transação do cursor
+    Usado pela reavaliação em lote e pela avaliação manual da empresa, que
+    mudam pontos e notas de soluções já contadas, e pela reconstrução da tabela
+    """
+    filtros, filtros_tabela, params = [], [], []
+    if area is not None:
+        filtros.append("p.area = %s")
+        filtros_tabela.append("uap.area = %s")
+        params.append(area)
+    if user_ids is not None:
+        user_ids = list(user_ids)
+        if not user_ids:
+            return
+        marcadores = ', '.join(['%s'] * len(user_ids))
+        filtros.append(f"s.user_id IN ({marcadores})")
+        filtros_tabela.append(f"uap.user_id IN ({marcadores})")
+        params.extend(user_ids)
+    condicao = "".join(f" AND {filtro}" for filtro in filtros)
+    condicao_tabela = "".join(f" AND {filtro}" for filtro in filtros_tabela)
+
+    await cursor.execute(f"""
+        INSERT INTO user_area_pontos (user_id, area, pontos, solucoes, soma_pontuacao, com_pontuacao)
+        SELECT * FROM (
+            {_SELECT_TOTAIS}{condicao}
+            GROUP BY s.user_id, p.area
+        ) AS novo
+        ON DUPLICATE KEY UPDATE
+            pontos = novo.pontos,
+            solucoes = novo.solucoes,
+            soma_pontuacao = novo.soma_pontuacao,
+            com_pontuacao = novo.com_pontuacao
+    """, params)
+
+    # Quem não tem mais soluções aprovadas na área fica zerado
+    await cursor.execute(f"""
+        UPDATE user_area_pontos uap
+        SET uap.pontos = 0, uap.solucoes = 0, uap.soma_pontuacao = 0, uap.com_pontuacao = 0
+        WHERE uap.solucoes > 0{condicao_tabela}
+          AND NOT EXISTS (
+              SELECT 1 FROM solucoes s
+              INNER JOIN problemas p ON p.id = s.problema_id
+              WHERE s.user_id = uap.user_id AND p.area = uap.area AND s.status = 'aprovada'
+          )
+    """, params)
+
+
+async def reconstruir():
+    """Recalcula user_area_pontos inteira (carga inicial ou correção) e recarrega a memória"""
+    async with AsyncDatabase.get_cursor() as cursor:
+        await recalcular(cursor)
+    await ranking_por_area.recarregar()
+
+
+# ==================== RANKING EM MEMÓRIA ====================
+
+class _RankingDaArea:
+    def __init__(self, nome: str):
+        self.nome = nome
+        self.lista = IndexableSkipList()
+        self.totais: Dict[int, Dict[str, Any]] = {}
+
+
+class RankingPorArea:
+    """
+    Um ranking por área com chave (pontos desc, user_id asc); só usuários
+    ativos com solução aprovada na área
+
+    Leitura nas threads do threadpool e escrita no event loop: todo acesso
+    passa por `_lock`.
+    """
+
+    def __init__(self):
+        self._areas: Dict[str, _RankingDaArea] = {}
+        self._areas_do_usuario: Dict[int, Set[str]] = {}
+        self._lock = threading.Lock()
+        self._marca_dagua = None
+        self._carregado_em: Optional[float] = None
+        self._stats = {'full_loads': 0, 'delta_syncs': 0, 'delta_rows': 0}
+
+    @property
+    def carregado(self) -> bool:
+        return self._carregado_em is not None
+
+    # ==================== LEITURA ====================
+
+    def _item(self, ranking: _RankingDaArea, posicao: int, user_id: int) -> Dict[str, Any]:
+        return {'posicao': posicao, 'user_id': user_id, 'area': ranking.nome, **ranking.totais[user_id]}
+
+    def pagina(self, area: str, offset: int, limit: int) -> List[Dict[str, Any]]:
+        """Usuários das posições offset+1 .. offset+limit da área"""
+        with self._lock:
+            ranking = self._areas.get(chave_area(area))
+            if ranking is None:
+                return []
+            resultado = []
+            for posicao, (_, user_id) in enumerate(ranking.lista.iter_from(offset), start=offset + 1):
+                if len(resultado) >= limit:
+                    break
+                resultado.append(self._item(ranking, posicao, user_id))
+            return resultado
+
+    def posicao(self, area: str, user_id: int) -> Optional[Dict[str, Any]]:
+        """Posição e totais do usuário na área; None se ele não pontuou nela"""
+        with self._lock:
+            ranking = self._areas.get(chave_area(area))
+            if ranking is None or user_id not in ranking.totais:
+                return None
+            return self._posicao_em(ranking, user_id)
+
+    def _posicao_em(self, ranking: _RankingDaArea, user_id: int) -> Dict[str, Any]:
+        indice = ranking.lista.index((-ranking.totais[user_id]['pontos'], user_id))
+        return {**self._item(ranking, indice + 1, user_id), 'total_usuarios': len(ranking.lista)}
+
+    def posicoes_do_usuario(self, user_id: int) -> List[Dict[str, Any]]:
+        """Posição do usuário em cada área em que pontuou, da melhor para a pior"""
+        with self._lock:
+            posicoes = [
+                self._posicao_em(self._areas[chave], user_id)
+                for chave in self._areas_do_usuario.get(user_id, ())
+            ]
+        posicoes.sort(key=lambda p: (p['posicao'], -p['pontos'], p['area']))
+        return posicoes
+
+    # ==================== ESCRITA ====================
+
+    def _aplicar(self, linha: Dict[str, Any]):
+        """Insere, move ou remove o (usuário, área) conforme a linha do banco (com _lock)"""
+        user_id, chave = linha['user_id'], chave_area(linha['area'])
+        ranking = self._areas.get(chave)
+        if ranking is not None:
+            anterior = ranking.totais.pop(user_id, None)
+            if anterior is not None:
+                ranking.lista.remove((-anterior['pontos'], user_id))
+                self._areas_do_usuario[user_id].discard(chave)
+                if not self._areas_do_usuario[user_id]:
+                    del self._areas_do_usuario[user_id]
+
+        if not linha['ativo'] or not linha['solucoes']:
+            if ranking is not None and not ranking.totais:
+                del self._areas[chave]
+            return
+
+        if ranking is None:
+            ranking = self._areas[chave] = _RankingDaArea(linha['area'])
+        com_pontuacao = linha['com_pontuacao']
+        ranking.totais[user_id] = {
+            'pontos': linha['pontos'],
+            'solucoes': linha['solucoes'],
+            'media_pontuacao': (
+                round(float(linha['soma_pontuacao']) / com_pontuacao, 4) if com_pontuacao else None
+            )
+        }
+        ranking.lista.insert((-linha['pontos'], user_id))
+        self._areas_do_usuario.setdefault(user_id, set()).add(chave)
+
+    def remover_usuario(self, user_id: int):
+        """
+        Tira o usuário de todas as áreas (conta desativada), após o commit;
+        nos outros processos ele sai no próximo delta (users.updated_at)
+        """
+        with self._lock:
+            for chave in list(self._areas_do_usuario.get(user_id, ())):
+                nome = self._areas[chave].nome
+                self._aplicar({'user_id': user_id, 'area': nome, 'ativo': False, 'solucoes': 0})
+
+    # ==================== SINCRONIZAÇÃO ====================
+
+    async def sincronizar(self):
+        """Carga completa (primeira vez / periódica) ou delta desde a última sincronização"""
+        if (self._carregado_em is None
+                or time.monotonic() - self._carregado_em >= settings.RANKING_AREA_FULL_RELOAD_SECONDS):
+            await self.recarregar()
+        else:
+            await self._sincronizar_delta()
+
+    async def recarregar(self):
+        """Reconstrói os rankings de todas as áreas a partir de user_area_pontos"""
+        async with AsyncDatabase.get_cursor() as cursor:
+            await cursor.execute("SELECT NOW() AS agora")
+            agora = (await cursor.fetchone())['agora']
+            await cursor.execute(f"{_SELECT_MEMORIA} WHERE uap.solucoes > 0 AND u.ativo = TRUE")
+            linhas = await cursor.fetchall()
+
+        novo = await run_in_threadpool(self._montar_isolado, linhas)
+        with self._lock:
+            self._areas, self._areas_do_usuario = novo._areas, novo._areas_do_usuario
+            self._marca_dagua = agora
+            self._carregado_em = time.monotonic()
+            self._stats['full_loads'] += 1
+        print(f"🗂️ Ranking por área carregado: {len(novo._areas)} áreas, {len(linhas)} usuários/área")
+
+    @staticmethod
+    def _montar_isolado(linhas: Iterable[Dict[str, Any]]) -> 'RankingPorArea':
+        novo = RankingPorArea()
+        for linha in linhas:
+            novo._aplicar(linha)
+        return novo
+
+    async def _sincronizar_delta(self):
+        async with AsyncDatabase.get_cursor() as cursor:
+            await cursor.execute("SELECT NOW() AS agora")
+            agora = (await cursor.fetchone())['agora']
+            # Totais alterados e usuários alterados (ex.: conta desativada ou reativada)
+            await cursor.execute(f"""
+                {_SELECT_MEMORIA} WHERE uap.updated_at >= %s - INTERVAL %s SECOND
+                UNION
+                {_SELECT_MEMORIA} WHERE u.updated_at >= %s - INTERVAL %s SECOND
+            """, (self._marca_dagua, _SOBREPOSICAO_SEGUNDOS) * 2)
+            linhas = await cursor.fetchall()
+
+        with self._lock:
+            for linha in linhas:
+                self._aplicar(linha)
+            self._marca_dagua = agora
+            self._stats['delta_syncs'] += 1
+            self._stats['delta_rows'] += len(linhas)
+
+    def start(self):
+        """Carga inicial e sincronização periódica (chamado no startup)"""
+        if not settings.RANKING_AREA_ENABLED:
+            return
+        from app.core.background import background_tasks
+        background_tasks.every(
+            "ranking-area-sync", settings.RANKING_AREA_SYNC_SECONDS, self.sincronizar, initial_delay=0
+        )
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                'enabled': settings.RANKING_AREA_ENABLED,
+                'loaded': self.carregado,
+                'areas': {ranking.nome: len(ranking.lista) for ranking in self._areas.values()},
+                'watermark': str(self._marca_dagua) if self._marca_dagua else None,
+                'loaded_seconds_ago': (
+                    round(time.monotonic() - self._carregado_em) if self._carregado_em else None
+                ),
+                **self._stats
+            }
+
+
+ranking_por_area = RankingPorArea()
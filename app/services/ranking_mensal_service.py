@@ -0,0 +1,150 @@
+"""
+Manutenção incremental da tabela ranking_mensal
+Cada crédito de pontos soma em (user_id, mes, ano) na mesma transação da
+aprovação (ajustes de reavaliação, no mês da avaliação original); uma rotina
+periódica recalcula posicao_ranking com um único UPDATE
+"""
+from datetime import date
+from typing import Dict, Optional, Tuple
+from app.core.async_database import AsyncDatabase
+from app.core.config import settings
+
+_SOMAR_AO_EXISTENTE = """
+        ON DUPLICATE KEY UPDATE
+            pontos_mes = GREATEST(ranking_mensal.pontos_mes + novo.pontos_mes, 0),
+            problemas_resolvidos = GREATEST(ranking_mensal.problemas_resolvidos + novo.problemas_resolvidos, 0)
+"""
+
+
+async def registrar_no_mes(cursor, ajustes: Dict[int, Tuple[int, int]]):
+    """
+    Soma (pontos, problemas resolvidos) de cada usuário no mês corrente,
+    na transação do cursor recebido (AsyncCursor)
+
+    Args:
+        ajustes: user_id -> (delta de pontos, delta de problemas resolvidos);
+            deltas negativos vêm de reavaliações que reprovaram uma solução
+    """
+    ajustes = {user_id: delta for user_id, delta in ajustes.items() if any(delta)}
+    if not ajustes:
+        return
+
+    linhas = ", ".join(["(%s, MONTH(NOW()), YEAR(NOW()), %s, %s)"] * len(ajustes))
+    params = [valor for user_id, (pontos, resolvidos) in ajustes.items() for valor in (user_id, pontos, resolvidos)]
+    await cursor.execute(f"""
+        INSERT INTO ranking_mensal (user_id, mes, ano, pontos_mes, problemas_resolvidos)
+        VALUES {linhas} AS novo
+        {_SOMAR_AO_EXISTENTE}
+    """, params)
+
+
+async def registrar_nos_meses(cursor, ajustes: Dict[Tuple[int, int, int], Tuple[int, int]]):
+    """
+    Como registrar_no_mes, mas cada ajuste no seu mês:
+    (user_id, ano, mes) -> (delta de pontos, delta de problemas resolvidos)
+
+    Usado pela reavaliação em lote: a variação de uma solução vai para o mês
+    da avaliação original, o mesmo em que o crédito dela foi somado
+    """
+    ajustes = {chave: delta for chave, delta in ajustes.items() if any(delta)}
+    if not ajustes:
+        return
+
+    linhas = ", ".join(["(%s, %s, %s, %s, %s)"] * len(ajustes))
+    params = [
+        valor
+        for (user_id, ano, mes), (pontos, resolvidos) in ajustes.items()
+        for valor in (user_id, mes, ano, pontos, resolvidos)
+    ]
+    await cursor.execute(f"""
+        INSERT INTO ranking_mensal (user_id, mes, ano, pontos_mes, problemas_resolvidos)
+        VALUES {linhas} AS novo
+        {_SOMAR_AO_EXISTENTE}
+    """, params)
+
+
+def _mes_anterior(ano: int, mes: int) -> Tuple[int, int]:
+    return (ano - 1, 12) if mes == 1 else (ano, mes - 1)
+
+
+def _proximo_mes(ano: int, mes: int) -> Tuple[int, int]:
+    return (ano + 1, 1) if mes == 12 else (ano, mes + 1)
+
+
+async def atualizar_posicoes(ano: Optional[int] = None, mes: Optional[int] = None) -> int:
+    """
+    Recalcula posicao_ranking de um mês com um UPDATE set-based
+    (só as linhas cuja posição mudou são escritas)
+
+    Sem mês informado, atualiza o mês corrente e o anterior: créditos nos
+    últimos minutos do mês ainda entram na posição final dele
+    """
+    if ano is None or mes is None:
+        hoje = date.today()
+        meses = [(hoje.year, hoje.month), _mes_anterior(hoje.year, hoje.month)]
+    else:
+        meses = [(ano, mes)]
+
+    alteradas = 0
+    async with AsyncDatabase.get_cursor() as cursor:
+        for ano_ref, mes_ref in meses:
+            # Mesmo critério de /ranking/mensal: usuários ativos, empate pelo registro mais antigo
+            await cursor.execute("""
+                UPDATE ranking_mensal rm
+                INNER JOIN (
+                    SELECT r.id, ROW_NUMBER() OVER (ORDER BY r.pontos_mes DESC, r.id) AS posicao
+                    FROM ranking_mensal r
+                    INNER JOIN users u ON u.id = r.user_id AND u.ativo = TRUE
+                    WHERE r.ano = %s AND r.mes = %s
+                ) p ON p.id = rm.id
+                SET rm.posicao_ranking = p.posicao
+                WHERE rm.posicao_ranking IS NULL OR rm.posicao_ranking <> p.posicao
+            """, (ano_ref, mes_ref))
+            alteradas += cursor.rowcount
+    return alteradas
+
+
+async def reconstruir_mes(ano: int, mes: int) -> int:
+    """
+    Recalcula os contadores de um mês a partir das soluções aprovadas
+    (carga inicial ou correção); depois atualiza as posições
+    """
+    async with AsyncDatabase.get_cursor() as cursor:
+        await cursor.execute("""
+            INSERT INTO ranking_mensal (user_id, mes, ano, pontos_mes, problemas_resolvidos)
+            SELECT * FROM (
+                SELECT s.user_id, %s AS mes, %s AS ano, SUM(s.pontos_ganhos) AS pontos, COUNT(*) AS resolvidos
+                FROM solucoes s
+                WHERE s.status = 'aprovada'
+                  AND s.data_avaliacao >= %s AND s.data_avaliacao < %s
+                GROUP BY s.user_id
+            ) AS novo
+            ON DUPLICATE KEY UPDATE
+                pontos_mes = novo.pontos,
+                problemas_resolvidos = novo.resolvidos
+        """, (mes, ano, date(ano, mes, 1), date(*_proximo_mes(ano, mes), 1)))
+
+        # Quem não tem mais soluções aprovadas no mês fica zerado
+        await cursor.execute("""
+            UPDATE ranking_mensal rm
+            LEFT JOIN (
+                SELECT DISTINCT user_id FROM solucoes
+                WHERE status = 'aprovada' AND data_avaliacao >= %s AND data_avaliacao < %s
+            ) s ON s.user_id = rm.user_id
+            SET rm.pontos_mes = 0, rm.problemas_resolvidos = 0
+            WHERE rm.ano = %s AND rm.mes = %s AND s.user_id IS NULL
+        """, (date(ano, mes, 1), date(*_proximo_mes(ano, mes), 1), ano, mes))
+
+    return await atualizar_posicoes(ano, mes)
+
+
+def start():
+    """Agenda a atualização periódica das posições (chamado no startup)"""
+    from app.core.background import background_tasks
+
+    async def atualizar():
+        alteradas = await atualizar_posicoes()
+        if alteradas:
+            print(f"🏅 ranking_mensal: {alteradas} posições atualizadas")
+
+    background_tasks.every("ranking-mensal", settings.RANKING_MENSAL_REFRESH_SECONDS, atualizar)
@@ -0,0 +1,259 @@
+"""
+Ranking dos últimos N dias em memória (ranking semanal e períodos curtos)
+Contadores por usuário em baldes diários, num anel com os últimos
+RANKING_JANELA_DIAS dias: o ranking de um período é a soma dos baldes dele,
+sem agregar `solucoes` a cada chamada
+
+Cada solução aprovada entra no balde do dia da avaliação (DATE(data_avaliacao),
+como o filtro da query antiga) e é registrada pelo id: reaplicar a mesma
+solução substitui a contribuição anterior em vez de somar de novo. Aprovações
+deste processo entram logo após o commit (pontuacao_service); as de outros
+processos, reavaliações e qualquer outra mudança de status chegam pelo delta de
+solucoes.updated_at a cada RANKING_JANELA_SYNC_SECONDS. Na virada do dia a janela é recarregada inteira
+do banco, o que corrige qualquer divergência acumulada.
+"""
+import heapq
+import threading
+from datetime import date, timedelta
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+from starlette.concurrency import run_in_threadpool
+from app.core.async_database import AsyncDatabase
+from app.core.config import settings
+
+# Sobreposição do delta (mesmo motivo do leaderboard_service: UPDATE confirmado
+# depois da sincronização com updated_at anterior a ela)
+_SOBREPOSICAO_SEGUNDOS = 60
+
+# solucao_id -> (dia, user_id, pontos, pontuacao_final)
+_Contribuicao = Tuple[date, int, int, Optional[float]]
+
+
+class _Balde:
+    """Totais de um usuário em um dia"""
+    __slots__ = ('pontos', 'solucoes', 'soma_pontuacao', 'com_pontuacao')
+
+    def __init__(self):
+        self.pontos = 0
+        self.solucoes = 0
+        self.soma_pontuacao = 0.0
+        self.com_pontuacao = 0
+
+    def somar(self, pontos: int, pontuacao: Optional[float], sinal: int):
+        self.pontos += sinal * pontos
+        self.solucoes += sinal
+        if pontuacao is not None:
+            self.soma_pontuacao += sinal * pontuacao
+            self.com_pontuacao += sinal
+
+
+class RankingPeriodo:
+    """
+    Baldes diários dos usuários com soluções aprovadas na janela
+
+    Como o leaderboard: leitura nas threads do threadpool e escrita no event
+    loop, com todo acesso sob `_lock`.
+    """
+
+    def __init__(self, dias: int = 30):
+        self.dias = dias
+        self._baldes: Dict[date, Dict[int, _Balde]] = {}
+        self._solucoes: Dict[int, _Contribuicao] = {}
+        self._lock = threading.Lock()
+        self._hoje: Optional[date] = None  # CURDATE() do banco na última sincronização
+        self._marca_dagua = None
+        self._stats = {
+            'full_loads': 0, 'delta_syncs': 0, 'delta_rows': 0,
+            'local_updates': 0, 'drift_corrected': 0
+        }
+
+    @property
+    def carregado(self) -> bool:
+        return self._hoje is not None
+
+    # ==================== ESCRITA ====================
+
+    def _remover(self, solucao_id: int):
+        anterior = self._solucoes.pop(solucao_id, None)
+        if anterior is None:
+            return
+        dia, user_id, pontos, pontuacao = anterior
+        baldes_do_dia = self._baldes.get(dia, {})
+        balde = baldes_do_dia.get(user_id)
+        if balde is None:
+            return
+        balde.somar(pontos, pontuacao, -1)
+        if balde.solucoes <= 0:
+            del baldes_do_dia[user_id]
+            if not baldes_do_dia:
+                del self._baldes[dia]
+
+    def _aplicar(self, solucao_id: int, contribuicao: Optional[_Contribuicao]):
+        """Substitui a contribuição da solução (None: ela não conta mais) — com _lock"""
+        self._remover(solucao_id)
+        if contribuicao is None or contribuicao[0] < self._inicio_janela():
+            return
+        dia, user_id, pontos, pontuacao = contribuicao
+        self._solucoes[solucao_id] = contribuicao
+        balde = self._baldes.setdefault(dia, {}).get(user_id)
+        if balde is None:
+            balde = self._baldes[dia][user_id] = _Balde()
+        balde.somar(pontos, pontuacao, 1)
+
+    def _inicio_janela(self) -> date:
+        return self._hoje - timedelta(days=self.dias)
+
+    def registrar_aprovacao(self, solucao_id: int, user_id: int, pontos: int, pontuacao: Optional[float]):
+        """
+        Aprovação já confirmada por este processo, no balde de hoje
+        (pontuacao_service publica após o commit; o próximo delta confirma)
+        """
+        with self._lock:
+            if not self.carregado:
+                return
+            self._aplicar(solucao_id, (self._hoje, user_id, pontos, _como_float(pontuacao)))
+            self._stats['local_updates'] += 1
+
+    # ==================== LEITURA ====================
+
+    def totais(self, dias: int, limit: int) -> List[Dict[str, Any]]:
+        """
+        Os `limit` usuários com mais pontos nos baldes de hoje e dos `dias`
+        dias anteriores (mesmo período de DATE_SUB(CURDATE(), INTERVAL dias DAY));
+        empate pelo menor id
+        """
+        with self._lock:
+            inicio = self._hoje - timedelta(days=min(dias, self.dias))
+            somas: Dict[int, _Balde] = {}
+            for dia, baldes_do_dia in self._baldes.items():
+                if dia < inicio:
+                    continue
+                for user_id, balde in baldes_do_dia.items():
+                    soma = somas.get(user_id)
+                    if soma is None:
+                        soma = somas[user_id] = _Balde()
+                    soma.pontos += balde.pontos
+                    soma.solucoes += balde.solucoes
+                    soma.soma_pontuacao += balde.soma_pontuacao
+                    soma.com_pontuacao += balde.com_pontuacao
+
+        melhores = heapq.nsmallest(limit, somas.items(), key=lambda item: (-item[1].pontos, item[0]))
+        return [
+            {
+                'user_id': user_id,
+                'pontos': soma.pontos,
+                'solucoes': soma.solucoes,
+                'media_pontuacao': (
+                    round(soma.soma_pontuacao / soma.com_pontuacao, 4) if soma.com_pontuacao else None
+                )
+            }
+            for user_id, soma in melhores
+        ]
+
+    # ==================== SINCRONIZAÇÃO ====================
+
+    async def sincronizar(self):
+        """Carga completa (primeira vez / virada do dia) ou delta desde a última sincronização"""
+        if not self.carregado:
+            await self.recarregar()
+        else:
+            await self._sincronizar_delta()
+
+    async def recarregar(self):
+        """Reconstrói a janela inteira a partir das soluções aprovadas (reconciliação)"""
+        async with AsyncDatabase.get_cursor() as cursor:
+            await cursor.execute("SELECT NOW() AS agora")
+            agora = (await cursor.fetchone())['agora']
+            await cursor.execute("""
+                SELECT id, user_id, pontos_ganhos, pontuacao_final, DATE(data_avaliacao) AS dia
+                FROM solucoes
+                WHERE status = 'aprovada'
+                  AND data_avaliacao >= DATE_SUB(DATE(%s), INTERVAL %s DAY)
+            """, (agora, self.dias))
+            linhas = await cursor.fetchall()
+
+        novo = await run_in_threadpool(self._montar_isolado, self.dias, agora.date(), linhas)
+        with self._lock:
+            divergentes = self._divergencias(novo._solucoes, novo._inicio_janela()) if self.carregado else 0
+            self._baldes, self._solucoes = novo._baldes, novo._solucoes
+            self._hoje = novo._hoje
+            self._marca_dagua = agora
+            self._stats['full_loads'] += 1
+            self._stats['drift_corrected'] += divergentes
+        print(f"📅 Ranking dos últimos {self.dias} dias carregado: {len(linhas)} soluções"
+              + (f" ({divergentes} divergências corrigidas)" if divergentes else ""))
+
+    @staticmethod
+    def _montar_isolado(dias: int, hoje: date, linhas: Iterable[Dict[str, Any]]) -> 'RankingPeriodo':
+        """Janela nova, sem tocar na atual"""
+        novo = RankingPeriodo(dias)
+        novo._hoje = hoje
+        for linha in linhas:
+            novo._aplicar(linha['id'], _contribuicao(linha))
+        return novo
+
+    def _divergencias(self, corretas: Dict[int, _Contribuicao], inicio: date) -> int:
+        """Soluções da janela nova que os baldes atuais contavam diferente (com _lock)"""
+        atuais = {sid: c for sid, c in self._solucoes.items() if c[0] >= inicio}
+        return sum(1 for sid in atuais.keys() | corretas.keys() if atuais.get(sid) != corretas.get(sid))
+
+    async def _sincronizar_delta(self):
+        # updated_at muda a cada UPDATE da solução (ON UPDATE CURRENT_TIMESTAMP):
+        # aprovação, reavaliação, envio para revisão, decisão da empresa
+        async with AsyncDatabase.get_cursor() as cursor:
+            await cursor.execute("SELECT NOW() AS agora")
+            agora = (await cursor.fetchone())['agora']
+            if agora.date() != self._hoje:
+                linhas = None
+            else:
+                await cursor.execute("""
+                    SELECT id, user_id, status, pontos_ganhos, pontuacao_final, DATE(data_avaliacao) AS dia
+                    FROM solucoes
+                    WHERE updated_at >= %s - INTERVAL %s SECOND
+                """, (self._marca_dagua, _SOBREPOSICAO_SEGUNDOS))
+                linhas = await cursor.fetchall()
+
+        if linhas is None:
+            # Virada do dia: o balde mais antigo sai do anel e a janela é reconciliada
+            await self.recarregar()
+            return
+
+        with self._lock:
+            for linha in linhas:
+                conta = linha['status'] == 'aprovada' and linha['dia'] is not None
+                self._aplicar(linha['id'], _contribuicao(linha) if conta else None)
+            self._marca_dagua = agora
+            self._stats['delta_syncs'] += 1
+            self._stats['delta_rows'] += len(linhas)
+
+    def start(self):
+        """Carga inicial e sincronização periódica (chamado no startup)"""
+        if not settings.RANKING_JANELA_ENABLED:
+            return
+        from app.core.background import background_tasks
+        background_tasks.every(
+            "ranking-periodo-sync", settings.RANKING_JANELA_SYNC_SECONDS, self.sincronizar, initial_delay=0
+        )
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                'enabled': settings.RANKING_JANELA_ENABLED,
+                'loaded': self.carregado,
+                'days': self.dias,
+                'today': str(self._hoje) if self._hoje else None,
+                'buckets': sum(len(baldes) for baldes in self._baldes.values()),
+                'solutions': len(self._solucoes),
+                'watermark': str(self._marca_dagua) if self._marca_dagua else None,
+                **self._stats
+            }
+
+
+def _como_float(valor) -> Optional[float]:
+    return None if valor is None else float(valor)
+
+
+def _contribuicao(linha: Dict[str, Any]) -> _Contribuicao:
+    return (linha['dia'], linha['user_id'], linha['pontos_ganhos'] or 0, _como_float(linha['pontuacao_final']))
+
+
+ranking_periodo = RankingPeriodo(dias=settings.RANKING_JANELA_DIAS)
@@ -0,0 +1,341 @@
+"""
+Reavaliação em lote das soluções de um problema
+Para quando a empresa muda os critérios ou os prompts da IA mudam
+
+As soluções são lidas em páginas (keyset por id), analisadas com concorrência
+limitada e gravadas com um UPDATE por página. Cada página grava também o
+checkpoint em regrade_runs: uma execução interrompida retoma do último id.
+"""
+import asyncio
+import json
+import os
+import socket
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from app.core.async_database import AsyncDatabase
+from app.core.config import settings
+from app.services.ai_service import analisar_solucao
+from app.services.pontuacao_service import ajustar_pontos, resultado_da_analise
+from app.services.ranking_mensal_service import atualizar_posicoes
+
+# Soluções em 'em_analise' são da fila de avaliação e as em 'revisao' aguardam
+# a decisão da empresa (alerta de plágio ou falha da análise automática):
+# nenhuma das duas entra no lote
+_STATUS_REAVALIAVEIS = "('aprovada', 'reprovada')"
+
+# Execuções rodando neste processo (run_id -> task)
+_execucoes_locais: Dict[int, asyncio.Task] = {}
+
+
+class RegradeError(Exception):
+    """Execução já concluída ou em andamento em outro processo"""
+
+
+class RegradeNaoEncontrado(RegradeError):
+    """Problema ou execução inexistente"""
+
+
+# ==================== EXECUÇÕES (CHECKPOINT) ====================
+
+async def criar_execucao(problema_id: int, iniciado_por: str = "admin") -> Dict[str, Any]:
+    """Registra uma nova reavaliação para o problema (ainda não iniciada)"""
+    async with AsyncDatabase.get_cursor() as cursor:
+        await cursor.execute("SELECT id FROM problemas WHERE id = %s", (problema_id,))
+        if not await cursor.fetchone():
+            raise RegradeNaoEncontrado(f"Problema {problema_id} não encontrado")
+
+        await cursor.execute(
+            f"SELECT COUNT(*) AS total FROM solucoes WHERE problema_id = %s AND status IN {_STATUS_REAVALIAVEIS}",
+            (problema_id,)
+        )
+        total = (await cursor.fetchone())['total']
+
+        await cursor.execute("""
+            INSERT INTO regrade_runs (problema_id, status, total, iniciado_por)
+            VALUES (%s, 'pausado', %s, %s)
+        """, (problema_id, total, iniciado_por))
+        run_id = cursor.lastrowid
+
+    return await obter_execucao(run_id)
+
+
+async def obter_execucao(run_id: int) -> Dict[str, Any]:
+    """Progresso da reavaliação"""
+    async with AsyncDatabase.get_cursor() as cursor:
+        await cursor.execute("SELECT * FROM regrade_runs WHERE id = %s", (run_id,))
+        execucao = await cursor.fetchone()
+
+    if execucao is None:
+        raise RegradeNaoEncontrado(f"Execução {run_id} não encontrada")
+
+    execucao['rodando_neste_processo'] = run_id in _execucoes_locais
+    execucao['progresso'] = (
+        round(execucao['processadas'] / execucao['total'], 4) if execucao['total'] else 1.0
+    )
+    return execucao
+
+
+async def _reservar_execucao(run_id: int) -> Dict[str, Any]:
+    """
+    Marca a execução como 'executando' por este processo
+    Recusa se já concluída ou se outro processo atualizou há menos de REGRADE_STALE_SECONDS
+    """
+    executor = f"{socket.gethostname()}:{os.getpid()}"
+    async with AsyncDatabase.get_cursor() as cursor:
+        await cursor.execute("""
+            UPDATE regrade_runs SET status = 'executando', executor = %s, erro = NULL
+            WHERE id = %s
+              AND status <> 'concluido'
+              AND (status <> 'executando' OR executor = %s
+                   OR updated_at < NOW() - INTERVAL %s SECOND)
+        """, (executor, run_id, executor, settings.REGRADE_STALE_SECONDS))
+
+        if cursor.rowcount != 1:
+            await cursor.execute("SELECT status, executor FROM regrade_runs WHERE id = %s", (run_id,))
+            atual = await cursor.fetchone()
+            if atual is None:
+                raise RegradeNaoEncontrado(f"Execução {run_id} não encontrada")
+            if atual['status'] == 'concluido':
+                raise RegradeError(f"Execução {run_id} já foi concluída")
+            raise RegradeError(f"Execução {run_id} em andamento em {atual['executor']}")
+
+        await cursor.execute("SELECT * FROM regrade_runs WHERE id = %s", (run_id,))
+        return await cursor.fetchone()
+
+
+# ==================== REAVALIAÇÃO ====================
+
+async def executar_regrade(
+    run_id: int,
+    concorrencia: Optional[int] = None,
+    lote: Optional[int] = None,
+    on_progress: Optional[Callable[[Dict[str, Any]], None]] = None
+) -> Dict[str, Any]:
+    """
+    Executa (ou retoma) a reavaliação a partir do checkpoint
+
+    Args:
+        run_id: Execução criada com criar_execucao
+        concorrencia: Análises simultâneas (padrão: REGRADE_CONCURRENCY)
+        lote: Soluções por página/UPDATE (padrão: REGRADE_BATCH_SIZE)
+        on_progress: Chamado com o progresso após cada página gravada
+    """
+    execucao = await _reservar_execucao(run_id)
+    return await _executar(execucao, concorrencia, lote, on_progress)
+
+
+async def _executar(
+    execucao: Dict[str, Any],
+    concorrencia: Optional[int],
+    lote: Optional[int],
+    on_progress: Optional[Callable[[Dict[str, Any]], None]]
+) -> Dict[str, Any]:
+    run_id = execucao['id']
+    concorrencia = concorrencia or settings.REGRADE_CONCURRENCY
+    lote = lote or settings.REGRADE_BATCH_SIZE
+
+    try:
+        async with AsyncDatabase.get_cursor() as cursor:
+            await cursor.execute("SELECT * FROM problemas WHERE id = %s", (execucao['problema_id'],))
+            problema = await cursor.fetchone()
+
+        limite = asyncio.Semaphore(concorrencia)
+        ultimo_id = execucao['ultimo_solucao_id']
+
+        print(f"🔁 Reavaliação {run_id}: problema {problema['id']}, a partir da solução {ultimo_id}")
+
+        while True:
+            pagina = await _ler_pagina(problema['id'], ultimo_id, lote)
+            if not pagina:
+                break
+
+            analises = await asyncio.gather(*[
+                _analisar(limite, problema, solucao) for solucao in pagina
+            ])
+            ultimo_id = pagina[-1]['id']
+            progresso = await _gravar_pagina(run_id, problema, pagina, analises, ultimo_id)
+
+            print(f"🔁 Reavaliação {run_id}: {progresso['processadas']}/{progresso['total']} "
+                  f"({progresso['atualizadas']} atualizadas, {progresso['erros']} erros)")
+            if on_progress is not None:
+                on_progress(progresso)
+
+        async with AsyncDatabase.get_cursor() as cursor:
+            await cursor.execute("""
+                UPDATE regrade_runs SET status = 'concluido', concluido_em = NOW()
+                WHERE id = %s
+            """, (run_id,))
+
+    except asyncio.CancelledError:
+        await _marcar_interrompida(run_id, 'pausado', None)
+        raise
+    except Exception as e:
+        print(f"❌ Reavaliação {run_id} falhou: {e}")
+        await _marcar_interrompida(run_id, 'falhou', str(e))
+        raise
+
+    return await obter_execucao(run_id)
+
+
+async def _ler_pagina(problema_id: int, ultimo_id: int, lote: int) -> List[Dict[str, Any]]:
+    async with AsyncDatabase.get_cursor() as cursor:
+        await cursor.execute(f"""
+            SELECT id, user_id, descricao_solucao, pontos_ganhos, status
+            FROM solucoes
+            WHERE problema_id = %s AND id > %s AND status IN {_STATUS_REAVALIAVEIS}
+            ORDER BY id
+            LIMIT %s
+        """, (problema_id, ultimo_id, lote))
+        return await cursor.fetchall()
+
+
+async def _analisar(
+    limite: asyncio.Semaphore,
+    problema: Dict[str, Any],
+    solucao: Dict[str, Any]
+) -> Optional[Dict[str, Any]]:
+    """
+    Analisa uma solução; None se a IA não devolveu análise
+    (a seção do problema no prompt é renderizada uma vez e reaproveitada pelo prompt_builder)
+    """
+    async with limite:
+        analise = await analisar_solucao(
+            problema=problema,
+            solucao_texto=solucao['descricao_solucao'],
+            use_cache=False  # o prompt ou os critérios mudaram: o cache está desatualizado
+        )
+    return None if analise.get('erro') else analise
+
+
+async def _gravar_pagina(
+    run_id: int,
+    problema: Dict[str, Any],
+    pagina: List[Dict[str, Any]],
+    analises: List[Optional[Dict[str, Any]]],
+    ultimo_id: int
+) -> Dict[str, Any]:
+    """
+    Grava as análises da página, ajusta os pontos dos usuários e o checkpoint
+    na mesma transação
+
+    A análise da página leva minutos: uma solução que mudou desde a leitura
+    (status ou pontos) fica como está, e os ajustes de pontos usam os valores
+    relidos com lock
+    """
+    analisadas = [(solucao, analise) for solucao, analise in zip(pagina, analises) if analise is not None]
+    erros = len(pagina) - len(analisadas)
+    por_mes: Dict[Tuple[int, int, int], Tuple[int, int]] = {}
+
+    async with AsyncDatabase.get_cursor() as cursor:
+        linhas = []
+        if analisadas:
+            ids = [solucao['id'] for solucao, _ in analisadas]
+            await cursor.execute(f"""
+                SELECT id, status, pontos_ganhos, data_avaliacao FROM solucoes
+                WHERE id IN ({', '.join(['%s'] * len(ids))})
+                FOR UPDATE
+            """, ids)
+            atuais = {row['id']: row for row in await cursor.fetchall()}
+
+            ajustes: Dict[int, int] = {}
+            for solucao, analise in analisadas:
+                atual = atuais.get(solucao['id'])
+                if (atual is None or atual['status'] != solucao['status']
+                        or atual['pontos_ganhos'] != solucao['pontos_ganhos']):
+                    continue
+                status_final, pontos = resultado_da_analise(analise['pontuacao'], problema)
+                linhas.append((
+                    solucao['id'], json.dumps(analise), analise['pontuacao'], analise['feedback'],
+                    pontos, status_final, atual['status'], atual['pontos_ganhos']
+                ))
+                delta = pontos - (atual['pontos_ganhos'] or 0)
+                ajustes[solucao['user_id']] = ajustes.get(solucao['user_id'], 0) + delta
+
+                # ranking_mensal: no mês da avaliação original (data_avaliacao não muda)
+                avaliada_em = atual['data_avaliacao'] or datetime.now()
+                chave = (solucao['user_id'], avaliada_em.year, avaliada_em.month)
+                resolvida = (status_final == 'aprovada') - (atual['status'] == 'aprovada')
+                pontos_mes, resolvidas_mes = por_mes.get(chave, (0, 0))
+                por_mes[chave] = (pontos_mes + delta, resolvidas_mes + resolvida)
+
+            ignoradas = len(analisadas) - len(linhas)
+            if ignoradas:
+                print(f"🔁 Reavaliação {run_id}: {ignoradas} solução(ões) alterada(s) durante a análise, mantida(s)")
+
+        if linhas:
+            valores = " UNION ALL ".join(
+                ["SELECT %s AS id, %s AS analise, %s AS pontuacao, %s AS feedback, %s AS pontos, "
+                 "%s AS status, %s AS status_anterior, %s AS pontos_anteriores"]
+                * len(linhas)
+            )
+            # A nota da empresa (se houver) continua compondo a pontuação final;
+            # data_avaliacao fica a original (rankings por período e por mês contam por ela)
+            await cursor.execute(f"""
+                UPDATE solucoes s
+                INNER JOIN ({valores}) v
+                    ON v.id = s.id
+                   AND s.status = v.status_anterior
+                   AND s.pontos_ganhos <=> v.pontos_anteriores
+                SET s.analise_ai = v.analise,
+                    s.pontuacao_ai = v.pontuacao,
+                    s.feedback_ai = v.feedback,
+                    s.pontuacao_final = CASE
+                        WHEN s.pontuacao_empresa IS NULL THEN v.pontuacao
+                        ELSE (v.pontuacao + s.pontuacao_empresa) / 2
+                    END,
+                    s.pontos_ganhos = v.pontos,
+                    s.status = v.status,
+                    s.data_reavaliacao = NOW()
+            """, [valor for linha in linhas for valor in linha])
+            await ajustar_pontos(cursor, ajustes, por_mes, area=problema['area'])
+
+        await cursor.execute("""
+            UPDATE regrade_runs SET
+                ultimo_solucao_id = %s,
+                processadas = processadas + %s,
+                atualizadas = atualizadas + %s,
+                erros = erros + %s
+            WHERE id = %s
+        """, (ultimo_id, len(pagina), len(linhas), erros, run_id))
+
+        await cursor.execute(
+            "SELECT id, total, processadas, atualizadas, erros, ultimo_solucao_id FROM regrade_runs WHERE id = %s",
+            (run_id,)
+        )
+        progresso = await cursor.fetchone()
+
+    # A rotina periódica só reposiciona o mês corrente e o anterior
+    for ano, mes in sorted({(ano, mes) for (_, ano, mes), delta in por_mes.items() if any(delta)}):
+        await atualizar_posicoes(ano, mes)
+    return progresso
+
+
+async def _marcar_interrompida(run_id: int, status: str, erro: Optional[str]):
+    try:
+        async with AsyncDatabase.get_cursor() as cursor:
+            await cursor.execute(
+                "UPDATE regrade_runs SET status = %s, erro = %s WHERE id = %s",
+                (status, erro[:2000] if erro else None, run_id)
+            )
+    except Exception as e:
+        print(f"⚠️ Não foi possível registrar a interrupção da reavaliação {run_id}: {e}")
+
+
+# ==================== EM SEGUNDO PLANO (ADMIN) ====================
+
+async def iniciar_em_segundo_plano(run_id: int, concorrencia: Optional[int] = None) -> Dict[str, Any]:
+    """
+    Reserva a execução e a roda como task deste processo (endpoint admin)
+    Levanta RegradeError se ela já está concluída ou em andamento
+    """
+    from app.core.background import background_tasks
+
+    tarefa = _execucoes_locais.get(run_id)
+    if tarefa is not None and not tarefa.done():
+        raise RegradeError(f"Execução {run_id} já está rodando neste processo")
+
+    execucao = await _reservar_execucao(run_id)
+    tarefa = background_tasks.spawn(f"regrade-{run_id}", _executar(execucao, concorrencia, None, None))
+    _execucoes_locais[run_id] = tarefa
+    tarefa.add_done_callback(lambda _: _execucoes_locais.pop(run_id, None))
+    return await obter_execucao(run_id)
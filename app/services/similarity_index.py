@@ -0,0 +1,276 @@
+"""
+Índice de similaridade das soluções, por problema
+Detecta reenvios quase idênticos (reaproveita a análise sem chamar a IA) e
+soluções muito parecidas entre usuários diferentes (possível plágio)
+
+Cada solução vira um sketch MinHash (bottom-k) dos seus shingles de palavras.
+O índice de um problema é carregado do banco na primeira consulta e depois
+sincronizado por delta (solucoes.id > último id visto), então vale para
+soluções avaliadas por qualquer processo.
+"""
+import heapq
+import json
+import re
+import threading
+import unicodedata
+import zlib
+from collections import Counter, OrderedDict
+from typing import Any, Dict, FrozenSet, List, Optional, Set
+from starlette.concurrency import run_in_threadpool
+from app.core.async_database import AsyncDatabase
+from app.core.config import settings
+
+# Palavras por shingle e tamanho do sketch (erro da estimativa ~ 1/sqrt(K))
+TAMANHO_SHINGLE = 3
+K = 32
+
+# Sketches que compartilham menos valores que isso nem são comparados
+MINIMO_VALORES_EM_COMUM = K // 4
+
+# Campos da análise que descrevem a solução de origem e não são copiados
+_CAMPOS_NAO_REAPROVEITADOS = ('alerta_plagio', 'duplicata_de', 'similaridade')
+
+
+# ==================== SKETCHES ====================
+
+def normalizar_texto(texto: str) -> str:
+    """
+    Minúsculas, sem acentos, sem pontuação e com espaços colapsados:
+    diferenças de formatação não contam como diferença de conteúdo
+    """
+    texto = unicodedata.normalize('NFKD', texto or '')
+    texto = ''.join(c for c in texto if not unicodedata.combining(c)).lower()
+    return ' '.join(re.sub(r'[^\w\s]', ' ', texto).split())
+
+
+def calcular_sketch(texto: str) -> FrozenSet[int]:
+    """Os K menores hashes dos shingles do texto normalizado"""
+    palavras = normalizar_texto(texto).split()
+    if len(palavras) <= TAMANHO_SHINGLE:
+        shingles = {' '.join(palavras)}
+    else:
+        shingles = {
+            ' '.join(palavras[i:i + TAMANHO_SHINGLE])
+            for i in range(len(palavras) - TAMANHO_SHINGLE + 1)
+        }
+    hashes = {zlib.crc32(shingle.encode()) for shingle in shingles}
+    return frozenset(heapq.nsmallest(K, hashes))
+
+
+def similaridade(a: FrozenSet[int], b: FrozenSet[int]) -> float:
+    """Estimativa da similaridade de Jaccard entre dois textos pelos sketches"""
+    if not a or not b:
+        return 0.0
+    menores = heapq.nsmallest(K, a | b)
+    return sum(1 for h in menores if h in a and h in b) / len(menores)
+
+
+# ==================== ÍNDICE ====================
+
+class _IndiceProblema:
+    """Sketches das soluções de um problema, com índice invertido hash -> soluções"""
+
+    def __init__(self):
+        self.entradas: "OrderedDict[int, tuple]" = OrderedDict()  # solucao_id -> (user_id, sketch)
+        self.postings: Dict[int, Set[int]] = {}
+        self.ultimo_id = 0  # maior solucoes.id já sincronizado do banco
+
+    def adicionar(self, solucao_id: int, user_id: int, sketch: FrozenSet[int]):
+        self.remover(solucao_id)
+        self.entradas[solucao_id] = (user_id, sketch)
+        for h in sketch:
+            self.postings.setdefault(h, set()).add(solucao_id)
+
+    def remover(self, solucao_id: int):
+        entrada = self.entradas.pop(solucao_id, None)
+        if entrada is None:
+            return
+        for h in entrada[1]:
+            ids = self.postings.get(h)
+            if ids is not None:
+                ids.discard(solucao_id)
+                if not ids:
+                    del self.postings[h]
+
+    def remover_mais_antiga(self):
+        self.remover(next(iter(self.entradas)))
+
+    def buscar(self, sketch: FrozenSet[int], limiar: float, excluir_id: Optional[int]) -> List[Dict[str, Any]]:
+        em_comum = Counter(sid for h in sketch for sid in self.postings.get(h, ()))
+        encontradas = []
+        for solucao_id, qtd in em_comum.items():
+            if qtd < MINIMO_VALORES_EM_COMUM or solucao_id == excluir_id:
+                continue
+            user_id, outro = self.entradas[solucao_id]
+            valor = similaridade(sketch, outro)
+            if valor >= limiar:
+                encontradas.append({'solucao_id': solucao_id, 'user_id': user_id, 'similaridade': round(valor, 3)})
+        encontradas.sort(key=lambda item: (-item['similaridade'], item['solucao_id']))
+        return encontradas
+
+
+class SimilarityIndex:
+    """
+    Índices por problema deste processo, limitados em memória:
+    no máximo `max_por_problema` soluções (as mais recentes) por problema e
+    `max_entradas` no total (o problema consultado há mais tempo sai primeiro)
+    """
+
+    def __init__(self, max_por_problema: int = 2000, max_entradas: int = 20000):
+        self.max_por_problema = max_por_problema
+        self.max_entradas = max_entradas
+        self._problemas: "OrderedDict[int, _IndiceProblema]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = {'queries': 0, 'reused': 0, 'plagiarism_flags': 0, 'loaded_rows': 0, 'evicted_problems': 0}
+
+    # ==================== SINCRONIZAÇÃO ====================
+
+    async def _sincronizar(self, problema_id: int) -> _IndiceProblema:
+        """Carrega (ou completa) o índice do problema com as soluções novas do banco"""
+        with self._lock:
+            indice = self._problemas.get(problema_id)
+            if indice is None:
+                indice = self._problemas[problema_id] = _IndiceProblema()
+            self._problemas.move_to_end(problema_id)
+            ultimo_id = indice.ultimo_id
+
+        async with AsyncDatabase.get_cursor() as cursor:
+            await cursor.execute("""
+                SELECT id, user_id, descricao_solucao
+                FROM solucoes
+                WHERE problema_id = %s AND id > %s
+                ORDER BY id DESC
+                LIMIT %s
+            """, (problema_id, ultimo_id, self.max_por_problema))
+            novas = await cursor.fetchall()
+
+        if novas:
+            # Sketches de uma carga inteira: fora do event loop
+            sketches = await run_in_threadpool(
+                lambda: [calcular_sketch(s['descricao_solucao']) for s in novas]
+            )
+            with self._lock:
+                for solucao, sketch in zip(reversed(novas), reversed(sketches)):
+                    indice.adicionar(solucao['id'], solucao['user_id'], sketch)
+                indice.ultimo_id = max(indice.ultimo_id, novas[0]['id'])
+                self._stats['loaded_rows'] += len(novas)
+                self._limitar(problema_id)
+        return indice
+
+    def _limitar(self, problema_id: int):
+        indice = self._problemas[problema_id]
+        while len(indice.entradas) > self.max_por_problema:
+            indice.remover_mais_antiga()
+        while self._total() > self.max_entradas and len(self._problemas) > 1:
+            mais_antigo = next(iter(self._problemas))
+            if mais_antigo == problema_id:
+                break
+            del self._problemas[mais_antigo]
+            self._stats['evicted_problems'] += 1
+
+    def _total(self) -> int:
+        return sum(len(indice.entradas) for indice in self._problemas.values())
+
+    def descartar(self, problema_id: Optional[int] = None):
+        """Esquece o índice (de um problema ou todos): a próxima consulta reconstrói do banco"""
+        with self._lock:
+            if problema_id is None:
+                self._problemas.clear()
+            else:
+                self._problemas.pop(problema_id, None)
+
+    # ==================== CONSULTA ====================
+
+    async def buscar_similares(
+        self,
+        problema_id: int,
+        texto: str,
+        limiar: float,
+        excluir_id: Optional[int] = None
+    ) -> List[Dict[str, Any]]:
+        """Soluções do problema com similaridade >= limiar, da mais parecida para a menos"""
+        indice = await self._sincronizar(problema_id)
+        sketch = calcular_sketch(texto)
+        with self._lock:
+            self._stats['queries'] += 1
+            return indice.buscar(sketch, limiar, excluir_id)
+
+    async def verificar(self, solucao: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Verifica uma solução antes da análise da IA
+
+        Returns:
+            {
+                'analise': análise reaproveitada de um texto quase idêntico (ou None),
+                'plagio': solução mais parecida de outro usuário, enviada antes (ou None)
+            }
+        """
+        resultado = {'analise': None, 'plagio': None}
+        if not settings.SIMILARITY_ENABLED:
+            return resultado
+
+        similares = await self.buscar_similares(
+            solucao['problema_id'],
+            solucao['descricao_solucao'],
+            min(settings.SIMILARITY_REUSE_THRESHOLD, settings.SIMILARITY_PLAGIARISM_THRESHOLD),
+            excluir_id=solucao['id']
+        )
+        if not similares:
+            return resultado
+
+        for similar in similares:
+            if (similar['user_id'] != solucao['user_id']
+                    and similar['solucao_id'] < solucao['id']
+                    and similar['similaridade'] >= settings.SIMILARITY_PLAGIARISM_THRESHOLD):
+                resultado['plagio'] = similar
+                self._stats['plagiarism_flags'] += 1
+                break
+
+        reaproveitaveis = [s for s in similares if s['similaridade'] >= settings.SIMILARITY_REUSE_THRESHOLD]
+        if reaproveitaveis:
+            resultado['analise'] = await self._analise_de(reaproveitaveis)
+        return resultado
+
+    async def _analise_de(self, similares: List[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+        """Análise da IA da solução mais parecida que já foi avaliada"""
+        ids = [s['solucao_id'] for s in similares]
+        async with AsyncDatabase.get_cursor() as cursor:
+            await cursor.execute(f"""
+                SELECT id, analise_ai FROM solucoes
+                WHERE id IN ({', '.join(['%s'] * len(ids))}) AND analise_ai IS NOT NULL
+            """, ids)
+            analises = {row['id']: row['analise_ai'] for row in await cursor.fetchall()}
+
+        for similar in similares:
+            bruta = analises.get(similar['solucao_id'])
+            if bruta is None:
+                continue
+            analise = json.loads(bruta) if isinstance(bruta, (str, bytes)) else dict(bruta)
+            if analise.get('erro'):
+                continue
+            for campo in _CAMPOS_NAO_REAPROVEITADOS:
+                analise.pop(campo, None)
+            analise.update({
+                'from_cache': True,
+                'duplicata_de': similar['solucao_id'],
+                'similaridade': similar['similaridade']
+            })
+            self._stats['reused'] += 1
+            return analise
+        return None
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                'enabled': settings.SIMILARITY_ENABLED,
+                'problems': len(self._problemas),
+                'entries': self._total(),
+                'max_entries': self.max_entradas,
+                **self._stats
+            }
+
+
+similarity_index = SimilarityIndex(
+    max_por_problema=settings.SIMILARITY_MAX_PER_PROBLEM,
+    max_entradas=settings.SIMILARITY_MAX_ENTRIES
+)
@@ -0,0 +1,74 @@
+"""
+Respostas JSON em streaming
+Para listagens/exportações sem LIMIT pequeno: as linhas saem do banco em lotes
+e são enviadas ao cliente conforme chegam, sem montar a lista inteira em memória
+"""
+import json
+from typing import Any, Iterator, Optional
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import StreamingResponse
+from app.core.config import settings
+from app.core.database import Database
+from app.core.replicas import Identity
+
+
+def _iter_json_array(
+    query: str,
+    params: Any,
+    read: bool,
+    identity: Optional[Identity],
+    batch_size: int
+) -> Iterator[bytes]:
+    """Gera um array JSON, um lote de linhas por chunk"""
+    if read:
+        contexto = Database.get_read_cursor(identity=identity, stream=True)
+    else:
+        contexto = Database.get_cursor(stream=True)
+
+    with contexto as cursor:
+        cursor.execute(query, params)
+        yield b"["
+
+        primeiro = True
+        while True:
+            rows = cursor.fetchmany(batch_size)
+            if not rows:
+                break
+            chunk = ",".join(
+                json.dumps(jsonable_encoder(row), ensure_ascii=False) for row in rows
+            )
+            yield (chunk if primeiro else "," + chunk).encode("utf-8")
+            primeiro = False
+
+        yield b"]"
+
+
+def stream_json_rows(
+    query: str,
+    params: Any = None,
+    read: bool = False,
+    identity: Optional[Identity] = None,
+    batch_size: Optional[int] = None
+) -> StreamingResponse:
+    """
+    Executa a query num cursor de streaming e devolve as linhas como array JSON
+
+    O cursor é aberto aqui (e não via Depends(get_db)) porque a dependency é
+    encerrada antes do corpo da resposta ser enviado.
+    A query é executada antes de retornar: erros de SQL viram 500 normalmente.
+
+    Usage:
+        @router.get("/exportar")
+        def exportar(current_user = Depends(get_current_user)):
+            return stream_json_rows("SELECT ... WHERE user_id = %s", (current_user['id'],))
+    """
+    gerador = _iter_json_array(
+        query, params, read, identity, batch_size or settings.DB_STREAM_BATCH_SIZE
+    )
+    inicio = next(gerador)  # executa a query e pega a abertura do array
+
+    def corpo() -> Iterator[bytes]:
+        yield inicio
+        yield from gerador
+
+    return StreamingResponse(corpo(), media_type="application/json")
@@ -81,7 +81,8 @@ CREATE TABLE `empresas` (
   PRIMARY KEY (`id`),
   UNIQUE KEY `nif` (`nif`),
   KEY `idx_email` (`email`),
-  KEY `idx_setor` (`setor_atuacao`)
+  KEY `idx_setor` (`setor_atuacao`),
+  KEY `idx_token_verificacao` (`token_verificacao`(64))
 ) ENGINE=InnoDB AUTO_INCREMENT=7 DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
 /*!40101 SET character_set_client = @saved_cs_client */;
 
@@ -354,6 +355,43 @@ LOCK TABLES `recomendacoes` WRITE;
 /*!40000 ALTER TABLE `recomendacoes` ENABLE KEYS */;
 UNLOCK TABLES;
 
+--
+-- Table structure for table `regrade_runs`
+--
+
+DROP TABLE IF EXISTS `regrade_runs`;
+/*!40101 SET @saved_cs_client     = @@character_set_client */;
+/*!50503 SET character_set_client = utf8mb4 */;
+CREATE TABLE `regrade_runs` (
+  `id` int NOT NULL AUTO_INCREMENT,
+  `problema_id` int NOT NULL,
+  `status` enum('executando','pausado','concluido','falhou') COLLATE utf8mb4_unicode_ci NOT NULL DEFAULT 'pausado',
+  `total` int NOT NULL DEFAULT '0',
+  `processadas` int NOT NULL DEFAULT '0',
+  `atualizadas` int NOT NULL DEFAULT '0',
+  `erros` int NOT NULL DEFAULT '0',
+  `ultimo_solucao_id` int NOT NULL DEFAULT '0',
+  `iniciado_por` varchar(100) COLLATE utf8mb4_unicode_ci DEFAULT NULL,
+  `executor` varchar(100) COLLATE utf8mb4_unicode_ci DEFAULT NULL,
+  `erro` text COLLATE utf8mb4_unicode_ci,
+  `created_at` timestamp NULL DEFAULT CURRENT_TIMESTAMP,
+  `updated_at` timestamp NULL DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+  `concluido_em` timestamp NULL DEFAULT NULL,
+  PRIMARY KEY (`id`),
+  KEY `idx_problema` (`problema_id`),
+  CONSTRAINT `regrade_runs_ibfk_1` FOREIGN KEY (`problema_id`) REFERENCES `problemas` (`id`) ON DELETE CASCADE
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
+/*!40101 SET character_set_client = @saved_cs_client */;
+
+--
+-- Dumping data for table `regrade_runs`
+--
+
+LOCK TABLES `regrade_runs` WRITE;
+/*!40000 ALTER TABLE `regrade_runs` DISABLE KEYS */;
+/*!40000 ALTER TABLE `regrade_runs` ENABLE KEYS */;
+UNLOCK TABLES;
+
 --
 -- Table structure for table `solucoes`
 --
@@ -382,6 +420,7 @@ CREATE TABLE `solucoes` (
   `certificado_url` varchar(255) COLLATE utf8mb4_unicode_ci DEFAULT NULL,
   `data_submissao` timestamp NULL DEFAULT CURRENT_TIMESTAMP,
   `data_avaliacao` timestamp NULL DEFAULT NULL,
+  `data_reavaliacao` timestamp NULL DEFAULT NULL,
   `updated_at` timestamp NULL DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
   PRIMARY KEY (`id`),
   UNIQUE KEY `unique_user_problema` (`user_id`,`problema_id`),
@@ -389,6 +428,8 @@ CREATE TABLE `solucoes` (
   KEY `idx_user` (`user_id`),
   KEY `idx_status` (`status`),
   KEY `idx_pontuacao` (`pontuacao_final`),
+  KEY `idx_status_avaliacao` (`status`,`data_avaliacao`),
+  KEY `idx_updated_at` (`updated_at`),
   CONSTRAINT `solucoes_ibfk_1` FOREIGN KEY (`problema_id`) REFERENCES `problemas` (`id`) ON DELETE CASCADE,
   CONSTRAINT `solucoes_ibfk_2` FOREIGN KEY (`user_id`) REFERENCES `users` (`id`) ON DELETE CASCADE
 ) ENGINE=InnoDB AUTO_INCREMENT=6 DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
@@ -404,6 +445,70 @@ INSERT INTO `solucoes` VALUES (1,1,6,'\n            Desenvolvi um sistema de rec
 /*!40000 ALTER TABLE `solucoes` ENABLE KEYS */;
 UNLOCK TABLES;
 
+--
+-- Table structure for table `solucoes_jobs`
+--
+
+DROP TABLE IF EXISTS `solucoes_jobs`;
+/*!40101 SET @saved_cs_client     = @@character_set_client */;
+/*!50503 SET character_set_client = utf8mb4 */;
+CREATE TABLE `solucoes_jobs` (
+  `id` int NOT NULL AUTO_INCREMENT,
+  `solucao_id` int NOT NULL,
+  `status` enum('pendente','processando','concluido','falhou') COLLATE utf8mb4_unicode_ci NOT NULL DEFAULT 'pendente',
+  `tentativas` int NOT NULL DEFAULT '0',
+  `proxima_tentativa_em` timestamp NOT NULL DEFAULT CURRENT_TIMESTAMP,
+  `bloqueado_por` varchar(100) COLLATE utf8mb4_unicode_ci DEFAULT NULL,
+  `ultimo_erro` text COLLATE utf8mb4_unicode_ci,
+  `created_at` timestamp NULL DEFAULT CURRENT_TIMESTAMP,
+  `updated_at` timestamp NULL DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+  PRIMARY KEY (`id`),
+  UNIQUE KEY `unique_solucao` (`solucao_id`),
+  KEY `idx_fila` (`status`,`proxima_tentativa_em`),
+  CONSTRAINT `solucoes_jobs_ibfk_1` FOREIGN KEY (`solucao_id`) REFERENCES `solucoes` (`id`) ON DELETE CASCADE
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
+/*!40101 SET character_set_client = @saved_cs_client */;
+
+--
+-- Dumping data for table `solucoes_jobs`
+--
+
+LOCK TABLES `solucoes_jobs` WRITE;
+/*!40000 ALTER TABLE `solucoes_jobs` DISABLE KEYS */;
+/*!40000 ALTER TABLE `solucoes_jobs` ENABLE KEYS */;
+UNLOCK TABLES;
+
+--
+-- Table structure for table `user_area_pontos`
+--
+
+DROP TABLE IF EXISTS `user_area_pontos`;
+/*!40101 SET @saved_cs_client     = @@character_set_client */;
+/*!50503 SET character_set_client = utf8mb4 */;
+CREATE TABLE `user_area_pontos` (
+  `user_id` int NOT NULL,
+  `area` varchar(100) COLLATE utf8mb4_unicode_ci NOT NULL,
+  `pontos` int NOT NULL DEFAULT '0',
+  `solucoes` int NOT NULL DEFAULT '0',
+  `soma_pontuacao` decimal(12,2) NOT NULL DEFAULT '0.00',
+  `com_pontuacao` int NOT NULL DEFAULT '0',
+  `updated_at` timestamp NULL DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+  PRIMARY KEY (`user_id`,`area`),
+  KEY `idx_area_pontos` (`area`,`pontos` DESC,`user_id`),
+  KEY `idx_updated_at` (`updated_at`),
+  CONSTRAINT `user_area_pontos_ibfk_1` FOREIGN KEY (`user_id`) REFERENCES `users` (`id`) ON DELETE CASCADE
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
+/*!40101 SET character_set_client = @saved_cs_client */;
+
+--
+-- Dumping data for table `user_area_pontos`
+--
+
+LOCK TABLES `user_area_pontos` WRITE;
+/*!40000 ALTER TABLE `user_area_pontos` DISABLE KEYS */;
+/*!40000 ALTER TABLE `user_area_pontos` ENABLE KEYS */;
+UNLOCK TABLES;
+
 --
 -- Table structure for table `user_habilidades`
 --
@@ -467,6 +572,8 @@ CREATE TABLE `users` (
   KEY `idx_pontos` (`pontos_totais`),
   KEY `idx_nivel` (`nivel_atual`),
   KEY `idx_username` (`username`),
+  KEY `idx_token_verificacao` (`token_verificacao`(64)),
+  KEY `idx_updated_at` (`updated_at`),
   FULLTEXT KEY `idx_fulltext_users` (`nome`,`palavras_chave`)
 ) ENGINE=InnoDB AUTO_INCREMENT=11 DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
 /*!40101 SET character_set_client = @saved_cs_client */;
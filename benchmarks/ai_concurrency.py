@@ -0,0 +1,83 @@
+"""
+Benchmark: N análises de IA simultâneas contra o provider fake
+
+Critério de aceitação: com chamadas realmente assíncronas, N submissões
+terminam em ~1 latência do provider (limitado por AI_PROVIDER_MAX_CONCURRENCY),
+e não em N × latência como acontecia com os SDKs síncronos.
+
+A variante "bloqueante" reproduz o comportamento antigo (time.sleep dentro de
+async def) para comparação.
+
+Uso:
+    python -m benchmarks.ai_concurrency --n 8 --latencia 1.0
+"""
+import argparse
+import asyncio
+import time
+from app.core.config import settings
+from app.services.ai_providers.fake_provider import FakeProvider
+
+PROBLEMA = {
+    'id': 1,
+    'titulo': 'Benchmark',
+    'descricao': 'Problema de benchmark',
+    'area': 'Tecnologia',
+    'nivel_dificuldade': 'intermediario',
+    'contexto_empresa': '',
+    'objetivos': '',
+    'requisitos': ''
+}
+
+
+class BlockingFakeProvider(FakeProvider):
+    """Como os providers antigos: chamada síncrona dentro de async def"""
+
+    async def analisar(self, prompt):
+        inicio = time.time()
+        time.sleep(self.latency_seconds)
+        return self.montar_resposta(inicio)
+
+
+async def rodar(provider, n: int) -> float:
+    from app.services import ai_service
+
+    service = ai_service.get_ai_service()
+    service.providers['fake'] = provider
+
+    inicio = time.perf_counter()
+    resultados = await asyncio.gather(*(
+        ai_service.analisar_solucao(PROBLEMA, f"Solução {i} " * 20, use_cache=False)
+        for i in range(n)
+    ))
+    duracao = time.perf_counter() - inicio
+
+    providers = {r['provider'] for r in resultados}
+    print(f"   providers usados: {providers}")
+    return duracao
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--n", type=int, default=8)
+    parser.add_argument("--latencia", type=float, default=1.0)
+    args = parser.parse_args()
+
+    settings.AI_PROVIDER = "fake"
+    settings.AI_FALLBACK_PROVIDER = ""
+    limites = {
+        'max_concurrency': settings.AI_PROVIDER_MAX_CONCURRENCY,
+        'timeout_seconds': max(settings.AI_TIMEOUT_SECONDS, args.n * args.latencia + 5)
+    }
+
+    print(f"🧪 {args.n} análises simultâneas, latência do provider {args.latencia}s, "
+          f"limite {limites['max_concurrency']} por provider")
+
+    duracao = await rodar(BlockingFakeProvider(latency_seconds=args.latencia, **limites), args.n)
+    print(f"📊 bloqueante (antes): {duracao:.2f}s (~{duracao / args.latencia:.1f} latências)")
+
+    duracao = await rodar(FakeProvider(latency_seconds=args.latencia, **limites), args.n)
+    print(f"📊 assíncrono (depois): {duracao:.2f}s (~{duracao / args.latencia:.1f} latências)")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
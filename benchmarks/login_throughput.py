@@ -0,0 +1,109 @@
+"""
+Benchmark: login com argon2 inline vs. pool de hashing
+
+Simula uma rajada de logins concorrentes e, ao mesmo tempo, mede a latência de
+uma rota leve (/ping) no mesmo worker — é ela que sofre quando o argon2 roda
+dentro do event loop.
+
+Não usa banco: só o custo do verify_password com os parâmetros de ARGON2_* do .env.
+
+Uso:
+    python -m benchmarks.login_throughput --logins 200 --concurrency 50
+"""
+import argparse
+import asyncio
+import statistics
+import time
+import httpx
+from fastapi import FastAPI, HTTPException
+from app.core.security import hash_password, verify_password, verify_password_async, password_hasher
+
+SENHA = "senha-de-benchmark-123"
+
+
+def criar_app(hash_senha: str) -> FastAPI:
+    app = FastAPI()
+
+    @app.post("/login/inline")
+    async def login_inline():
+        # Comportamento antigo: argon2 bloqueia o event loop
+        if not verify_password(SENHA, hash_senha):
+            raise HTTPException(status_code=401)
+        return {"ok": True}
+
+    @app.post("/login/pool")
+    async def login_pool():
+        if not await verify_password_async(SENHA, hash_senha):
+            raise HTTPException(status_code=401)
+        return {"ok": True}
+
+    @app.get("/ping")
+    async def ping():
+        return {"ok": True}
+
+    return app
+
+
+def percentil(valores, p):
+    if not valores:
+        return 0.0
+    ordenados = sorted(valores)
+    return ordenados[min(len(ordenados) - 1, int(p / 100 * len(ordenados)))]
+
+
+async def rodar(app: FastAPI, rota: str, logins: int, concurrency: int):
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        semaforo = asyncio.Semaphore(concurrency)
+        status_codes = {}
+        ping_ms = []
+        terminou = asyncio.Event()
+
+        async def um_login():
+            async with semaforo:
+                r = await client.post(rota)
+                status_codes[r.status_code] = status_codes.get(r.status_code, 0) + 1
+
+        async def pinger():
+            while not terminou.is_set():
+                inicio = time.perf_counter()
+                await client.get("/ping")
+                ping_ms.append((time.perf_counter() - inicio) * 1000)
+                await asyncio.sleep(0.01)
+
+        tarefa_ping = asyncio.create_task(pinger())
+        inicio = time.perf_counter()
+        await asyncio.gather(*(um_login() for _ in range(logins)))
+        duracao = time.perf_counter() - inicio
+        terminou.set()
+        await tarefa_ping
+
+    return {
+        "rota": rota,
+        "logins_por_segundo": round(logins / duracao, 1),
+        "duracao_s": round(duracao, 2),
+        "status": status_codes,
+        "ping_p50_ms": round(statistics.median(ping_ms), 1) if ping_ms else None,
+        "ping_p99_ms": round(percentil(ping_ms, 99), 1),
+        "ping_amostras": len(ping_ms),
+    }
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--logins", type=int, default=100)
+    parser.add_argument("--concurrency", type=int, default=20)
+    args = parser.parse_args()
+
+    app = criar_app(hash_password(SENHA))
+    print(f"🔐 Pool de hashing: {password_hasher.workers} workers, fila de {password_hasher.max_queue}")
+
+    for rota in ("/login/inline", "/login/pool"):
+        resultado = await rodar(app, rota, args.logins, args.concurrency)
+        print(f"📊 {resultado}")
+
+    password_hasher.shutdown()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
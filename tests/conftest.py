@@ -0,0 +1,37 @@
+"""
+Configuração mínima para importar app.core.config sem .env
+(os testes não abrem conexão com o banco) e fixtures compartilhadas
+"""
+import os
+
+import pytest
+
+for _variavel, _valor in {
+    'DB_HOST': 'localhost',
+    'DB_USER': 'teste',
+    'DB_PASSWORD': 'teste',
+    'DB_NAME': 'teste',
+    'SECRET_KEY': 'chave-de-teste',
+}.items():
+    os.environ.setdefault(_variavel, _valor)
+
+
+class _Relogio:
+    """Relógio controlado: `sleep` avança o tempo em vez de dormir"""
+
+    def __init__(self):
+        self.agora = 1000.0
+        self.esperas = []
+
+    def monotonic(self) -> float:
+        return self.agora
+
+    async def sleep(self, segundos: float):
+        self.esperas.append(segundos)
+        self.agora += segundos
+
+
+@pytest.fixture
+def relogio():
+    """Cada módulo de teste troca o `time` do módulo testado por este relógio"""
+    return _Relogio()
@@ -0,0 +1,117 @@
+"""
+Testes das transições de estado do CircuitBreaker (relógio controlado)
+"""
+import pytest
+
+from app.services.ai_providers import circuit_breaker
+from app.services.ai_providers.circuit_breaker import CLOSED, HALF_OPEN, OPEN, CircuitBreaker
+
+
+@pytest.fixture(autouse=True)
+def _tempo(monkeypatch, relogio):
+    monkeypatch.setattr(circuit_breaker, 'time', relogio)
+
+
+def _breaker(**kwargs) -> CircuitBreaker:
+    opcoes = dict(window_seconds=60, min_calls=4, error_rate_threshold=0.5, cooldown_seconds=30)
+    opcoes.update(kwargs)
+    return CircuitBreaker('teste', **opcoes)
+
+
+def _abrir(breaker: CircuitBreaker):
+    for _ in range(breaker.min_calls):
+        assert breaker.allow_request()
+        breaker.record_failure(1.0)
+    assert breaker.state == OPEN
+
+
+def test_so_abre_com_min_calls_e_taxa_de_erro(relogio):
+    breaker = _breaker()
+
+    for _ in range(3):
+        breaker.record_failure(1.0)
+    assert breaker.state == CLOSED  # 3 chamadas < min_calls
+
+    breaker.record_success(0.1)
+    breaker.record_success(0.1)
+    breaker.record_success(0.1)
+    assert breaker.state == CLOSED  # 3/6 = 0.5, mas a última foi sucesso
+
+    breaker.record_failure(1.0)
+    assert breaker.state == OPEN  # 4/7 >= 0.5
+
+
+def test_erros_fora_da_janela_nao_contam(relogio):
+    breaker = _breaker()
+    for _ in range(3):
+        breaker.record_failure(1.0)
+
+    relogio.agora += 61
+    breaker.record_failure(1.0)
+
+    assert breaker.state == CLOSED
+
+
+def test_aberto_rejeita_ate_o_cooldown(relogio):
+    breaker = _breaker()
+    _abrir(breaker)
+
+    assert breaker.allow_request() is False
+    relogio.agora += 29
+    assert breaker.state == OPEN
+    assert breaker.snapshot()['retry_in_seconds'] == 1.0
+
+    relogio.agora += 1
+    assert breaker.state == HALF_OPEN
+    assert breaker.can_probe()
+
+
+def test_half_open_libera_um_probe_so(relogio):
+    breaker = _breaker()
+    _abrir(breaker)
+    relogio.agora += 30
+
+    assert breaker.allow_request() is True
+    assert breaker.can_probe() is False
+    assert breaker.allow_request() is False
+
+    breaker.record_success(0.2)
+
+    assert breaker.state == CLOSED
+    assert breaker.snapshot()['window_calls'] == 0  # janela recomeça
+
+
+def test_probe_com_falha_reabre(relogio):
+    breaker = _breaker()
+    _abrir(breaker)
+    relogio.agora += 30
+
+    assert breaker.allow_request()
+    breaker.record_failure(1.0)
+
+    assert breaker.state == OPEN
+    assert breaker.snapshot()['opened'] == 2
+
+
+def test_probe_cancelado_libera_a_vaga(relogio):
+    breaker = _breaker()
+    _abrir(breaker)
+    relogio.agora += 30
+
+    assert breaker.allow_request()
+    breaker.cancel_request()
+
+    assert breaker.state == HALF_OPEN
+    assert breaker.allow_request()
+
+
+def test_health_score_e_percentis(relogio):
+    breaker = _breaker(slow_call_seconds=2)
+    for latencia in (0.1, 0.2, 3.0):
+        breaker.record_success(latencia)
+    breaker.record_failure(5.0)
+
+    # 1 erro + meio erro pela chamada lenta, em 4 chamadas
+    assert breaker.health_score() == pytest.approx(1.5 / 4)
+    assert breaker.latency_percentile(50) == 0.2
+    assert breaker.latency_percentile(95) == 3.0
@@ -0,0 +1,56 @@
+"""
+Testes das versões do IdentityCache (put de um SELECT anterior à invalidação)
+"""
+from app.core.identity_cache import IdentityCache
+
+_ATIVO = {'id': 1, 'nome': 'Ana', 'email': 'ana@x.ao', 'email_verificado': True, 'ativo': True}
+
+
+def test_put_com_versao_antiga_e_ignorado():
+    cache = IdentityCache(ttl_seconds=60)
+    identidade, versao = cache.get(('user', 1))
+    assert identidade is None
+
+    cache.invalidate('user', 1)  # conta desativada durante o SELECT
+    cache.put(('user', 1), _ATIVO, versao)
+
+    assert cache.get(('user', 1))[0] is None
+
+
+def test_poda_mantem_versao_com_leitura_em_andamento():
+    cache = IdentityCache(ttl_seconds=60, max_entries=2)
+    _, versao = cache.get(('user', 1))
+
+    cache.invalidate('user', 1)
+    for outro in range(2, 10):  # passa de max_entries: as versões são podadas
+        cache.invalidate('user', outro)
+    cache.put(('user', 1), _ATIVO, versao)
+
+    assert cache.get(('user', 1))[0] is None
+
+
+def test_leitura_encerrada_libera_a_versao():
+    cache = IdentityCache(ttl_seconds=60, max_entries=2)
+    _, versao = cache.get(('user', 1))
+    cache.put(('user', 1), None, versao)  # conta inexistente: nada guardado
+
+    for outro in range(1, 10):
+        cache.invalidate('user', outro)
+
+    assert cache._leituras == {}
+    assert cache._versions == {}
+
+    _, versao = cache.get(('user', 1))
+    cache.put(('user', 1), _ATIVO, versao)
+    assert cache.get(('user', 1))[0] == _ATIVO
+
+
+def test_clear_preserva_versao_com_leitura_em_andamento():
+    cache = IdentityCache(ttl_seconds=60)
+    _, versao = cache.get(('user', 1))
+
+    cache.invalidate('user', 1)
+    cache.clear()
+    cache.put(('user', 1), _ATIVO, versao)
+
+    assert cache.get(('user', 1))[0] is None
@@ -0,0 +1,118 @@
+"""
+Testes do TokenBucket e do ProviderRateLimiter (relógio controlado; a espera
+do acquire avança o relógio em vez de dormir)
+"""
+import asyncio
+import math
+
+import pytest
+
+from app.services.ai_providers import rate_limiter
+from app.services.ai_providers.rate_limiter import ProviderRateLimiter, TokenBucket
+
+
+@pytest.fixture(autouse=True)
+def _tempo(monkeypatch, relogio):
+    monkeypatch.setattr(rate_limiter, 'time', relogio)
+    monkeypatch.setattr(rate_limiter.asyncio, 'sleep', relogio.sleep)
+
+
+def test_bucket_reabastece_ate_a_capacidade(relogio):
+    bucket = TokenBucket('rpm', capacity=10, refill_per_second=2)
+
+    bucket.take(10)
+    assert bucket.available() == 0
+
+    relogio.agora += 1.5
+    assert bucket.available() == pytest.approx(3)
+
+    relogio.agora += 100
+    assert bucket.available() == 10
+
+
+def test_bucket_wait_time(relogio):
+    bucket = TokenBucket('rpm', capacity=10, refill_per_second=2)
+
+    assert bucket.wait_time(4) == 0
+    bucket.take(10)
+    assert bucket.wait_time(4) == pytest.approx(2)
+    assert math.isinf(bucket.wait_time(11))
+
+
+def test_bucket_drain_e_give_back(relogio):
+    bucket = TokenBucket('rpm', capacity=10, refill_per_second=1)
+
+    bucket.take(3)
+    bucket.drain()
+    assert bucket.available() == 0
+
+    bucket.give_back(4)
+    assert bucket.available() == 4
+    bucket.give_back(100)
+    assert bucket.available() == 10
+
+
+def test_acquire_consome_todos_os_baldes(relogio):
+    limiter = ProviderRateLimiter('teste', requests_per_minute=60, tokens_per_minute=600)
+
+    assert asyncio.run(limiter.acquire(tokens=100))
+
+    restante = limiter.snapshot()['remaining']
+    assert restante == {'requests_per_minute': 59, 'tokens_per_minute': 500}
+
+
+def test_acquire_espera_dentro_do_limite(relogio):
+    limiter = ProviderRateLimiter('teste', requests_per_minute=60)  # 1 req/s
+    for _ in range(60):
+        assert asyncio.run(limiter.acquire(tokens=0))
+
+    assert asyncio.run(limiter.acquire(tokens=0, max_wait=2.0))
+
+    assert relogio.esperas == [pytest.approx(1.0)]
+    assert limiter.snapshot()['waited'] == 1
+
+
+def test_acquire_rejeita_sem_consumir(relogio):
+    limiter = ProviderRateLimiter('teste', requests_per_minute=60, tokens_per_minute=600)
+    asyncio.run(limiter.acquire(tokens=600))
+
+    assert asyncio.run(limiter.acquire(tokens=300, max_wait=1.0)) is False
+
+    snapshot = limiter.snapshot()
+    assert snapshot['rejected'] == 1
+    assert snapshot['remaining']['requests_per_minute'] == 59
+    assert relogio.esperas == []
+
+
+def test_prompt_maior_que_o_balde_cobra_o_balde_cheio(relogio):
+    limiter = ProviderRateLimiter('teste', tokens_per_minute=100)
+
+    assert limiter.wait_time(tokens=500) == 0
+    assert asyncio.run(limiter.acquire(tokens=500))
+    assert limiter.snapshot()['remaining']['tokens_per_minute'] == 0
+
+
+def test_refund_e_drain(relogio):
+    limiter = ProviderRateLimiter('teste', requests_per_minute=60, tokens_per_minute=600)
+    asyncio.run(limiter.acquire(tokens=100))
+
+    limiter.refund(tokens=100)
+    assert limiter.snapshot()['remaining'] == {'requests_per_minute': 60, 'tokens_per_minute': 600}
+
+    limiter.drain()
+    assert limiter.snapshot()['remaining'] == {'requests_per_minute': 0, 'tokens_per_minute': 0}
+    assert limiter.wait_time(tokens=60) == pytest.approx(6)
+
+
+def test_drain_preserva_o_balde_diario(relogio):
+    limiter = ProviderRateLimiter('teste', requests_per_minute=60, requests_per_day=1000, tokens_per_minute=600)
+    asyncio.run(limiter.acquire(tokens=100))
+
+    limiter.drain()  # throttle por minuto
+
+    restante = limiter.snapshot()['remaining']
+    assert restante == {'requests_per_minute': 0, 'requests_per_day': 999, 'tokens_per_minute': 0}
+    assert limiter.wait_time(tokens=0) == pytest.approx(1)
+
+    limiter.drain(diario=True)  # a resposta diz que a cota do dia acabou
+    assert limiter.snapshot()['remaining']['requests_per_day'] == 0
@@ -0,0 +1,111 @@
+"""
+Testes do roteamento de leituras (ReplicaRouter + Database._acquire_read)
+com pools falsos e relógio controlado
+"""
+import pytest
+from mysql.connector import Error
+
+from app.core import replicas
+from app.core.database import Database
+from app.core.replicas import ReplicaRouter
+
+
+class _PoolFalso:
+    def __init__(self, name: str, falha: bool = False):
+        self.name = name
+        self.falha = falha
+        self.acquires = 0
+
+    def acquire(self):
+        self.acquires += 1
+        if self.falha:
+            raise Error(msg=f"{self.name} fora do ar")
+        return f"conexao-{self.name}"
+
+    def stats(self):
+        return {'acquires': self.acquires}
+
+    def close(self):
+        pass
+
+
+@pytest.fixture(autouse=True)
+def _tempo(monkeypatch, relogio):
+    monkeypatch.setattr(replicas, 'time', relogio)
+
+
+@pytest.fixture
+def roteador(monkeypatch, relogio):
+    """Database com primário e duas réplicas falsos"""
+    primario = _PoolFalso('primario')
+    r1, r2 = _PoolFalso('r1'), _PoolFalso('r2')
+    router = ReplicaRouter([r1, r2], read_your_writes_seconds=5, retry_seconds=30)
+    monkeypatch.setattr(Database, '_pool', primario)
+    monkeypatch.setattr(Database, '_replicas', router)
+    return router, primario, r1, r2
+
+
+def test_round_robin_entre_replicas(roteador):
+    router, primario, r1, r2 = roteador
+
+    usados = [Database._acquire_read()[0].name for _ in range(4)]
+
+    assert usados == ['r1', 'r2', 'r1', 'r2']
+    assert primario.acquires == 0
+    assert router.stats()['replica_reads'] == 4
+
+
+def test_replica_com_falha_fica_fora_pela_janela(roteador, relogio):
+    router, primario, r1, r2 = roteador
+    r1.falha = True
+
+    assert Database._acquire_read()[0] is r2
+    assert router.stats()['replicas']['r1']['healthy'] is False
+
+    # Dentro da janela de retry a réplica nem é tentada
+    r1.falha = False
+    tentativas = r1.acquires
+    for _ in range(3):
+        assert Database._acquire_read()[0] is r2
+    assert r1.acquires == tentativas
+
+    # Vencida a janela, volta à rotação
+    relogio.agora += 31
+    usados = {Database._acquire_read()[0].name for _ in range(2)}
+    assert usados == {'r1', 'r2'}
+
+
+def test_sem_replica_saudavel_le_do_primario(roteador):
+    router, primario, r1, r2 = roteador
+    r1.falha = r2.falha = True
+
+    pool, conexao = Database._acquire_read()
+
+    assert pool is primario
+    assert conexao == 'conexao-primario'
+    assert router.stats()['primary_reads_fallback'] == 1
+    assert router.stats()['replica_failures'] == 2
+
+
+def test_read_your_writes(roteador, relogio):
+    router, primario, r1, r2 = roteador
+    autor, outro = ('user', '1'), ('user', '2')
+
+    router.note_write(autor)
+
+    assert Database._acquire_read(autor)[0] is primario
+    assert Database._acquire_read(outro)[0] in (r1, r2)
+    assert router.stats()['primary_reads_read_your_writes'] == 1
+
+    relogio.agora += 5
+    assert Database._acquire_read(autor)[0] in (r1, r2)
+
+
+def test_anonimo_e_sem_replicas(relogio):
+    router = ReplicaRouter([], read_your_writes_seconds=5)
+
+    router.note_write(('user', '1'))
+
+    assert router.must_read_primary(None) is False
+    assert router.must_read_primary(('user', '1')) is False
+    assert router.candidates(('user', '1')) == []
@@ -0,0 +1,158 @@
+"""
+Testes do índice de similaridade: sketches e a decisão de reaproveitar a
+análise ou marcar plágio (banco substituído por uma lista em memória)
+"""
+import asyncio
+import contextlib
+import json
+import random
+
+import pytest
+
+from app.core.config import settings
+from app.services import similarity_index as modulo
+from app.services.similarity_index import SimilarityIndex, calcular_sketch, normalizar_texto, similaridade
+
+_VOCABULARIO = [f"palavra{i}" for i in range(400)]
+
+
+def _texto(seed: int, palavras: int = 120) -> str:
+    rnd = random.Random(seed)
+    return ' '.join(rnd.choice(_VOCABULARIO) for _ in range(palavras))
+
+
+class _CursorFalso:
+    def __init__(self, solucoes):
+        self._solucoes = solucoes
+        self._resultado = []
+
+    async def execute(self, query, params=None):
+        if 'descricao_solucao' in query:
+            problema_id, ultimo_id, limite = params
+            linhas = [s for s in self._solucoes if s['problema_id'] == problema_id and s['id'] > ultimo_id]
+            self._resultado = sorted(linhas, key=lambda s: -s['id'])[:limite]
+        else:
+            self._resultado = [
+                {'id': s['id'], 'analise_ai': s['analise_ai']}
+                for s in self._solucoes if s['id'] in params and s.get('analise_ai') is not None
+            ]
+
+    async def fetchall(self):
+        return self._resultado
+
+
+@pytest.fixture
+def banco(monkeypatch):
+    """Soluções 'gravadas'; o índice lê daqui em vez do MySQL"""
+    solucoes = []
+
+    @contextlib.asynccontextmanager
+    async def get_cursor(dictionary=True):
+        yield _CursorFalso(solucoes)
+
+    monkeypatch.setattr(modulo.AsyncDatabase, 'get_cursor', staticmethod(get_cursor))
+    monkeypatch.setattr(settings, 'SIMILARITY_ENABLED', True)
+    monkeypatch.setattr(settings, 'SIMILARITY_REUSE_THRESHOLD', 0.9)
+    monkeypatch.setattr(settings, 'SIMILARITY_PLAGIARISM_THRESHOLD', 0.8)
+    return solucoes
+
+
+def _solucao(banco, id, user_id, texto, analise=None, problema_id=1):
+    solucao = {
+        'id': id, 'user_id': user_id, 'problema_id': problema_id, 'descricao_solucao': texto,
+        'analise_ai': json.dumps(analise) if analise is not None else None
+    }
+    banco.append(solucao)
+    return solucao
+
+
+# ==================== SKETCHES ====================
+
+def test_normalizacao_ignora_formatacao():
+    assert normalizar_texto("  Solução: USAR   cache,\nredis! ") == "solucao usar cache redis"
+    assert calcular_sketch("Olá, Mundo grande e belo") == calcular_sketch("ola mundo GRANDE e belo.")
+
+
+def test_similaridade_estima_jaccard():
+    base = _texto(1)
+    palavras = base.split()
+
+    assert similaridade(calcular_sketch(base), calcular_sketch(base)) == 1.0
+    assert similaridade(calcular_sketch(base), calcular_sketch(_texto(2))) < 0.2
+
+    # Troca de uma palavra no meio: poucos shingles mudam
+    quase = ' '.join(palavras[:60] + ['diferente'] + palavras[61:])
+    assert similaridade(calcular_sketch(base), calcular_sketch(quase)) >= 0.8
+
+    assert similaridade(frozenset(), calcular_sketch(base)) == 0.0
+
+
+# ==================== DECISÃO ====================
+
+def test_reenvio_quase_identico_reaproveita_a_analise(banco):
+    texto = _texto(10)
+    _solucao(banco, 1, user_id=7, texto=texto, analise={'pontuacao': 80, 'feedback': 'ok', 'alerta_plagio': {'x': 1}})
+    nova = _solucao(banco, 2, user_id=7, texto=texto + '.')
+
+    resultado = asyncio.run(SimilarityIndex().verificar(nova))
+
+    assert resultado['plagio'] is None  # mesmo usuário
+    analise = resultado['analise']
+    assert analise['pontuacao'] == 80
+    assert analise['duplicata_de'] == 1
+    assert analise['from_cache'] is True
+    assert 'alerta_plagio' not in analise
+
+
+def test_texto_de_outro_usuario_enviado_antes_e_plagio(banco):
+    texto = _texto(20)
+    _solucao(banco, 1, user_id=7, texto=texto, analise={'pontuacao': 90, 'feedback': 'ok'})
+    copia = _solucao(banco, 2, user_id=8, texto=texto)
+
+    resultado = asyncio.run(SimilarityIndex().verificar(copia))
+
+    assert resultado['plagio']['solucao_id'] == 1
+    assert resultado['plagio']['user_id'] == 7
+
+
+def test_original_enviada_antes_nao_e_plagio_da_copia(banco):
+    texto = _texto(30)
+    original = _solucao(banco, 1, user_id=7, texto=texto)
+    _solucao(banco, 2, user_id=8, texto=texto)
+
+    resultado = asyncio.run(SimilarityIndex().verificar(original))
+
+    assert resultado['plagio'] is None
+    assert resultado['analise'] is None  # a cópia ainda não tem análise
+
+
+def test_textos_diferentes_vao_para_a_ia(banco):
+    _solucao(banco, 1, user_id=7, texto=_texto(40), analise={'pontuacao': 90, 'feedback': 'ok'})
+    nova = _solucao(banco, 2, user_id=8, texto=_texto(41))
+
+    resultado = asyncio.run(SimilarityIndex().verificar(nova))
+
+    assert resultado == {'analise': None, 'plagio': None}
+
+
+def test_outro_problema_nao_conta(banco):
+    texto = _texto(50)
+    _solucao(banco, 1, user_id=7, texto=texto, analise={'pontuacao': 90, 'feedback': 'ok'}, problema_id=2)
+    nova = _solucao(banco, 2, user_id=8, texto=texto, problema_id=1)
+
+    assert asyncio.run(SimilarityIndex().verificar(nova)) == {'analise': None, 'plagio': None}
+
+
+def test_indice_sincroniza_por_delta_e_respeita_o_limite(banco):
+    indice = SimilarityIndex(max_por_problema=3)
+    for i in range(1, 4):
+        _solucao(banco, i, user_id=i, texto=_texto(100 + i))
+    asyncio.run(indice.buscar_similares(1, _texto(0), 0.5))
+
+    texto = _texto(200)
+    _solucao(banco, 4, user_id=4, texto=texto)
+    encontradas = asyncio.run(indice.buscar_similares(1, texto, 0.9))
+
+    assert [s['solucao_id'] for s in encontradas] == [4]
+    assert indice.stats()['entries'] == 3  # a mais antiga saiu
+    assert indice.stats()['loaded_rows'] == 4
@@ -0,0 +1,79 @@
+"""
+Testes da IndexableSkipList contra uma lista ordenada de referência
+"""
+import bisect
+import random
+
+import pytest
+
+from app.core.skiplist import IndexableSkipList
+
+
+def _conferir(skiplist: IndexableSkipList, referencia: list):
+    assert len(skiplist) == len(referencia)
+    assert list(skiplist) == referencia
+    for posicao, chave in enumerate(referencia):
+        assert skiplist[posicao] == chave
+        assert skiplist.index(chave) == posicao
+
+
+def test_operacoes_aleatorias_batem_com_lista_ordenada():
+    rnd = random.Random(42)
+    skiplist = IndexableSkipList(seed=7)
+    referencia: list = []
+
+    for passo in range(3000):
+        if referencia and rnd.random() < 0.4:
+            chave = rnd.choice(referencia)
+            skiplist.remove(chave)
+            referencia.remove(chave)
+        else:
+            chave = (-rnd.randint(0, 500), rnd.randint(1, 10_000))
+            if chave in referencia:
+                continue
+            skiplist.insert(chave)
+            bisect.insort(referencia, chave)
+
+        if passo % 250 == 0:
+            _conferir(skiplist, referencia)
+
+    _conferir(skiplist, referencia)
+
+
+def test_count_less_com_chave_ausente():
+    skiplist = IndexableSkipList(seed=1)
+    for chave in [10, 20, 30, 40]:
+        skiplist.insert(chave)
+
+    assert skiplist.count_less(5) == 0
+    assert skiplist.count_less(25) == 2
+    assert skiplist.count_less(30) == 2
+    assert skiplist.count_less(99) == 4
+
+
+def test_iter_from():
+    skiplist = IndexableSkipList(seed=3)
+    for chave in range(100):
+        skiplist.insert(chave)
+
+    assert list(skiplist.iter_from(95)) == [95, 96, 97, 98, 99]
+    assert list(skiplist.iter_from(100)) == []
+    assert list(skiplist.iter_from(-3))[:2] == [0, 1]
+
+
+def test_erros():
+    skiplist = IndexableSkipList(seed=5)
+    skiplist.insert(1)
+
+    with pytest.raises(KeyError):
+        skiplist.insert(1)
+    with pytest.raises(KeyError):
+        skiplist.remove(2)
+    with pytest.raises(KeyError):
+        skiplist.index(2)
+    with pytest.raises(IndexError):
+        skiplist[1]
+
+    skiplist.remove(1)
+    assert len(skiplist) == 0
+    assert list(skiplist) == []